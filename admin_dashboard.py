@@ -6,9 +6,13 @@ Dashboard administrateur pour le bot Téléfoot
 """
 
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 
+from config import USERS_FILE
+from user_manager import UserManager
+from user_store import get_user_store
+
 def load_json(file):
     try:
         with open(file, 'r', encoding='utf-8') as f:
@@ -16,10 +20,14 @@ def load_json(file):
     except:
         return {}
 
-def generate_admin_report():
-    """Génère un rapport complet pour l'admin"""
+def generate_admin_report(user_manager):
+    """Génère un rapport complet pour l'admin
+
+    `user_manager` est le UserManager déjà chargé par l'appelant (celui du
+    bot): son index des expirations sert directement, sans relecture.
+    """
     # Charger les données
-    users = load_json("users.json")
+    users = user_manager.users
     stats = load_json("bot_stats.json")
     
     # Statistiques utilisateurs
@@ -39,12 +47,8 @@ def generate_admin_report():
     revenue_month = sum(3000 for user in users.values() if user.get("plan") == "mois")
     total_revenue = revenue_week + revenue_month
     
-    # Expirations prochaines (7 jours)
-    next_week = datetime.now() + timedelta(days=7)
-    expiring_soon = [user_id for user_id, user in users.items() 
-                    if user.get("expires") and 
-                    datetime.fromisoformat(user.get("expires")) <= next_week and
-                    datetime.fromisoformat(user.get("expires")) > datetime.now()]
+    # Expirations prochaines (7 jours), depuis l'index trié des expirations
+    expiring_soon = user_manager.expiring_within(7)
     
     report = f"""
 📊 *RAPPORT ADMINISTRATEUR TÉLÉFOOT*
@@ -77,8 +81,7 @@ def generate_admin_report():
 
 def get_user_details(user_id):
     """Obtient les détails d'un utilisateur"""
-    users = load_json("users.json")
-    user = users.get(user_id)
+    user = get_user_store(USERS_FILE).get(user_id)
     
     if not user:
         return "❌ Utilisateur non trouvé"
@@ -97,4 +100,4 @@ def get_user_details(user_id):
 """
 
 if __name__ == "__main__":
-    print(generate_admin_report())
+    print(generate_admin_report(UserManager()))
@@ -10,6 +10,8 @@ import hashlib
 from datetime import datetime, timedelta
 from typing import Dict, Tuple, Optional
 
+from user_store import UserRecords
+
 class AdvancedUserManager:
     """Gestionnaire avancé avec approbation admin et licences personnalisées"""
     
@@ -69,21 +71,13 @@ class AdvancedUserManager:
         }
     
     def load_users(self) -> Dict:
-        """Charge les utilisateurs depuis le fichier JSON"""
-        try:
-            if os.path.exists(self.users_file):
-                with open(self.users_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            print(f"Erreur lecture utilisateurs: {e}")
-            return {}
+        """Charge les utilisateurs depuis le store partagé"""
+        return UserRecords(self.users_file)
     
-    def save_users(self) -> bool:
-        """Sauvegarde les utilisateurs"""
+    def save_users(self, *user_ids) -> bool:
+        """Sauvegarde les utilisateurs donnés (par défaut, tous ceux modifiés)"""
         try:
-            with open(self.users_file, 'w', encoding='utf-8') as f:
-                json.dump(self.users, f, indent=2, ensure_ascii=False)
+            self.users.save(*user_ids)
             return True
         except Exception as e:
             print(f"Erreur sauvegarde utilisateurs: {e}")
@@ -110,6 +104,7 @@ class AdvancedUserManager:
     
     def register_new_user(self, user_id: str, username: str = None) -> Dict:
         """Enregistre un nouvel utilisateur avec statut pending"""
+        self.users.sync()
         user_data = {
             "status": "pending_approval",
             "username": username,
@@ -125,11 +120,12 @@ class AdvancedUserManager:
         }
         
         self.users[str(user_id)] = user_data
-        self.save_users()
+        self.save_users(user_id)
         return user_data
     
     def approve_trial(self, user_id: str) -> Tuple[bool, str]:
         """Approuve un utilisateur pour l'essai gratuit"""
+        self.users.sync()
         user_data = self.users.get(str(user_id))
         if not user_data:
             return False, "Utilisateur non trouvé"
@@ -150,11 +146,12 @@ class AdvancedUserManager:
             "approved_at": now.isoformat()
         })
         
-        self.save_users()
+        self.save_users(user_id)
         return True, expires.strftime("%d/%m/%Y à %H:%M")
     
     def request_payment(self, user_id: str, plan: str) -> Tuple[bool, str]:
         """Enregistre une demande de paiement"""
+        self.users.sync()
         if plan not in ["semaine", "mois"]:
             return False, "Plan invalide"
         
@@ -174,12 +171,13 @@ class AdvancedUserManager:
             self.users[str(user_id)]["payment_requests"] = []
         
         self.users[str(user_id)]["payment_requests"].append(payment_request)
-        self.save_users()
+        self.save_users(user_id)
         
         return True, self.plans[plan]["price"]
     
     def approve_payment(self, user_id: str, plan: str) -> Tuple[bool, str]:
         """Approuve un paiement et génère la licence"""
+        self.users.sync()
         if plan not in ["semaine", "mois"]:
             return False, "Plan invalide"
         
@@ -214,11 +212,12 @@ class AdvancedUserManager:
                     request["approved_at"] = now.isoformat()
                     break
         
-        self.save_users()
+        self.save_users(user_id)
         return True, license_key
     
     def validate_license(self, user_id: str, provided_license: str) -> bool:
         """Valide une licence et active l'utilisateur"""
+        self.users.sync()
         user_data = self.users.get(str(user_id))
         if not user_data:
             return False
@@ -236,7 +235,7 @@ class AdvancedUserManager:
             "activated_at": datetime.now().isoformat()
         })
         
-        self.save_users()
+        self.save_users(user_id)
         return True
     
     def check_user_access(self, user_id: str) -> bool:
@@ -278,16 +277,18 @@ class AdvancedUserManager:
     
     def add_redirection(self, user_id: str) -> bool:
         """Ajoute une redirection si possible"""
+        self.users.sync()
         if not self.can_add_redirection(user_id):
             return False
         
         current = self.users[str(user_id)].get("current_redirections", 0)
         self.users[str(user_id)]["current_redirections"] = current + 1
-        self.save_users()
+        self.save_users(user_id)
         return True
     
     def remove_redirection(self, user_id: str) -> bool:
         """Supprime une redirection"""
+        self.users.sync()
         user_data = self.users.get(str(user_id))
         if not user_data:
             return False
@@ -295,7 +296,7 @@ class AdvancedUserManager:
         current = user_data.get("current_redirections", 0)
         if current > 0:
             self.users[str(user_id)]["current_redirections"] = current - 1
-            self.save_users()
+            self.save_users(user_id)
             return True
         
         return False
@@ -7,17 +7,51 @@ Système de redirection authentique - Messages apparaissent vraiment du canal de
 import json
 import os
 import asyncio
+import time
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import logging
 from telethon import TelegramClient, events
-from telethon.tl.types import Channel, Chat, MessageMediaPhoto, MessageMediaDocument
+from telethon.tl.types import (
+    Channel, Chat, ChannelParticipantCreator, MessageMediaPhoto, MessageMediaDocument,
+    PeerChannel, UpdateChannel, UpdateChannelParticipant
+)
 from telethon.tl.functions.channels import GetParticipantRequest
 from telethon.tl.functions.messages import ForwardMessagesRequest, SendMessageRequest
 from telethon.errors import ChatAdminRequiredError, UserNotParticipantError
 
 logger = logging.getLogger(__name__)
 
+# Cache des canaux administrés par compte
+ADMIN_CHANNELS_FILE = 'authentic_admin_channels.json'
+ADMIN_CHANNELS_TTL = 6 * 3600
+
+# Nombre maximal de vérifications GetParticipantRequest simultanées
+ADMIN_CHECK_CONCURRENCY = 10
+
+# Regroupement des UpdateChannel d'un même canal avant de revérifier ses droits (secondes)
+ADMIN_RIGHTS_DEBOUNCE = 5
+
+
+def admin_rights_from_entity(entity) -> Optional[bool]:
+    """Droits de publication déduits de l'entité du canal, ou None si inconnus"""
+    if getattr(entity, 'min', False) or not hasattr(entity, 'admin_rights'):
+        return None
+    if getattr(entity, 'creator', False):
+        return True
+    admin_rights = entity.admin_rights
+    return bool(admin_rights and (admin_rights.post_messages or admin_rights.edit_messages))
+
+
+def admin_rights_from_participant(participant) -> bool:
+    """Droits de publication d'un participant (None: le compte a quitté le canal)"""
+    if participant is None:
+        return False
+    if isinstance(participant, ChannelParticipantCreator):
+        return True
+    admin_rights = getattr(participant, 'admin_rights', None)
+    return bool(admin_rights and (admin_rights.post_messages or admin_rights.edit_messages))
+
 class AuthenticRedirectionSystem:
     """Système qui fait apparaître les messages comme vraiment envoyés par le canal de destination"""
     
@@ -27,7 +61,11 @@ class AuthenticRedirectionSystem:
         self.channel_clients = {}  # channel_id -> TelegramClient (clients avec droits admin)
         self.redirections = {}    # user_id -> [redirections]
         self.message_mapping = {} # source_msg_id -> dest_msg_id (pour éditions)
+        self.admin_cache = {}     # user_id -> {'checked_at', 'channels': {channel_id: title}}
+        self.admin_rights_handlers = {}  # user_id -> (client, handler)
+        self.pending_admin_checks = {}   # (user_id, channel_id) -> tâche de vérification différée
         self.load_redirections()
+        self.load_admin_cache()
     
     def load_redirections(self):
         """Charge les redirections depuis le fichier"""
@@ -47,6 +85,26 @@ class AuthenticRedirectionSystem:
         except Exception as e:
             logger.error(f"Erreur sauvegarde redirections: {e}")
     
+    def load_admin_cache(self):
+        """Charge le cache des canaux administrés"""
+        try:
+            if os.path.exists(ADMIN_CHANNELS_FILE):
+                with open(ADMIN_CHANNELS_FILE, 'r', encoding='utf-8') as f:
+                    self.admin_cache = json.load(f)
+        except Exception as e:
+            logger.error(f"Erreur chargement cache canaux admin: {e}")
+            self.admin_cache = {}
+    
+    def save_admin_cache(self):
+        """Sauvegarde le cache des canaux administrés"""
+        try:
+            tmp_file = f"{ADMIN_CHANNELS_FILE}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.admin_cache, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, ADMIN_CHANNELS_FILE)
+        except Exception as e:
+            logger.error(f"Erreur sauvegarde cache canaux admin: {e}")
+    
     async def connect_channel_admin(self, user_id: str, phone: str, api_id: int, api_hash: str) -> Tuple[bool, str]:
         """Connecte un client avec les droits administrateur sur les canaux"""
         try:
@@ -58,7 +116,7 @@ class AuthenticRedirectionSystem:
                 return False, "Code de vérification envoyé. Utilisez /verify_code pour confirmer."
             
             # Vérifier les droits administrateur sur les canaux
-            admin_channels = await self.get_admin_channels(client)
+            admin_channels = await self.get_admin_channels(client, user_id)
             
             if not admin_channels:
                 await client.disconnect()
@@ -71,6 +129,7 @@ class AuthenticRedirectionSystem:
                 self.channel_clients[channel_id] = client
             
             await self.setup_authentic_handlers(user_id, client)
+            await self.setup_admin_rights_handler(user_id, client)
             
             return True, f"Client connecté avec droits admin sur {len(admin_channels)} canaux"
             
@@ -78,40 +137,139 @@ class AuthenticRedirectionSystem:
             logger.error(f"Erreur connexion admin {user_id}: {e}")
             return False, f"Erreur de connexion: {str(e)}"
     
-    async def get_admin_channels(self, client: TelegramClient) -> List[int]:
-        """Récupère la liste des canaux où l'utilisateur est administrateur"""
-        admin_channels = []
+    async def get_admin_channels(self, client: TelegramClient, user_id: Optional[str] = None,
+                                 refresh: bool = False) -> List[int]:
+        """Récupère la liste des canaux où l'utilisateur est administrateur
+
+        Avec `user_id`, le résultat est mis en cache (ADMIN_CHANNELS_TTL) et
+        persisté; `refresh` force un nouveau parcours des dialogues.
+        """
+        cached = self.admin_cache.get(user_id) if user_id else None
+        if cached and not refresh and time.time() - cached['checked_at'] < ADMIN_CHANNELS_TTL:
+            return [int(channel_id) for channel_id in cached['channels']]
         
-        try:
-            async for dialog in client.iter_dialogs():
-                if hasattr(dialog.entity, 'broadcast') or hasattr(dialog.entity, 'megagroup'):
-                    try:
-                        # Vérifier les droits administrateur
-                        participant = await client(GetParticipantRequest(
-                            channel=dialog.entity,
-                            participant='me'
-                        ))
-                        
-                        # Vérifier si l'utilisateur peut poster des messages
-                        if hasattr(participant.participant, 'admin_rights'):
-                            admin_rights = participant.participant.admin_rights
-                            if admin_rights.post_messages or admin_rights.edit_messages:
-                                admin_channels.append(dialog.entity.id)
-                                logger.info(f"Droits admin confirmés sur {dialog.entity.title} ({dialog.entity.id})")
-                        elif hasattr(participant.participant, 'creator') and participant.participant.creator:
-                            admin_channels.append(dialog.entity.id)
-                            logger.info(f"Créateur du canal {dialog.entity.title} ({dialog.entity.id})")
-                            
-                    except (ChatAdminRequiredError, UserNotParticipantError):
-                        continue
-                    except Exception as e:
-                        logger.warning(f"Erreur vérification droits {dialog.entity.title}: {e}")
-                        continue
+        admin_channels = {}
+        semaphore = asyncio.Semaphore(ADMIN_CHECK_CONCURRENCY)
         
+        async def check(entity):
+            async with semaphore:
+                if await self.check_admin_rights(client, entity):
+                    admin_channels[entity.id] = entity.title
+        
+        try:
+            channels = [dialog.entity async for dialog in client.iter_dialogs()
+                        if isinstance(dialog.entity, Channel)]
+            await asyncio.gather(*(check(entity) for entity in channels))
         except Exception as e:
             logger.error(f"Erreur récupération canaux admin: {e}")
+            if cached:
+                return [int(channel_id) for channel_id in cached['channels']]
+            return list(admin_channels)
+        
+        if user_id:
+            self.admin_cache[user_id] = {
+                'checked_at': time.time(),
+                'channels': {str(channel_id): title for channel_id, title in admin_channels.items()}
+            }
+            self.save_admin_cache()
+        return list(admin_channels)
+    
+    async def check_admin_rights(self, client: TelegramClient, entity) -> bool:
+        """Vérifie si le compte peut publier dans un canal
+
+        Les droits portés par l'entité du dialogue suffisent le plus souvent;
+        GetParticipantRequest n'est utilisé que lorsqu'ils sont absents.
+        """
+        is_admin = admin_rights_from_entity(entity)
+        if is_admin is not None:
+            if is_admin:
+                logger.info(f"Droits admin confirmés sur {entity.title} ({entity.id})")
+            return is_admin
+        
+        try:
+            # Vérifier les droits administrateur
+            participant = await client(GetParticipantRequest(
+                channel=entity,
+                participant='me'
+            ))
+            
+            # Vérifier si l'utilisateur peut poster des messages
+            if hasattr(participant.participant, 'admin_rights'):
+                admin_rights = participant.participant.admin_rights
+                if admin_rights.post_messages or admin_rights.edit_messages:
+                    logger.info(f"Droits admin confirmés sur {entity.title} ({entity.id})")
+                    return True
+            elif hasattr(participant.participant, 'creator') and participant.participant.creator:
+                logger.info(f"Créateur du canal {entity.title} ({entity.id})")
+                return True
+                
+        except (ChatAdminRequiredError, UserNotParticipantError):
+            pass
+        except Exception as e:
+            logger.warning(f"Erreur vérification droits {entity.title}: {e}")
+        return False
+    
+    async def setup_admin_rights_handler(self, user_id: str, client: TelegramClient):
+        """Met à jour le cache d'un canal lorsque les droits du compte y changent
+
+        Un seul gestionnaire par compte. UpdateChannelParticipant ne concerne
+        le compte que s'il porte son propre ID, et contient alors ses nouveaux
+        droits (aucun appel réseau). Les UpdateChannel, envoyés pour toute
+        modification du canal, sont regroupés par canal sur
+        ADMIN_RIGHTS_DEBOUNCE secondes avant une seule vérification.
+        """
+        previous_client, previous_handler = self.admin_rights_handlers.get(user_id, (None, None))
+        if previous_client is client:
+            return
+        if previous_client is not None:
+            previous_client.remove_event_handler(previous_handler)
+        
+        self_id = (await client.get_me(input_only=True)).user_id
+        
+        async def check_later(channel_id):
+            try:
+                await asyncio.sleep(ADMIN_RIGHTS_DEBOUNCE)
+                try:
+                    entity = await client.get_entity(PeerChannel(channel_id))
+                    is_admin = await self.check_admin_rights(client, entity)
+                except Exception:
+                    # Canal devenu inaccessible (départ, exclusion)
+                    entity, is_admin = None, False
+                self.update_admin_channel(user_id, client, channel_id, entity, is_admin)
+            finally:
+                self.pending_admin_checks.pop((user_id, channel_id), None)
+        
+        async def handle_admin_rights_update(update):
+            if isinstance(update, UpdateChannelParticipant):
+                if update.user_id == self_id:
+                    is_admin = admin_rights_from_participant(update.new_participant)
+                    self.update_admin_channel(user_id, client, update.channel_id, None, is_admin)
+                return
+            
+            key = (user_id, update.channel_id)
+            if key not in self.pending_admin_checks:
+                self.pending_admin_checks[key] = asyncio.create_task(check_later(update.channel_id))
+        
+        client.add_event_handler(handle_admin_rights_update, events.Raw(types=[UpdateChannel, UpdateChannelParticipant]))
+        self.admin_rights_handlers[user_id] = (client, handle_admin_rights_update)
+    
+    def update_admin_channel(self, user_id: str, client: TelegramClient, channel_id: int, entity, is_admin: bool):
+        """Met à jour un canal dans le cache et dans les clients admin"""
+        cached = self.admin_cache.setdefault(user_id, {'checked_at': time.time(), 'channels': {}})
+        was_admin = str(channel_id) in cached['channels']
+        
+        if is_admin:
+            title = cached['channels'].get(str(channel_id), str(channel_id))
+            cached['channels'][str(channel_id)] = getattr(entity, 'title', title)
+            self.channel_clients[channel_id] = client
+        else:
+            cached['channels'].pop(str(channel_id), None)
+            if self.channel_clients.get(channel_id) is client:
+                del self.channel_clients[channel_id]
         
-        return admin_channels
+        if was_admin != is_admin:
+            logger.info(f"Droits admin {'obtenus' if is_admin else 'perdus'} sur le canal {channel_id} ({user_id})")
+            self.save_admin_cache()
     
     async def setup_authentic_handlers(self, user_id: str, client: TelegramClient):
         """Configure les gestionnaires pour redirection authentique"""
@@ -1,5 +1,5 @@
 # Applying changes to bot_handlers.py to improve the /deploy command.
-from telethon import events
+from bot_router import get_callback_router, get_router
 from user_manager import UserManager
 from config import ADMIN_ID, MESSAGES
 
@@ -13,29 +13,32 @@ class BotHandlers:
 
     def register_handlers(self):
         """Enregistre tous les handlers du bot"""
-        self.bot.add_event_handler(self.start_handler, events.NewMessage(pattern='/start'))
-        self.bot.add_event_handler(self.activer_handler, events.NewMessage(pattern='/activer'))
-        self.bot.add_event_handler(self.status_handler, events.NewMessage(pattern='/status'))
-        self.bot.add_event_handler(self.help_handler, events.NewMessage(pattern='/help'))
-        self.bot.add_event_handler(self.pronostics_handler, events.NewMessage(pattern='/pronostics'))
+        router = get_router(self.bot)
+        router.add('/start', self.start_handler)
+        router.add('/activer', self.activer_handler)
+        router.add('/status', self.status_handler)
+        router.add('/help', self.help_handler)
+        router.add('/pronostics', self.pronostics_handler)
 
         # Commandes admin spécialisées
-        self.bot.add_event_handler(self.test_handler, events.NewMessage(pattern='/test'))
-        self.bot.add_event_handler(self.guide_handler, events.NewMessage(pattern='/guide'))
-        self.bot.add_event_handler(self.clean_handler, events.NewMessage(pattern='/clean'))
-        self.bot.add_event_handler(self.reconnect_handler, events.NewMessage(pattern='/reconnect'))
-        self.bot.add_event_handler(self.config_handler, events.NewMessage(pattern='/config'))
-        self.bot.add_event_handler(self.delay_handler, events.NewMessage(pattern='/delay'))
-        self.bot.add_event_handler(self.settings_handler, events.NewMessage(pattern='/settings'))
-        self.bot.add_event_handler(self.menu_handler, events.NewMessage(pattern='/menu'))
-        self.bot.add_event_handler(self.deploy_handler, events.NewMessage(pattern='/deploy'))
+        router.add('/test', self.test_handler)
+        router.add('/guide', self.guide_handler)
+        router.add('/clean', self.clean_handler)
+        router.add('/reconnect', self.reconnect_handler)
+        router.add('/config', self.config_handler)
+        router.add('/delay', self.delay_handler)
+        router.add('/settings', self.settings_handler)
+        router.add('/menu', self.menu_handler)
+        router.add('/deploy', self.deploy_handler)
 
         # Handler pour la réactivation automatique Render.com
-        self.bot.add_event_handler(self.reactivation_handler, events.NewMessage(pattern=r'(?i).*réactiver.*bot.*automatique.*'))
-        self.bot.add_event_handler(self.payer_handler, events.NewMessage(pattern='/payer'))
+        router.add_text(self.reactivation_handler, r'(?i).*réactiver.*bot.*automatique.*')
+        router.add('/payer', self.payer_handler)
 
-        # Handler pour les callbacks des boutons
-        self.bot.add_event_handler(self.callback_handler, events.CallbackQuery)
+        # Handler pour les boutons de paiement
+        callbacks = get_callback_router(self.bot)
+        callbacks.add_prefix('pay', self.callback_handler)
+        callbacks.add('cancel_payment', self.callback_handler)
 
     async def start_handler(self, event):
         """Handler pour la commande /start"""
@@ -370,7 +373,7 @@ class BotHandlers:
             f"• 1 semaine = 1000f\n"
             f"• 1 mois = 3000f\n\n"
             f"📂 **Fichiers de données :**\n"
-            f"• users.json : {'✅' if os.path.exists('users.json') else '❌'}\n"
+            f"• users.db : {'✅' if os.path.exists('users.db') else '❌'}\n"
             f"• telefeed_sessions.json : {'✅' if os.path.exists('telefeed_sessions.json') else '❌'}\n"
             f"• telefeed_redirections.json : {'✅' if os.path.exists('telefeed_redirections.json') else '❌'}"
         )
@@ -433,9 +436,8 @@ class BotHandlers:
             return
 
         # Afficher l'interface à boutons TeleFeed
-        from button_interface import ButtonInterface
-        button_interface = ButtonInterface(self.bot, self.user_manager)
-        await button_interface.show_main_menu(event)
+        from button_interface import get_button_interface
+        await get_button_interface(self.bot, self.user_manager).show_main_menu(event)
 
     async def deploy_handler(self, event):
         """Handler pour la commande /deploy - Génère et envoie le package COMPLET avec TOUS les fichiers"""
@@ -464,7 +466,7 @@ class BotHandlers:
             # Liste COMPLÈTE des fichiers à inclure
             core_files = [
                 # Fichiers principaux du bot
-                'main.py', 'bot_handlers.py', 'user_manager.py', 'config.py', 'users.json',
+                'main.py', 'bot_handlers.py', 'bot_router.py', 'user_manager.py', 'user_store.py', 'config.py', 'users.json', 'users.db',
                 
                 # Version avancée
                 'advanced_user_manager.py', 'advanced_flask_app.py',
@@ -473,7 +475,9 @@ class BotHandlers:
                 'telefeed_commands.py', 'telefeed_sessions.json', 'telefeed_redirections.json',
                 'telefeed_settings.json', 'telefeed_chats.json', 'telefeed_whitelist.json',
                 'telefeed_blacklist.json', 'telefeed_delay.json', 'telefeed_filters.json',
-                'telefeed_transformations.json', 'telefeed_message_mapping.json',
+                'telefeed_transformations.json', 'telefeed_message_mapping.json', 'telefeed_messages.db', 'telefeed_config.db',
+                'telefeed_rules.py', 'telefeed_sender.py', 'telefeed_storage.py', 'telefeed_supervisor.py',
+                'telefeed_shards.py', 'telefeed_dialogs.py', 'telefeed_conversations.py',
                 
                 # Interface utilisateur
                 'button_interface.py',
@@ -563,6 +567,7 @@ from telethon.errors import AuthKeyError, FloodWaitError
 from flask import Flask, jsonify
 import logging
 import json
+from user_store import UserRecords
 
 # Configuration des logs
 logging.basicConfig(level=logging.INFO)
@@ -593,24 +598,29 @@ class CompleteTelefootBot:
     def load_users(self):
         """Charge les utilisateurs"""
         try:
-            if os.path.exists('users.json'):
-                with open('users.json', 'r', encoding='utf-8') as f:
-                    self.users = json.load(f)
-                logger.info(f"✅ {len(self.users)} utilisateurs chargés")
+            self.users = UserRecords('users.json')
+            logger.info(f"✅ {len(self.users)} utilisateurs chargés")
         except Exception as e:
             logger.error(f"Erreur chargement utilisateurs: {e}")
             self.users = {}
     
-    def save_users(self):
-        """Sauvegarde les utilisateurs"""
+    def save_users(self, *user_ids):
+        """Sauvegarde les utilisateurs modifiés"""
         try:
-            with open('users.json', 'w', encoding='utf-8') as f:
-                json.dump(self.users, f, ensure_ascii=False, indent=2)
+            self.users.save(*user_ids)
         except Exception as e:
             logger.error(f"Erreur sauvegarde utilisateurs: {e}")
     
+    def sync_users(self):
+        """Relit les utilisateurs modifiés par un autre processus (avant une modification)"""
+        try:
+            self.users.sync()
+        except Exception as e:
+            logger.error(f"Erreur relecture utilisateurs: {e}")
+    
     def register_user(self, user_id, username=None):
         """Enregistre un nouvel utilisateur"""
+        self.sync_users()
         user_id = str(user_id)
         if user_id not in self.users:
             self.users[user_id] = {
@@ -622,12 +632,13 @@ class CompleteTelefootBot:
                 'redirections': 0,
                 'max_redirections': 0
             }
-            self.save_users()
+            self.save_users(user_id)
             return True
         return False
     
     def activate_user(self, user_id, plan='weekly'):
         """Active un utilisateur avec un plan"""
+        self.sync_users()
         user_id = str(user_id)
         if user_id in self.users:
             duration = timedelta(days=7 if plan == 'weekly' else 30)
@@ -636,7 +647,7 @@ class CompleteTelefootBot:
             self.users[user_id]['plan'] = plan
             self.users[user_id]['expires_at'] = (datetime.now() + duration).isoformat()
             self.users[user_id]['max_redirections'] = max_redirections
-            self.save_users()
+            self.save_users(user_id)
             return True
         return False
     
@@ -1143,8 +1154,8 @@ Le bot répondra automatiquement "ok" aux messages de réactivation et gèrera t
                 parse_mode="markdown"
             )
 
-    async def callback_handler(self, event):
-        """Handler pour les boutons inline"""
+    async def callback_handler(self, event, argument=None):
+        """Handler pour les boutons inline (paiement)"""
         user_id = str(event.sender_id)
 
         try:
@@ -1161,6 +1172,7 @@ Le bot répondra automatiquement "ok" aux messages de réactivation et gèrera t
 
                     if target_user_id == user_id:
                         # Traitement de la demande de paiement
+                        self.user_manager.sync_users()
                         if user_id not in self.user_manager.users:
                             self.user_manager.register_new_user(user_id)
 
@@ -1169,7 +1181,7 @@ Le bot répondra automatiquement "ok" aux messages de réactivation et gèrera t
                         self.user_manager.users[user_id]['status'] = 'payment_requested'
                         self.user_manager.users[user_id]['requested_plan'] = plan
                         self.user_manager.users[user_id]['payment_requested_at'] = datetime.utcnow().isoformat()
-                        self.user_manager.save_users()
+                        self.user_manager.save_users(user_id)
 
                         # Notifier l'admin
                         admin_msg = (
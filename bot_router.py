@@ -0,0 +1,146 @@
+"""
+Aiguillage des messages et des boutons reçus par le bot
+Un seul gestionnaire Telethon par type d'événement: la commande (ou la donnée du
+bouton) est lue une fois et transmise à un seul handler
+"""
+
+import re
+
+
+class CommandRouter:
+    """Table des commandes du bot: {'/commande': [(motif, handler)]}
+
+    Le premier mot du message (sans @nom_du_bot) sélectionne les routes de
+    la commande; le premier motif qui correspond désigne le handler, qui
+    reçoit `event.pattern_match` comme avec `events.NewMessage(pattern=...)`.
+    Les textes sans commande passent par les préfixes (ex. `aa` pour les
+    codes de connexion), puis les motifs de texte, puis le handler par défaut
+    (conversation en cours).
+    """
+
+    def __init__(self):
+        self.commands = {}
+        self.prefixes = {}
+        self.prefix_lengths = []
+        self.text_routes = []
+        self.default = None
+
+    def add(self, prefix, callback, pattern=None):
+        """Enregistre un handler pour une commande (/...) ou un préfixe de texte"""
+        route = (re.compile(pattern) if pattern else None, callback)
+        if prefix.startswith('/'):
+            self.commands.setdefault(prefix.lower(), []).append(route)
+        else:
+            self.prefixes.setdefault(prefix, []).append(route)
+            self.prefix_lengths = sorted({len(p) for p in self.prefixes}, reverse=True)
+
+    def add_text(self, callback, pattern=None):
+        """Handler des textes sans commande: avec motif, ou par défaut s'il n'y en a pas"""
+        if pattern:
+            self.text_routes.append((re.compile(pattern), callback))
+        else:
+            self.default = callback
+
+    def on(self, prefix, pattern=None):
+        """Décorateur équivalent à add()"""
+        def decorator(callback):
+            self.add(prefix, callback, pattern)
+            return callback
+        return decorator
+
+    def _routes(self, text):
+        if text.startswith('/'):
+            command = text.split(None, 1)[0].split('@', 1)[0].lower()
+            return self.commands.get(command, ())
+        for length in self.prefix_lengths:
+            routes = self.prefixes.get(text[:length])
+            if routes:
+                return routes
+        return ()
+
+    async def dispatch(self, event):
+        """Transmet un message au handler qui lui correspond"""
+        text = event.raw_text or ''
+        if not text:
+            return
+
+        for pattern, callback in self._routes(text):
+            match = pattern.match(text) if pattern else None
+            if pattern is None or match:
+                event.pattern_match = match
+                await callback(event)
+                return
+        if text.startswith('/'):
+            return
+
+        for pattern, callback in self.text_routes:
+            match = pattern.match(text)
+            if match:
+                event.pattern_match = match
+                await callback(event)
+                return
+        if self.default is not None:
+            event.pattern_match = None
+            await self.default(event)
+
+
+class CallbackRouter:
+    """Table des boutons du bot: données exactes, puis préfixe
+
+    Le préfixe est la partie de la donnée avant le premier ':' ou '_'
+    (`ph:3`, `pay_semaine_42`); le handler reçoit le reste de la donnée
+    (`3`, `semaine_42`), ou '' pour une donnée exacte.
+    """
+
+    def __init__(self):
+        self.exact = {}
+        self.prefixes = {}
+
+    def add(self, data, callback):
+        """Enregistre le handler d'une donnée de bouton exacte"""
+        self.exact[data.encode()] = callback
+
+    def add_prefix(self, prefix, callback):
+        """Enregistre le handler des données commençant par `prefix:` ou `prefix_`"""
+        self.prefixes[prefix.encode()] = callback
+
+    async def dispatch(self, event):
+        """Transmet un clic de bouton au handler qui lui correspond"""
+        data = event.data or b''
+        callback = self.exact.get(data)
+        if callback is not None:
+            await callback(event, '')
+            return
+
+        prefix = data.split(b':', 1)[0].split(b'_', 1)[0]
+        callback = self.prefixes.get(prefix)
+        if callback is not None:
+            await callback(event, data[len(prefix) + 1:].decode('utf-8', 'replace'))
+            return
+
+        print(f"🔍 Callback reçu de {event.sender_id}: {data.decode('utf-8', 'replace')}")
+        await event.answer("⚠️ Action en développement", alert=True)
+
+
+_routers = {}
+_callback_routers = {}
+
+
+def get_router(bot):
+    """Routeur du client bot, enregistré comme unique gestionnaire de messages au premier appel"""
+    from telethon import events
+    router = _routers.get(bot)
+    if router is None:
+        router = _routers[bot] = CommandRouter()
+        bot.add_event_handler(router.dispatch, events.NewMessage())
+    return router
+
+
+def get_callback_router(bot):
+    """Routeur des boutons du client bot, unique gestionnaire CallbackQuery"""
+    from telethon import events
+    router = _callback_routers.get(bot)
+    if router is None:
+        router = _callback_routers[bot] = CallbackRouter()
+        bot.add_event_handler(router.dispatch, events.CallbackQuery())
+    return router
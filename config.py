@@ -9,6 +9,23 @@ ADMIN_ID = int(os.getenv('ADMIN_ID', '1190237801'))
 # Fichiers de données
 USERS_FILE = "users.json"
 
+# Restauration des sessions TeleFeed au démarrage
+TELEFEED_RESTORE_CONCURRENCY = int(os.getenv('TELEFEED_RESTORE_CONCURRENCY', '5'))
+TELEFEED_RESTORE_TIMEOUT = int(os.getenv('TELEFEED_RESTORE_TIMEOUT', '30'))
+
+# Connexion à la demande des comptes sans redirection active
+TELEFEED_LAZY_CONNECT = os.getenv('TELEFEED_LAZY_CONNECT', '1') == '1'
+TELEFEED_IDLE_TIMEOUT = int(os.getenv('TELEFEED_IDLE_TIMEOUT', '900'))
+
+# Nombre de processus de travail TeleFeed (0 = tous les comptes dans le processus du bot)
+TELEFEED_SHARDS = int(os.getenv('TELEFEED_SHARDS', '0'))
+
+# Stockage de la configuration TeleFeed: 'json' (un fichier par collection) ou 'sqlite' (telefeed_config.db)
+TELEFEED_STORAGE = os.getenv('TELEFEED_STORAGE', 'json')
+
+# Durée de vie d'une commande en plusieurs étapes sans réponse (secondes)
+TELEFEED_CONVERSATION_TTL = int(os.getenv('TELEFEED_CONVERSATION_TTL', '900'))
+
 # Plans et tarifs
 PLANS = {
     "semaine": {
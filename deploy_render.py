@@ -27,9 +27,11 @@ def create_deployment_package():
         'render_deploy.py',
         'requirements_render.txt',
         'user_manager.py',
+        'user_store.py',
         'bot_handlers.py',
         'config.py',
         'users.json',
+        'users.db',
         'Dockerfile',
         'RENDER_DEPLOYMENT_GUIDE.md'
     ]
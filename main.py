@@ -13,11 +13,12 @@ from datetime import datetime
 from telethon import TelegramClient
 from telethon.errors import AuthKeyError, FloodWaitError
 
-from config import API_ID, API_HASH, BOT_TOKEN, ADMIN_ID
+from config import API_ID, API_HASH, BOT_TOKEN, ADMIN_ID, TELEFEED_SHARDS
 from user_manager import UserManager
 from bot_handlers import BotHandlers
 from telefeed_commands import register_all_handlers
-from button_interface import ButtonInterface
+from telefeed_shards import ShardCoordinator
+from button_interface import get_button_interface
 from keep_alive import keep_alive
 
 class TelefootBot:
@@ -29,6 +30,8 @@ class TelefootBot:
         self.handlers = None
         self.button_interface = None
         self.running = False
+        # Tâches de fond du bot, annulées par stop() avant une nouvelle tentative
+        self.tasks = []
     
     async def initialize(self):
         """Initialise le client Telegram et les handlers"""
@@ -51,7 +54,7 @@ class TelefootBot:
             self.handlers = BotHandlers(self.client, self.user_manager)
             
             # Initialisation de l'interface à boutons
-            self.button_interface = ButtonInterface(self.client, self.user_manager)
+            self.button_interface = get_button_interface(self.client, self.user_manager)
             
             # Enregistrement des handlers TeleFeed
             await register_all_handlers(self.client, ADMIN_ID, API_ID, API_HASH)
@@ -76,62 +79,20 @@ class TelefootBot:
     
     async def restore_telefeed_sessions(self, telefeed_manager):
         """Restaure automatiquement les sessions TeleFeed existantes"""
-        print("🔄 Restauration des sessions TeleFeed...")
-        
-        restored_count = 0
-        total_sessions = len(telefeed_manager.sessions)
+        if TELEFEED_SHARDS > 0:
+            # Mode multi-processus: chaque processus de travail restaure ses comptes
+            if telefeed_manager.shards is None:
+                telefeed_manager.attach_shards(ShardCoordinator(telefeed_manager, TELEFEED_SHARDS))
+            if not telefeed_manager.shards.processes:
+                telefeed_manager.shards.start()
+            return None
         
-        for phone_number, session_data in telefeed_manager.sessions.items():
-            if isinstance(session_data, dict) and session_data.get('connected'):
-                if phone_number.startswith('temp_'):
-                    continue  # Ignorer les sessions temporaires
-                
-                try:
-                    session_name = f"telefeed_{phone_number}"
-                    
-                    # Vérifier si le fichier de session existe
-                    if os.path.exists(f"{session_name}.session"):
-                        from config import API_ID, API_HASH
-                        from telethon import TelegramClient
-                        
-                        client = TelegramClient(session_name, API_ID, API_HASH)
-                        await client.connect()
-                        
-                        # Vérifier si la session est toujours valide
-                        if await client.is_user_authorized():
-                            telefeed_manager.clients[phone_number] = client
-                            # Marquer la session comme restaurée
-                            telefeed_manager.sessions[phone_number]['restored_at'] = datetime.now().isoformat()
-                            
-                            # Configurer les gestionnaires de redirection
-                            await telefeed_manager.setup_redirection_handlers(client, phone_number)
-                            
-                            restored_count += 1
-                            print(f"✅ Session restaurée pour {phone_number}")
-                        else:
-                            print(f"⚠️ Session expirée pour {phone_number}")
-                            # Marquer la session comme expirée
-                            telefeed_manager.sessions[phone_number]['connected'] = False
-                            telefeed_manager.sessions[phone_number]['expired_at'] = datetime.now().isoformat()
-                            try:
-                                await client.disconnect()
-                            except:
-                                pass
-                    else:
-                        print(f"⚠️ Fichier de session manquant pour {phone_number}")
-                        # Marquer la session comme manquante
-                        telefeed_manager.sessions[phone_number]['connected'] = False
-                        telefeed_manager.sessions[phone_number]['missing_file'] = True
-                        
-                except Exception as e:
-                    print(f"❌ Erreur lors de la restauration de {phone_number}: {e}")
-                    # Marquer la session comme en erreur
-                    telefeed_manager.sessions[phone_number]['connected'] = False
-                    telefeed_manager.sessions[phone_number]['error'] = str(e)
+        print("🔄 Restauration des sessions TeleFeed...")
         
-        # Sauvegarder les changements
-        telefeed_manager.save_all_data()
-        print(f"🔄 {restored_count}/{total_sessions} sessions TeleFeed restaurées")
+        # Restauration parallèle: chaque compte redirige dès qu'il est prêt
+        report = await telefeed_manager.restore_existing_sessions()
+        print(f"🔄 {report['restored']}/{report['total']} sessions TeleFeed restaurées")
+        return report
     
     async def start(self):
         """Démarre le bot avec reconnexion automatique"""
@@ -149,12 +110,23 @@ class TelefootBot:
                 self.running = True
                 print("🚀 Bot démarré et en attente de messages...")
                 
-                # Nettoyage périodique des utilisateurs expirés
-                cleanup_task = asyncio.create_task(self.cleanup_task())
+                # Expiration des licences à leur échéance exacte
+                self.user_manager.start_expiry_timer()
+                
+                # Mise en veille des comptes TeleFeed dormants
+                from telefeed_commands import telefeed_manager
+                self.tasks.append(asyncio.create_task(telefeed_manager.idle_disconnect_task()))
+                
+                # Supervision des connexions des comptes TeleFeed
+                self.tasks.append(asyncio.create_task(telefeed_manager.supervisor.run()))
+                
+                # Réception des sessions et états des processus TeleFeed
+                if telefeed_manager.shards is not None:
+                    self.tasks.append(asyncio.create_task(telefeed_manager.shards.listen()))
                 
                 # Système de maintien d'activité renforcé
                 keep_alive.start()
-                heartbeat_task = asyncio.create_task(self.heartbeat_task())
+                self.tasks.append(asyncio.create_task(self.heartbeat_task()))
                 
                 # Boucle principale avec gestion des déconnexions
                 if self.client:
@@ -177,23 +149,6 @@ class TelefootBot:
                 
         return retry_count < max_retries
     
-    async def cleanup_task(self):
-        """Tâche de nettoyage périodique"""
-        while self.running:
-            try:
-                # Attendre 1 heure
-                await asyncio.sleep(3600)
-                
-                # Nettoyer les utilisateurs expirés
-                cleaned = self.user_manager.cleanup_expired_users()
-                if cleaned > 0:
-                    print(f"🧹 {cleaned} utilisateurs expirés nettoyés")
-                    
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                print(f"❌ Erreur dans cleanup_task : {e}")
-    
     async def heartbeat_task(self):
         """Tâche de vérification de la connexion"""
         while self.running:
@@ -225,6 +180,20 @@ class TelefootBot:
     async def stop(self):
         """Arrête le bot proprement"""
         self.running = False
+        self.user_manager.stop_expiry_timer()
+        
+        # Annuler les tâches de fond de cette tentative
+        tasks, self.tasks = self.tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # Écrire immédiatement les données TeleFeed en attente de sauvegarde
+        from telefeed_commands import telefeed_manager
+        await telefeed_manager.flush_pending()
+        if telefeed_manager.shards is not None:
+            await telefeed_manager.shards.stop()
+        
         if self.client and self.client.is_connected():
             await self.client.disconnect()
         print("⏹️  Bot arrêté")
@@ -12,6 +12,7 @@ import threading
 from datetime import datetime, timedelta
 from telethon import TelegramClient, events
 from flask import Flask, jsonify
+from user_store import UserRecords
 
 # Configuration
 API_ID = int(os.getenv('API_ID', '29177661'))
@@ -84,23 +85,25 @@ class TelefootBotServer:
     
     def load_users(self):
         """Charge les utilisateurs"""
-        try:
-            with open('users.json', 'r', encoding='utf-8') as f:
-                self.users = json.load(f)
-        except FileNotFoundError:
-            self.users = {}
-            self.save_users()
+        self.users = UserRecords('users.json')
     
-    def save_users(self):
+    def save_users(self, *user_ids):
         """Sauvegarde les utilisateurs"""
         try:
-            with open('users.json', 'w', encoding='utf-8') as f:
-                json.dump(self.users, f, indent=2, ensure_ascii=False)
+            self.users.save(*user_ids)
         except Exception as e:
             logger.error(f"Erreur sauvegarde: {e}")
     
+    def sync_users(self):
+        """Relit les utilisateurs modifiés par un autre processus"""
+        try:
+            self.users.sync()
+        except Exception as e:
+            logger.error(f"Erreur relecture: {e}")
+    
     def register_user(self, user_id, username=None):
         """Enregistre un utilisateur"""
+        self.sync_users()
         user_id = str(user_id)
         if user_id not in self.users:
             self.users[user_id] = {
@@ -109,18 +112,19 @@ class TelefootBotServer:
                 'plan': 'waiting',
                 'expires_at': None
             }
-            self.save_users()
+            self.save_users(user_id)
             return True
         return False
     
     def activate_user(self, user_id, plan='weekly'):
         """Active un utilisateur"""
+        self.sync_users()
         user_id = str(user_id)
         if user_id in self.users:
             duration = timedelta(days=7 if plan == 'weekly' else 30)
             self.users[user_id]['plan'] = plan
             self.users[user_id]['expires_at'] = (datetime.now() + duration).isoformat()
-            self.save_users()
+            self.save_users(user_id)
             return True
         return False
     
@@ -38,6 +38,11 @@ app = Flask(__name__)
 bot_instance = None
 bot_running = False
 
+def telefeed_connection_states():
+    """États des comptes TeleFeed, si le système TeleFeed tourne dans ce processus"""
+    telefeed = sys.modules.get('telefeed_commands')
+    return telefeed.telefeed_manager.get_connection_states() if telefeed else {}
+
 @app.route('/')
 def health_check():
     """Endpoint de santé pour Render.com"""
@@ -47,6 +52,7 @@ def health_check():
         "service": "Téléfoot Bot",
         "status": "running" if bot_running else "starting",
         "bot_connected": bot_instance.client.is_connected() if bot_instance and bot_instance.client else False,
+        "telefeed_accounts": telefeed_connection_states(),
         "timestamp": datetime.now().isoformat()
     }
     return jsonify(status)
@@ -63,6 +69,7 @@ def bot_status():
         "bot_running": bot_running,
         "client_connected": bot_instance.client.is_connected() if bot_instance.client else False,
         "users_count": len(bot_instance.user_manager.users) if bot_instance.user_manager else 0,
+        "telefeed_accounts": telefeed_connection_states(),
         "uptime": "Active depuis le démarrage"
     })
 
@@ -11,6 +11,7 @@ import time
 from datetime import datetime, timedelta
 from telethon import TelegramClient, events, Button
 from telethon.errors import SessionPasswordNeededError
+from user_store import UserRecords
 
 # Configuration
 API_ID = int(os.getenv('API_ID', '29177661'))
@@ -33,24 +34,26 @@ class RenderTelefootBot:
         self.restart_count = 0
         
     def load_users(self):
-        """Charge les utilisateurs depuis le fichier JSON"""
-        try:
-            with open('users.json', 'r', encoding='utf-8') as f:
-                self.users = json.load(f)
-        except FileNotFoundError:
-            self.users = {}
-            self.save_users()
+        """Charge les utilisateurs depuis le store partagé"""
+        self.users = UserRecords('users.json')
     
-    def save_users(self):
+    def save_users(self, *user_ids):
         """Sauvegarde les utilisateurs"""
         try:
-            with open('users.json', 'w', encoding='utf-8') as f:
-                json.dump(self.users, f, indent=2, ensure_ascii=False)
+            self.users.save(*user_ids)
         except Exception as e:
             logger.error(f"Erreur sauvegarde utilisateurs: {e}")
     
+    def sync_users(self):
+        """Relit les utilisateurs modifiés par un autre processus (avant une modification)"""
+        try:
+            self.users.sync()
+        except Exception as e:
+            logger.error(f"Erreur relecture utilisateurs: {e}")
+    
     def register_user(self, user_id, username=None):
         """Enregistre un nouvel utilisateur"""
+        self.sync_users()
         user_id = str(user_id)
         if user_id not in self.users:
             self.users[user_id] = {
@@ -60,18 +63,19 @@ class RenderTelefootBot:
                 'expires_at': None,
                 'license_key': None
             }
-            self.save_users()
+            self.save_users(user_id)
             return True
         return False
     
     def activate_user(self, user_id, plan='weekly'):
         """Active un utilisateur avec un plan"""
+        self.sync_users()
         user_id = str(user_id)
         if user_id in self.users:
             duration = timedelta(days=7 if plan == 'weekly' else 30)
             self.users[user_id]['plan'] = plan
             self.users[user_id]['expires_at'] = (datetime.now() + duration).isoformat()
-            self.save_users()
+            self.save_users(user_id)
             return True
         return False
     
@@ -17,6 +17,7 @@ from telethon.errors import AuthKeyError, FloodWaitError
 from flask import Flask, jsonify
 import logging
 import json
+from user_store import UserRecords
 
 # Configuration des logs
 logging.basicConfig(level=logging.INFO)
@@ -47,24 +48,29 @@ class CompleteTelefootBot:
     def load_users(self):
         """Charge les utilisateurs"""
         try:
-            if os.path.exists('users.json'):
-                with open('users.json', 'r', encoding='utf-8') as f:
-                    self.users = json.load(f)
-                logger.info(f"✅ {len(self.users)} utilisateurs chargés")
+            self.users = UserRecords('users.json')
+            logger.info(f"✅ {len(self.users)} utilisateurs chargés")
         except Exception as e:
             logger.error(f"Erreur chargement utilisateurs: {e}")
             self.users = {}
     
-    def save_users(self):
+    def save_users(self, *user_ids):
         """Sauvegarde les utilisateurs"""
         try:
-            with open('users.json', 'w', encoding='utf-8') as f:
-                json.dump(self.users, f, ensure_ascii=False, indent=2)
+            self.users.save(*user_ids)
         except Exception as e:
             logger.error(f"Erreur sauvegarde utilisateurs: {e}")
     
+    def sync_users(self):
+        """Relit les utilisateurs modifiés par un autre processus (avant une modification)"""
+        try:
+            self.users.sync()
+        except Exception as e:
+            logger.error(f"Erreur relecture utilisateurs: {e}")
+    
     def register_user(self, user_id, username=None):
         """Enregistre un nouvel utilisateur"""
+        self.sync_users()
         user_id = str(user_id)
         if user_id not in self.users:
             self.users[user_id] = {
@@ -76,12 +82,13 @@ class CompleteTelefootBot:
                 'redirections': 0,
                 'max_redirections': 0
             }
-            self.save_users()
+            self.save_users(user_id)
             return True
         return False
     
     def activate_user(self, user_id, plan='weekly'):
         """Active un utilisateur avec un plan"""
+        self.sync_users()
         user_id = str(user_id)
         if user_id in self.users:
             duration = timedelta(days=7 if plan == 'weekly' else 30)
@@ -90,7 +97,7 @@ class CompleteTelefootBot:
             self.users[user_id]['plan'] = plan
             self.users[user_id]['expires_at'] = (datetime.now() + duration).isoformat()
             self.users[user_id]['max_redirections'] = max_redirections
-            self.save_users()
+            self.save_users(user_id)
             return True
         return False
     
@@ -354,9 +361,14 @@ def health_check():
         ]
     })
 
+def telefeed_connection_states():
+    """États des comptes TeleFeed, si le système TeleFeed tourne dans ce processus"""
+    telefeed = sys.modules.get('telefeed_commands')
+    return telefeed.telefeed_manager.get_connection_states() if telefeed else {}
+
 @app.route('/health')
 def health():
-    return jsonify({"status": "healthy"})
+    return jsonify({"status": "healthy", "telefeed_accounts": telefeed_connection_states()})
 
 @app.route('/stats')
 def stats():
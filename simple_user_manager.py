@@ -10,6 +10,8 @@ import os
 from datetime import datetime, timedelta
 import uuid
 
+from user_store import UserRecords
+
 class SimpleUserManager:
     """Gestionnaire simplifié des utilisateurs pour PythonAnywhere"""
     
@@ -35,21 +37,13 @@ class SimpleUserManager:
         }
     
     def load_users(self):
-        """Charge les utilisateurs depuis le fichier JSON"""
-        try:
-            if os.path.exists(self.users_file):
-                with open(self.users_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            print(f"Erreur lecture utilisateurs: {e}")
-            return {}
+        """Charge les utilisateurs depuis le store partagé"""
+        return UserRecords(self.users_file)
     
-    def save_users(self):
-        """Sauvegarde les utilisateurs"""
+    def save_users(self, *user_ids):
+        """Sauvegarde les utilisateurs donnés (par défaut, tous ceux modifiés)"""
         try:
-            with open(self.users_file, 'w', encoding='utf-8') as f:
-                json.dump(self.users, f, indent=2, ensure_ascii=False)
+            self.users.save(*user_ids)
             return True
         except Exception as e:
             print(f"Erreur sauvegarde utilisateurs: {e}")
@@ -57,6 +51,7 @@ class SimpleUserManager:
     
     def register_new_user(self, user_id):
         """Enregistre un nouvel utilisateur"""
+        self.users.sync()
         user_data = {
             "status": "waiting",
             "plan": "trial",
@@ -67,11 +62,12 @@ class SimpleUserManager:
         }
         
         self.users[str(user_id)] = user_data
-        self.save_users()
+        self.save_users(user_id)
         return user_data
     
     def activate_user(self, user_id, plan):
         """Active un utilisateur"""
+        self.users.sync()
         if plan not in self.plans:
             raise ValueError(f"Plan invalide: {plan}")
         
@@ -92,7 +88,7 @@ class SimpleUserManager:
             "activated_at": now.isoformat()
         }
         
-        self.save_users()
+        self.save_users(user_id)
         return license_key, expires.strftime("%d/%m/%Y")
     
     def check_user_access(self, user_id):
@@ -3,14 +3,27 @@ TeleFeed Commands Implementation for Téléfoot Bot
 Integrates advanced message redirection and transformation features
 """
 
+import atexit
 import json
 import os
 import re
 import asyncio
+import functools
+import tempfile
+import threading
+import time
 from datetime import datetime
 from telethon import TelegramClient, events
 from telethon.errors import SessionPasswordNeededError, PhoneCodeExpiredError
-from telethon.tl.types import User, Chat, Channel
+from telefeed_rules import CompiledFilter, compile_filter, compile_transformations, normalize_filter_config
+from bot_router import get_router
+from telefeed_conversations import conversations, drop_legacy_states
+from telefeed_dialogs import DialogIndex
+from user_manager import license_cache
+from telefeed_storage import ConfigStore, EntityCacheStore, MessageMappingStore
+from telefeed_supervisor import ConnectionSupervisor
+from telefeed_shards import is_shard_worker
+from telefeed_sender import AccountSendQueue, DestinationCache, OrderedFanout, SendStrategyMemo, SEND_METHODS, available_send_methods, entity_record, input_peer_from_record, is_permission_error
 
 # Configuration des admins
 ADMIN_IDS = ['1190237801']  # ID admin principal
@@ -28,6 +41,16 @@ DATA_FILES = {
     'delay': 'telefeed_delay.json'
 }
 
+# Collections par compte inutiles au routage des messages: en SQLite, l'entrée
+# d'un compte n'est lue qu'au premier accès
+LAZY_COLLECTIONS = ('chats',)
+
+# Délai de regroupement des sauvegardes (secondes)
+SAVE_DEBOUNCE_DELAY = 2.0
+
+# Délai avant de réessayer une sauvegarde échouée (secondes)
+SAVE_RETRY_DELAY = 30.0
+
 def load_json_data(filename):
     """Charge les données JSON"""
     try:
@@ -40,63 +63,260 @@ def load_json_data(filename):
         return {}
 
 def save_json_data(filename, data):
-    """Sauvegarde les données JSON"""
+    """Sauvegarde les données JSON (fichier temporaire puis renommage atomique)"""
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        return True
+        return write_json_text(filename, json.dumps(data, indent=2, ensure_ascii=False))
     except Exception as e:
         print(f"Erreur lors de la sauvegarde {filename}: {e}")
         return False
 
-def is_user_authorized(user_id):
-    """Vérifie si l'utilisateur est autorisé (a une licence active)"""
+def write_json_text(filename, text):
+    """Écrit un JSON déjà sérialisé sans jamais laisser de fichier tronqué
+
+    Le fichier temporaire a un nom unique: deux écritures simultanées du même
+    fichier ne se marchent pas dessus.
+    """
+    temp_filename = None
     try:
-        with open('users.json', 'r', encoding='utf-8') as f:
-            users = json.load(f)
-        
-        user_data = users.get(str(user_id))
-        if not user_data:
-            return False
-            
-        if user_data.get('status') != 'active':
-            return False
-            
-        # Vérifier l'expiration
-        expire_date = user_data.get('expires')
-        if expire_date:
-            expire_datetime = datetime.fromisoformat(expire_date)
-            if datetime.now() > expire_datetime:
-                return False
-                
+        with tempfile.NamedTemporaryFile(
+            'w', encoding='utf-8', dir=os.path.dirname(filename) or '.',
+            prefix=f"{os.path.basename(filename)}.", suffix='.tmp', delete=False
+        ) as f:
+            temp_filename = f.name
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_filename, filename)
         return True
-    except:
+    except Exception as e:
+        print(f"Erreur lors de la sauvegarde {filename}: {e}")
+        if temp_filename is not None and os.path.exists(temp_filename):
+            os.remove(temp_filename)
         return False
 
+def is_user_authorized(user_id):
+    """Vérifie si l'utilisateur est autorisé (a une licence active)"""
+    return license_cache.is_active(user_id)
+
 class TeleFeedManager:
     """Gestionnaire principal pour les fonctionnalités TeleFeed"""
     
     def __init__(self):
-        self.sessions = load_json_data(DATA_FILES['sessions'])
-        self.redirections = load_json_data(DATA_FILES['redirections'])
-        self.transformations = load_json_data(DATA_FILES['transformations'])
-        self.filters = load_json_data(DATA_FILES['filters'])
-        self.whitelist = load_json_data(DATA_FILES['whitelist'])
-        self.blacklist = load_json_data(DATA_FILES['blacklist'])
-        self.settings = load_json_data(DATA_FILES['settings'])
-        self.chats = load_json_data(DATA_FILES['chats'])
-        self.delay = load_json_data(DATA_FILES['delay'])
-        
-        # Mapping des messages pour édition
-        self.message_mapping = load_json_data('telefeed_message_mapping.json')
+        # Processus de travail (mode multi-processus): seul le bot écrit les données
+        self.read_only = is_shard_worker()
+        
+        # Stockage SQLite optionnel (TELEFEED_STORAGE=sqlite), sinon fichiers JSON
+        from config import TELEFEED_STORAGE
+        self.config_store = None
+        if TELEFEED_STORAGE == 'sqlite':
+            self.config_store = ConfigStore(DATA_FILES, legacy_files=DATA_FILES)
+        # Dernier JSON écrit par entrée, pour n'écrire que les entrées modifiées
+        self.saved_rows = {name: {} for name in DATA_FILES}
+        # Comptes déjà cherchés dans la base, par collection chargée à la demande
+        self.lazy_loaded = {name: set() for name in LAZY_COLLECTIONS}
+        
+        self.sessions = self._load_collection('sessions')
+        self.redirections = self._load_collection('redirections')
+        self.transformations = self._load_collection('transformations')
+        self.filters = self._load_collection('filters')
+        self.whitelist = self._load_collection('whitelist')
+        self.blacklist = self._load_collection('blacklist')
+        self.settings = self._load_collection('settings')
+        self.chats = self._load_collection('chats')
+        self.delay = self._load_collection('delay')
+        
+        # Rapport de la dernière restauration des sessions
+        self.restore_report = None
+        
+        # Surveillance des connexions des comptes (ping, reconnexion, révocation)
+        self.supervisor = ConnectionSupervisor(self)
+        
+        # Mode multi-processus: coordinateur (bot) ou processus de travail, sinon None
+        self.shards = None
+        
+        # Connexion à la demande: dernier usage et verrous de connexion par compte
+        self.last_used = {}
+        self.connect_locks = {}
+        
+        # Sauvegarde différée: collections modifiées depuis la dernière écriture
+        self.dirty = set()
+        self.flush_handle = None
+        self.flush_task = None
+        self.flush_lock = threading.Lock()
+        self.flush_count = 0
+        self.files_written = 0
+        if not self.read_only:
+            atexit.register(self.flush_data)
+        
+        # Saisies en cours autrefois enregistrées avec les sessions: les retirer
+        if drop_legacy_states(self.sessions):
+            self.save_all_data('sessions')
+        
+        # Mapping des messages pour édition (SQLite, ouvert au premier usage)
+        self.message_store = MessageMappingStore()
         
         # Clients connectés
         self.clients = {}
         
+        # Index des sources: {phone: {chat_id: [redirection_id, ...]}}
+        self.source_index = {}
+        
+        # Gestionnaires de redirection enregistrés par numéro
+        self.redirection_handlers = {}
+        
+        # Filtres compilés: {(phone, redirection_id): (blacklist, whitelist)}
+        self.compiled_filters = {}
+        
+        # Transformations compilées: {(phone, redirection_id): TransformationPipeline}
+        self.compiled_transformations = {}
+        
+        # Entités de destination et droits de publication résolus, par client,
+        # persistés pour être rechargés sans appel réseau au redémarrage
+        self.entity_store = EntityCacheStore()
+        self.destination_cache = DestinationCache(store=self.entity_store)
+        
+        # Méthode d'envoi qui fonctionne, par (client, destination)
+        self.send_strategies = SendStrategyMemo()
+        
+        # Envois parallèles vers les destinations, ordonnés par (source, destination)
+        self.fanout = OrderedFanout()
+        
+        # Dialogues de chaque compte, tenus à jour par les événements
+        self.dialog_index = DialogIndex(on_change=self._dialogs_changed)
+        
+        # Files d'envoi limitées en débit, par compte connecté
+        self.send_queues = {}
+        for phone_number in self.redirections:
+            self.rebuild_source_index(phone_number)
+        
         # Note: La restauration des sessions se fait lors du premier appel
         
-    def save_all_data(self):
-        """Sauvegarde toutes les données"""
+    def _load_collection(self, name):
+        """Charge une collection depuis le fichier JSON ou la base SQLite"""
+        if self.config_store is None:
+            return load_json_data(DATA_FILES[name])
+        if name in LAZY_COLLECTIONS:
+            # Entrées lues une à une par _load_account_entry
+            return {}
+        try:
+            data = self.config_store.load(name)
+        except Exception as e:
+            print(f"Erreur lors du chargement {name} depuis {self.config_store.path}: {e}")
+            return {}
+        self.saved_rows[name] = {key: json.dumps(value, ensure_ascii=False) for key, value in data.items()}
+        return data
+    
+    def _load_account_entry(self, name, phone_number):
+        """Entrée d'un compte dans une collection, lue dans la base au premier accès
+
+        Seules les entrées chargées sont comparées à la sauvegarde: une
+        entrée jamais lue n'est ni réécrite ni supprimée.
+        """
+        collection = getattr(self, name)
+        if (phone_number in collection or self.config_store is None or name not in LAZY_COLLECTIONS
+                or phone_number in self.lazy_loaded[name]):
+            return collection.get(phone_number)
+        
+        try:
+            data = self.config_store.load_key(name, phone_number)
+        except Exception as e:
+            print(f"Erreur lors du chargement {name}/{phone_number} depuis {self.config_store.path}: {e}")
+            return None
+        self.lazy_loaded[name].add(phone_number)
+        if data is not None:
+            collection[phone_number] = data
+            self.saved_rows[name][str(phone_number)] = json.dumps(data, ensure_ascii=False)
+        return data
+    
+    def save_all_data(self, *collections, publish=True):
+        """Marque des collections comme modifiées et planifie leur sauvegarde
+
+        Sans argument, toutes les collections sont considérées comme modifiées.
+        Les écritures sont regroupées sur SAVE_DEBOUNCE_DELAY secondes et faites
+        hors de la boucle asyncio; hors boucle, la sauvegarde est immédiate.
+        En mode multi-processus, les changements sont aussi transmis aux autres
+        processus, et seul le processus du bot écrit les fichiers.
+        """
+        collections = collections or tuple(DATA_FILES)
+        if self.shards is not None and publish:
+            self.shards.publish(collections)
+        if self.read_only:
+            return
+        
+        self.dirty.update(collections)
+        
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_data()
+            return
+        self._schedule_flush(SAVE_DEBOUNCE_DELAY)
+    
+    def _schedule_flush(self, delay):
+        if self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(delay, self._start_flush)
+    
+    def _start_flush(self):
+        self.flush_handle = None
+        if self.flush_task is not None and not self.flush_task.done():
+            # Une écriture est en cours: attendre qu'elle se termine, dans l'ordre
+            self._schedule_flush(SAVE_DEBOUNCE_DELAY)
+            return
+        self.flush_task = asyncio.ensure_future(self.flush_data_async())
+    
+    async def flush_data_async(self):
+        """Écrit les collections modifiées dans un thread
+
+        La sérialisation se fait ici, sur la boucle asyncio qui modifie les
+        collections; seule l'écriture (fichiers ou SQLite) passe dans un
+        thread. En cas d'échec, la sauvegarde est reprogrammée.
+        """
+        dirty, self.dirty = self.dirty, set()
+        if not dirty:
+            return
+        try:
+            snapshot = self._snapshot_collections(dirty)
+            failed = await asyncio.get_running_loop().run_in_executor(None, self._write_snapshot, snapshot)
+            self._flushed(snapshot, failed)
+        except Exception as e:
+            print(f"Erreur lors de la sauvegarde TeleFeed: {e}")
+            failed = dirty
+        if failed:
+            self.dirty.update(failed)
+            self._schedule_flush(SAVE_RETRY_DELAY)
+    
+    async def flush_pending(self):
+        """Arrêt du bot: attend l'écriture en cours puis écrit les collections restantes"""
+        if self.flush_task is not None and not self.flush_task.done():
+            await asyncio.wait([self.flush_task])
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        
+        self.flush_task = asyncio.ensure_future(self.flush_data_async())
+        await self.flush_task
+        # Pas de nouvel essai différé: flush_data (atexit) reprend ce qui a échoué
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+    
+    def flush_data(self):
+        """Écrit immédiatement toutes les collections modifiées (hors boucle asyncio, atexit)"""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        dirty, self.dirty = self.dirty, set()
+        if dirty:
+            snapshot = self._snapshot_collections(dirty)
+            failed = self._write_snapshot(snapshot)
+            self._flushed(snapshot, failed)
+            self.dirty.update(failed)
+    
+    def _collection_data(self, name):
+        """Données à sauvegarder pour une collection"""
+        if name != 'sessions':
+            return getattr(self, name)
+        
         # Filtrer les sessions pour exclure les clients TelegramClient
         sessions_to_save = {}
         for phone, session_data in self.sessions.items():
@@ -106,63 +326,370 @@ class TeleFeedManager:
                 sessions_to_save[phone] = filtered_session
             else:
                 sessions_to_save[phone] = session_data
+        return sessions_to_save
+    
+    def _snapshot_collections(self, names):
+        """Sérialise des collections: {nom: texte JSON}, ou en SQLite
+        {nom: ({clé: texte JSON}, [clés supprimées])} par rapport à la dernière écriture
+        """
+        if self.config_store is None:
+            return {
+                name: json.dumps(self._collection_data(name), indent=2, ensure_ascii=False)
+                for name in names
+            }
         
-        save_json_data(DATA_FILES['sessions'], sessions_to_save)
-        save_json_data(DATA_FILES['redirections'], self.redirections)
-        save_json_data(DATA_FILES['transformations'], self.transformations)
-        save_json_data(DATA_FILES['filters'], self.filters)
-        save_json_data(DATA_FILES['whitelist'], self.whitelist)
-        save_json_data(DATA_FILES['blacklist'], self.blacklist)
-        save_json_data(DATA_FILES['settings'], self.settings)
-        save_json_data(DATA_FILES['chats'], self.chats)
-        save_json_data(DATA_FILES['delay'], self.delay)
-        save_json_data('telefeed_message_mapping.json', self.message_mapping)
-    
-    async def restore_existing_sessions(self):
-        """Restaure automatiquement les sessions existantes"""
-        print("🔄 Restauration des sessions existantes...")
-        
-        for phone_number, session_data in self.sessions.items():
-            if isinstance(session_data, dict) and session_data.get('connected'):
+        changes = {}
+        for name in names:
+            saved = self.saved_rows[name]
+            current = {
+                str(key): json.dumps(value, ensure_ascii=False)
+                for key, value in self._collection_data(name).items()
+            }
+            rows = {key: text for key, text in current.items() if saved.get(key) != text}
+            deleted = [key for key in saved if key not in current]
+            changes[name] = (rows, deleted)
+        return changes
+    
+    def _write_snapshot(self, snapshot):
+        """Écrit des collections sérialisées (hors boucle); retourne celles à réessayer"""
+        with self.flush_lock:
+            if self.config_store is not None:
+                # Base SQLite: les seules entrées modifiées, en une transaction
                 try:
-                    # Créer le client avec le nom de session existant
-                    session_name = f"telefeed_{phone_number}"
-                    
-                    # Vérifier si le fichier de session existe
-                    if os.path.exists(f"{session_name}.session"):
-                        # Utiliser API_ID et API_HASH par défaut (peuvent être modifiés)
-                        from config import API_ID, API_HASH
-                        client = TelegramClient(session_name, API_ID, API_HASH)
-                        
-                        await client.connect()
-                        
-                        # Vérifier si la session est toujours valide
-                        if await client.is_user_authorized():
-                            self.clients[phone_number] = client
-                            # Marquer la session comme restaurée
-                            self.sessions[phone_number]['restored_at'] = datetime.now().isoformat()
-                            print(f"✅ Session restaurée pour {phone_number}")
-                        else:
-                            print(f"⚠️ Session expirée pour {phone_number}")
-                            # Marquer la session comme expirée
-                            self.sessions[phone_number]['connected'] = False
-                            self.sessions[phone_number]['expired_at'] = datetime.now().isoformat()
-                            pass
-                    else:
-                        print(f"⚠️ Fichier de session manquant pour {phone_number}")
-                        # Marquer la session comme manquante
-                        self.sessions[phone_number]['connected'] = False
-                        self.sessions[phone_number]['missing_file'] = True
-                        
+                    self.config_store.write(snapshot)
+                except Exception as e:
+                    print(f"Erreur lors de la sauvegarde dans {self.config_store.path}: {e}")
+                    return set(snapshot)
+                return set()
+            
+            return {name for name, text in snapshot.items() if not write_json_text(DATA_FILES[name], text)}
+    
+    def _flushed(self, snapshot, failed):
+        """Enregistre le résultat d'une écriture"""
+        if self.config_store is not None and not failed:
+            for name, (rows, deleted) in snapshot.items():
+                saved = self.saved_rows[name]
+                saved.update(rows)
+                for key in deleted:
+                    saved.pop(key, None)
+        
+        self.flush_count += 1
+        self.files_written += len(snapshot) - len(failed)
+    
+    def get_persistence_stats(self):
+        """Compteurs de sauvegarde pour l'administration"""
+        return {
+            'flushes': self.flush_count,
+            'files_written': self.files_written,
+            'pending': sorted(self.dirty)
+        }
+    
+    def attach_shards(self, shards):
+        """Active le mode multi-processus (ShardCoordinator ou ShardWorker)"""
+        self.shards = shards
+        for phone_number in list(self.redirection_handlers):
+            self.refresh_redirection_handlers(phone_number)
+    
+    def owns(self, phone_number):
+        """Indique si ce processus gère les redirections d'un compte"""
+        return self.shards is None or self.shards.owns(phone_number)
+    
+    def apply_shared_update(self, update):
+        """Applique les collections transmises par le processus du bot
+
+        `update` contient, par collection, les entrées des comptes de ce
+        processus; les comptes absents ont été supprimés.
+        """
+        phones = set()
+        for name, owned in update.items():
+            collection = getattr(self, name)
+            for phone_number in [p for p in collection if self.owns(p) and p not in owned]:
+                del collection[phone_number]
+                phones.add(phone_number)
+            collection.update(owned)
+            phones.update(owned)
+        
+        for phone_number in phones:
+            if 'redirections' in update:
+                self.rebuild_source_index(phone_number)
+            if 'whitelist' in update or 'blacklist' in update or 'redirections' in update:
+                self.invalidate_filters(phone_number)
+            if 'transformations' in update or 'redirections' in update:
+                self.invalidate_transformations(phone_number)
+            
+            if phone_number in self.clients:
+                if 'redirections' in update:
+                    self.schedule_destination_warm_up(phone_number)
+            elif phone_number in self.source_index:
+                # Nouvelle redirection ou nouvelle session: connecter le compte
+                self.schedule_ensure_connected(phone_number)
+    
+    def rebuild_source_index(self, phone_number):
+        """Reconstruit l'index chat source -> redirections actives pour un numéro"""
+        index = {}
+        for redir_id, redir_data in self.redirections.get(phone_number, {}).items():
+            if not isinstance(redir_data, dict) or not redir_data.get('active', True):
+                continue
+            for source in redir_data.get('sources', []):
+                try:
+                    chat_id = int(source)
+                except (TypeError, ValueError):
+                    continue
+                index.setdefault(chat_id, []).append(redir_id)
+        
+        if index:
+            self.source_index[phone_number] = index
+        else:
+            self.source_index.pop(phone_number, None)
+        
+        # Mettre à jour le filtre de chats des gestionnaires Telethon
+        self.refresh_redirection_handlers(phone_number)
+    
+    def get_redirections_for_source(self, phone_number, chat_id):
+        """Retourne les IDs des redirections actives ayant ce chat comme source"""
+        return self.source_index.get(phone_number, {}).get(chat_id, ())
+    
+    async def restore_existing_sessions(self, concurrency=None, timeout=None):
+        """Restaure automatiquement les sessions existantes, en parallèle
+
+        Au plus `concurrency` comptes se connectent en même temps, chacun avec
+        un délai maximal de `timeout` secondes. Les redirections d'un compte
+        démarrent dès que ce compte est prêt. Retourne le rapport de démarrage.
+        """
+        from config import TELEFEED_RESTORE_CONCURRENCY, TELEFEED_RESTORE_TIMEOUT, TELEFEED_LAZY_CONNECT
+        concurrency = concurrency or TELEFEED_RESTORE_CONCURRENCY
+        timeout = timeout or TELEFEED_RESTORE_TIMEOUT
+        
+        print(f"🔄 Restauration des sessions existantes ({concurrency} en parallèle)...")
+        started_at = time.monotonic()
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        phones = [
+            phone for phone, session_data in list(self.sessions.items())
+            if isinstance(session_data, dict) and session_data.get('connected')
+            and not phone.startswith('temp_')  # Ignorer les sessions temporaires
+            and phone not in self.clients
+            and self.owns(phone)
+        ]
+        
+        # Mode paresseux: les comptes sans redirection active restent déconnectés
+        dormant = []
+        if TELEFEED_LAZY_CONNECT:
+            dormant = [phone for phone in phones if phone not in self.source_index]
+            phones = [phone for phone in phones if phone in self.source_index]
+            for phone in dormant:
+                print(f"💤 {phone} sans redirection active - connexion à la demande")
+        
+        report = {
+            'total': len(phones),
+            'dormant': len(dormant),
+            'restored': 0,
+            'failed': 0,
+            'time_to_first_redirect': None,
+            'total_time': None
+        }
+        
+        async def restore_one(phone_number):
+            async with semaphore:
+                try:
+                    restored = await asyncio.wait_for(self._restore_session(phone_number), timeout)
+                except asyncio.TimeoutError:
+                    print(f"❌ Délai dépassé lors de la restauration de {phone_number} ({timeout}s)")
+                    self.sessions[phone_number]['error'] = f"timeout ({timeout}s)"
+                    restored = False
                 except Exception as e:
                     print(f"❌ Erreur lors de la restauration de {phone_number}: {e}")
                     # Marquer la session comme en erreur
                     self.sessions[phone_number]['connected'] = False
                     self.sessions[phone_number]['error'] = str(e)
+                    restored = False
+            
+            if restored:
+                report['restored'] += 1
+                if report['time_to_first_redirect'] is None and phone_number in self.source_index:
+                    report['time_to_first_redirect'] = round(time.monotonic() - started_at, 2)
+            else:
+                report['failed'] += 1
+        
+        await asyncio.gather(*(restore_one(phone) for phone in phones))
+        report['total_time'] = round(time.monotonic() - started_at, 2)
+        self.restore_report = report
         
         # Sauvegarder les changements
-        self.save_all_data()
-        print(f"🔄 {len(self.clients)} sessions restaurées")
+        self.save_all_data('sessions')
+        print(
+            f"🔄 {report['restored']}/{report['total']} sessions restaurées en {report['total_time']}s "
+            f"(première redirection active après {report['time_to_first_redirect']}s, "
+            f"{report['dormant']} en veille)"
+        )
+        return report
+    
+    async def ensure_connected(self, phone_number):
+        """Retourne le client d'un compte, en le connectant à la demande si besoin
+
+        Retourne None si le compte n'a pas de session enregistrée ou si la
+        reconnexion échoue, ainsi que pour un compte géré par un autre
+        processus (le fichier de session y est déjà ouvert).
+        """
+        if not self.owns(phone_number):
+            return None
+        self.last_used[phone_number] = time.monotonic()
+        if phone_number in self.clients:
+            return self.clients[phone_number]
+        
+        session_data = self.sessions.get(phone_number)
+        if not isinstance(session_data, dict) or not session_data.get('connected'):
+            return None
+        
+        lock = self.connect_locks.setdefault(phone_number, asyncio.Lock())
+        async with lock:
+            if phone_number not in self.clients:
+                print(f"🔌 Connexion à la demande de {phone_number}")
+                try:
+                    from config import TELEFEED_RESTORE_TIMEOUT
+                    await asyncio.wait_for(self._restore_session(phone_number), TELEFEED_RESTORE_TIMEOUT)
+                except Exception as e:
+                    print(f"❌ Connexion à la demande impossible pour {phone_number}: {e}")
+                self.save_all_data('sessions')
+        return self.clients.get(phone_number)
+    
+    def schedule_ensure_connected(self, phone_number):
+        """Connecte un compte en tâche de fond (ex: nouvelle redirection active)"""
+        if phone_number in self.clients or not self.owns(phone_number):
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        return loop.create_task(self.ensure_connected(phone_number))
+    
+    async def disconnect_idle_clients(self, idle_timeout):
+        """Déconnecte les comptes sans redirection active inutilisés depuis `idle_timeout` secondes"""
+        now = time.monotonic()
+        disconnected = 0
+        for phone_number in list(self.clients):
+            if phone_number in self.source_index and self.owns(phone_number):
+                continue
+            if now - self.last_used.get(phone_number, 0) < idle_timeout:
+                continue
+            
+            client = self.clients.pop(phone_number)
+            self.detach_redirection_handlers(phone_number)
+            try:
+                await client.disconnect()
+            except Exception:
+                pass
+            disconnected += 1
+            print(f"💤 {phone_number} déconnecté après inactivité")
+        return disconnected
+    
+    async def idle_disconnect_task(self):
+        """Tâche de fond: met en veille les comptes dormants inactifs"""
+        from config import TELEFEED_LAZY_CONNECT, TELEFEED_IDLE_TIMEOUT
+        if not TELEFEED_LAZY_CONNECT:
+            return
+        
+        while True:
+            try:
+                await asyncio.sleep(min(60, TELEFEED_IDLE_TIMEOUT))
+                await self.disconnect_idle_clients(TELEFEED_IDLE_TIMEOUT)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"❌ Erreur dans idle_disconnect_task : {e}")
+    
+    async def _restore_session(self, phone_number):
+        """Reconnecte un compte depuis son fichier de session et active ses redirections"""
+        session_name = f"telefeed_{phone_number}"
+        
+        # Vérifier si le fichier de session existe
+        if not os.path.exists(f"{session_name}.session"):
+            print(f"⚠️ Fichier de session manquant pour {phone_number}")
+            # Marquer la session comme manquante
+            self.sessions[phone_number]['connected'] = False
+            self.sessions[phone_number]['missing_file'] = True
+            return False
+        
+        # Utiliser API_ID et API_HASH par défaut (peuvent être modifiés)
+        from config import API_ID, API_HASH
+        client = TelegramClient(session_name, API_ID, API_HASH)
+        
+        try:
+            await client.connect()
+            
+            # Vérifier si la session est toujours valide
+            authorized = await client.is_user_authorized()
+        except BaseException:
+            # Erreur, délai dépassé ou annulation: ne pas laisser la connexion ouverte
+            try:
+                await client.disconnect()
+            except Exception:
+                pass
+            raise
+        
+        if not authorized:
+            print(f"⚠️ Session expirée pour {phone_number}")
+            # Marquer la session comme expirée
+            self.sessions[phone_number]['connected'] = False
+            self.sessions[phone_number]['expired_at'] = datetime.now().isoformat()
+            try:
+                await client.disconnect()
+            except Exception:
+                pass
+            return False
+        
+        self.clients[phone_number] = client
+        self.last_used[phone_number] = time.monotonic()
+        self.preload_entities(phone_number)
+        # Marquer la session comme restaurée
+        self.sessions[phone_number]['restored_at'] = datetime.now().isoformat()
+        self.sessions[phone_number].pop('error', None)
+        
+        # Configurer les gestionnaires de redirection
+        await self.setup_redirection_handlers(client, phone_number)
+        print(f"✅ Session restaurée pour {phone_number}")
+        return True
+    
+    def preload_entities(self, phone_number):
+        """Recharge les destinations et sources résolues lors des sessions précédentes
+
+        Les pairs rechargés sont aussi donnés à la session du client: Telethon
+        retrouve ainsi leurs hash d'accès sans appel réseau.
+        """
+        try:
+            peers = self.destination_cache.preload(phone_number)
+            for record in self.entity_store.load_sources(phone_number).values():
+                peer = input_peer_from_record(record)
+                if peer is not None:
+                    peers.append(peer)
+            client = self.clients.get(phone_number)
+            if client is not None and peers:
+                client.session.process_entities(peers)
+        except Exception as e:
+            print(f"⚠️ Cache d'entités illisible pour {phone_number}: {e}")
+            return 0
+        if peers:
+            print(f"📇 {len(peers)} entités rechargées depuis le cache pour {phone_number}")
+        return len(peers)
+    
+    async def remember_sources(self, client, phone_number):
+        """Enregistre les chats sources actifs pas encore présents dans le cache d'entités"""
+        remembered = 0
+        try:
+            stored = self.entity_store.load_sources(phone_number)
+        except Exception as e:
+            print(f"⚠️ Cache d'entités illisible pour {phone_number}: {e}")
+            return 0
+        for chat_id in list(self.source_index.get(phone_number, {})):
+            if str(chat_id) in stored:
+                continue
+            try:
+                entity = await client.get_entity(chat_id)
+                self.entity_store.save_source(phone_number, chat_id, entity_record(entity, False))
+                remembered += 1
+            except Exception as e:
+                print(f"⚠️ Source {chat_id} non enregistrée ({phone_number}): {e}")
+        return remembered
     
     async def setup_redirection_handlers(self, client, phone_number):
         """Configure les gestionnaires de redirection pour un client TeleFeed"""
@@ -170,15 +697,17 @@ class TeleFeedManager:
         
         async def message_handler(event, is_edit=False):
             """Gestionnaire des messages pour redirection"""
-            # Vérifier les redirections pour ce numéro
+            # Rejeter en une seule recherche les chats qui ne sont pas des sources
+            redir_ids = self.get_redirections_for_source(phone_number, event.chat_id)
+            if not redir_ids:
+                return
+            
             redirections = self.redirections.get(phone_number, {})
+            sends = []
             
-            for redir_id, redir_data in redirections.items():
-                if not redir_data.get('active', True):
-                    continue
-                
-                # Vérifier si ce chat est dans les sources
-                if event.chat_id in redir_data.get('sources', []):
+            for redir_id in redir_ids:
+                redir_data = redirections.get(redir_id)
+                if redir_data:
                     text = event.raw_text or ''
                     
                     # Vérifier les filtres
@@ -188,137 +717,20 @@ class TeleFeedManager:
                     # Appliquer les transformations
                     processed_text = self.apply_transformations(text, phone_number, redir_id)
                     
-                    # Envoyer vers les destinations
+                    # Envoyer vers les destinations en parallèle; l'ordre est garanti
+                    # par (chat source, destination) car la place dans la file est
+                    # réservée ici, avant toute attente
                     for dest_id in redir_data.get('destinations', []):
-                        try:
-                            # Clé unique pour ce message source
-                            source_key = f"{event.chat_id}_{event.id}"
-                            
-                            if is_edit:
-                                # Message édité - essayer de modifier le message existant
-                                dest_message_id = self.message_mapping.get(source_key, {}).get(str(dest_id))
-                                if dest_message_id:
-                                    try:
-                                        # Éditer en tant que canal/groupe
-                                        await client.edit_message(
-                                            dest_id, 
-                                            dest_message_id, 
-                                            processed_text,
-                                            schedule=None
-                                        )
-                                        print(f"✅ Message édité dans {dest_id}")
-                                        continue
-                                    except Exception as e:
-                                        print(f"⚠️ Impossible d'éditer: {e}")
-                                        # Si l'édition échoue, ne pas envoyer un nouveau message
-                                        continue
-                                else:
-                                    # Pas de correspondance trouvée pour ce message édité
-                                    print(f"⚠️ Aucune correspondance trouvée pour édition {source_key}")
-                                    continue
-                            else:
-                                # Nouveau message - envoyer AUTHENTIQUEMENT comme le canal de destination
-                                try:
-                                    # Obtenir l'entité du canal de destination
-                                    destination_entity = await client.get_entity(dest_id)
-                                    
-                                    # Vérifier les permissions d'administrateur
-                                    try:
-                                        permissions = await client.get_permissions(destination_entity, 'me')
-                                        can_post_as_channel = (
-                                            permissions.is_admin and 
-                                            (hasattr(permissions, 'post_messages') and permissions.post_messages) or
-                                            (hasattr(permissions, 'send_messages') and permissions.send_messages)
-                                        )
-                                        print(f"🔍 Permissions pour {destination_entity.title}: Admin={permissions.is_admin}, Post={getattr(permissions, 'post_messages', 'N/A')}")
-                                    except Exception as perm_error:
-                                        print(f"⚠️ Erreur permissions: {perm_error}")
-                                        can_post_as_channel = False
-                                    
-                                    # MÉTHODE 1 : Envoyer comme le canal lui-même
-                                    if can_post_as_channel:
-                                        # Essayer différentes méthodes pour envoyer authentiquement
-                                        authentic_success = False
-                                        
-                                        # MÉTHODE 1: Utiliser send_message avec from_peer
-                                        try:
-                                            sent_message = await client.send_message(
-                                                destination_entity,
-                                                processed_text,
-                                                from_peer=destination_entity
-                                            )
-                                            authentic_success = True
-                                            print(f"✅ Message authentique envoyé par canal {destination_entity.title}")
-                                            
-                                        except Exception as from_peer_error:
-                                            print(f"⚠️ Échec from_peer: {from_peer_error}")
-                                            
-                                            # MÉTHODE 2: Utiliser l'API low-level
-                                            try:
-                                                from telethon.tl.functions.messages import SendMessageRequest
-                                                
-                                                result = await client(SendMessageRequest(
-                                                    peer=destination_entity,
-                                                    message=processed_text,
-                                                    silent=False
-                                                ))
-                                                
-                                                # Extraire le message depuis la réponse
-                                                sent_message = None
-                                                if hasattr(result, 'updates'):
-                                                    for update in result.updates:
-                                                        if hasattr(update, 'message'):
-                                                            sent_message = update.message
-                                                            break
-                                                
-                                                if sent_message:
-                                                    authentic_success = True
-                                                    print(f"✅ Message authentique envoyé (API directe) par {destination_entity.title}")
-                                                else:
-                                                    print(f"⚠️ Message envoyé mais pas d'objet retourné")
-                                                    
-                                            except Exception as api_error:
-                                                print(f"⚠️ Échec API directe: {api_error}")
-                                        
-                                        # FALLBACK: Message normal si authentique échoue
-                                        if not authentic_success:
-                                            sent_message = await client.send_message(
-                                                destination_entity,
-                                                processed_text,
-                                                silent=False
-                                            )
-                                            print(f"✅ Message normal envoyé vers {destination_entity.title}")
-                                    else:
-                                        # Pas d'autorisation admin - envoyer normalement
-                                        sent_message = await client.send_message(
-                                            destination_entity,
-                                            processed_text
-                                        )
-                                        print(f"✅ Message envoyé vers {destination_entity.title} (permissions limitées)")
-                                    
-                                    # Sauvegarder la correspondance pour futures éditions
-                                    if source_key not in self.message_mapping:
-                                        self.message_mapping[source_key] = {}
-                                    self.message_mapping[source_key][str(dest_id)] = sent_message.id
-                                    self.save_all_data()
-                                    
-                                except Exception as e:
-                                    print(f"❌ Erreur envoi: {e}")
-                                    try:
-                                        # Fallback: envoyer avec ID direct
-                                        sent_message = await client.send_message(dest_id, processed_text)
-                                        
-                                        if source_key not in self.message_mapping:
-                                            self.message_mapping[source_key] = {}
-                                        self.message_mapping[source_key][str(dest_id)] = sent_message.id
-                                        self.save_all_data()
-                                        
-                                        print(f"✅ Message envoyé vers {dest_id} (fallback)")
-                                    except Exception as e2:
-                                        print(f"❌ Erreur fallback: {e2}")
-                            
-                        except Exception as e:
-                            print(f"❌ Erreur redirection vers {dest_id}: {e}")
+                        sends.append(self.fanout.schedule(
+                            phone_number, event.chat_id, dest_id,
+                            functools.partial(
+                                self.forward_to_destination,
+                                client, phone_number, event.chat_id, event.id, dest_id, processed_text, is_edit
+                            )
+                        ))
+            
+            if sends:
+                await asyncio.gather(*sends)
         
         async def new_message_handler(event):
             """Gestionnaire spécifique pour nouveaux messages"""
@@ -328,10 +740,166 @@ class TeleFeedManager:
             """Gestionnaire spécifique pour messages édités"""
             await message_handler(event, is_edit=True)
         
-        # Enregistrer les gestionnaires séparés sur ce client
-        client.add_event_handler(new_message_handler, events.NewMessage)
-        client.add_event_handler(edit_message_handler, events.MessageEdited)
+        # Enregistrer les gestionnaires séparés sur ce client (remplace les précédents)
+        self.detach_redirection_handlers(phone_number)
+        self.redirection_handlers[phone_number] = {
+            'client': client,
+            'new_message': new_message_handler,
+            'edit_message': edit_message_handler,
+            'registered': False
+        }
+        self.refresh_redirection_handlers(phone_number)
         print(f"📡 Gestionnaire de redirection activé pour {phone_number} (messages + éditions)")
+        
+        # Précharger les destinations en arrière-plan (restauration / connexion)
+        self.schedule_destination_warm_up(phone_number)
+    
+    async def forward_to_destination(self, client, phone_number, source_chat_id, source_message_id,
+                                     dest_id, text, is_edit=False):
+        """Redirige un message (nouveau ou édité) vers une destination"""
+        try:
+            if is_edit:
+                # Message édité - essayer de modifier le message existant
+                dest_message_id = self.message_store.get(source_chat_id, source_message_id, dest_id)
+                if dest_message_id:
+                    try:
+                        # Éditer en tant que canal/groupe
+                        await self.get_send_queue(phone_number).submit(dest_id, functools.partial(
+                            client.edit_message,
+                            dest_id, 
+                            dest_message_id, 
+                            text,
+                            schedule=None
+                        ))
+                        print(f"✅ Message édité dans {dest_id}")
+                    except Exception as e:
+                        # Si l'édition échoue, ne pas envoyer un nouveau message
+                        print(f"⚠️ Impossible d'éditer: {e}")
+                else:
+                    # Pas de correspondance trouvée pour ce message édité
+                    print(f"⚠️ Aucune correspondance trouvée pour édition {source_chat_id}_{source_message_id}")
+            else:
+                # Nouveau message - envoyer AUTHENTIQUEMENT comme le canal de destination
+                sent_message = await self.send_new_message(client, phone_number, dest_id, text)
+                
+                # Sauvegarder la correspondance pour futures éditions
+                if sent_message:
+                    self.message_store.add(source_chat_id, source_message_id, dest_id, sent_message.id)
+                    
+        except Exception as e:
+            print(f"❌ Erreur redirection vers {dest_id}: {e}")
+    
+    async def send_new_message(self, client, phone_number, dest_id, text):
+        """Envoie un nouveau message vers une destination
+
+        La méthode d'envoi qui a fonctionné la dernière fois est essayée en
+        premier; les autres ne sont sondées qu'après un échec ou périodiquement.
+        Retourne le message envoyé, ou None si toutes les méthodes échouent.
+        """
+        try:
+            # Entité et permissions du canal de destination (en cache)
+            destination = await self.destination_cache.resolve(client, phone_number, dest_id)
+        except Exception as e:
+            print(f"❌ Erreur envoi: {e}")
+            destination = None
+        
+        methods = available_send_methods(destination)
+        for method in self.send_strategies.order(phone_number, dest_id, methods):
+            try:
+                sent_message = await self.get_send_queue(phone_number).submit(
+                    dest_id, functools.partial(SEND_METHODS[method], client, destination, dest_id, text)
+                )
+            except Exception as e:
+                print(f"⚠️ Échec {method} vers {dest_id}: {e}")
+                self.send_strategies.record_failure(phone_number, dest_id, method)
+                if is_permission_error(e):
+                    self.destination_cache.invalidate(phone_number, dest_id)
+                continue
+            
+            if sent_message:
+                self.send_strategies.record_success(phone_number, dest_id, method)
+                return sent_message
+            self.send_strategies.record_failure(phone_number, dest_id, method)
+        
+        print(f"❌ Erreur envoi vers {dest_id}: toutes les méthodes ont échoué")
+        return None
+    
+    def get_send_queue(self, phone_number):
+        """Retourne la file d'envoi du compte (créée au premier envoi)"""
+        queue = self.send_queues.get(phone_number)
+        if queue is None:
+            queue = self.send_queues[phone_number] = AccountSendQueue(phone_number)
+        return queue
+    
+    def get_send_queue_stats(self):
+        """Statistiques des files d'envoi (profondeur, attente) par compte"""
+        stats = {phone: queue.stats() for phone, queue in self.send_queues.items()}
+        if self.shards is not None:
+            stats.update(self.shards.remote_status()['queues'])
+        return stats
+    
+    def get_destinations(self, phone_number, redirection_id=None):
+        """Retourne les destinations des redirections actives d'un numéro"""
+        destinations = []
+        for redir_id, redir_data in self.redirections.get(phone_number, {}).items():
+            if redirection_id is not None and redir_id != redirection_id:
+                continue
+            if isinstance(redir_data, dict) and redir_data.get('active', True):
+                for dest_id in redir_data.get('destinations', []):
+                    if dest_id not in destinations:
+                        destinations.append(dest_id)
+        return destinations
+    
+    def schedule_destination_warm_up(self, phone_number, redirection_id=None):
+        """Lance la résolution des destinations (et des sources) en tâche de fond si le client est connecté"""
+        client = self.clients.get(phone_number)
+        if client is None or not self.owns(phone_number):
+            return None
+        
+        destinations = self.get_destinations(phone_number, redirection_id)
+        if not destinations:
+            return None
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        return loop.create_task(self.warm_up_entities(client, phone_number, destinations))
+    
+    async def warm_up_entities(self, client, phone_number, destinations):
+        """Résout les destinations puis enregistre les chats sources (tâche de fond)"""
+        warmed = await self.destination_cache.warm_up(client, phone_number, destinations)
+        await self.remember_sources(client, phone_number)
+        return warmed
+    
+    def refresh_redirection_handlers(self, phone_number):
+        """Réenregistre les gestionnaires d'un client avec le filtre des chats sources actuels"""
+        handlers = self.redirection_handlers.get(phone_number)
+        if not handlers:
+            return
+        
+        client = handlers['client']
+        if handlers['registered']:
+            client.remove_event_handler(handlers['new_message'])
+            client.remove_event_handler(handlers['edit_message'])
+            handlers['registered'] = False
+        
+        # Sans source active, aucun gestionnaire: Telethon ignore toutes les mises à jour.
+        # En mode multi-processus, seul le processus propriétaire du compte redirige.
+        sources = list(self.source_index.get(phone_number, {}))
+        if not sources or not self.owns(phone_number):
+            return
+        
+        client.add_event_handler(handlers['new_message'], events.NewMessage(chats=sources))
+        client.add_event_handler(handlers['edit_message'], events.MessageEdited(chats=sources))
+        handlers['registered'] = True
+    
+    def detach_redirection_handlers(self, phone_number):
+        """Retire les gestionnaires de redirection enregistrés pour un numéro"""
+        handlers = self.redirection_handlers.pop(phone_number, None)
+        if handlers and handlers['registered']:
+            handlers['client'].remove_event_handler(handlers['new_message'])
+            handlers['client'].remove_event_handler(handlers['edit_message'])
     
     async def connect_account(self, phone_number, api_id, api_hash):
         """Connecte un compte Telegram avec persistance automatique"""
@@ -340,6 +908,10 @@ class TeleFeedManager:
             
             # Vérifier si une session existe déjà et est valide
             if phone_number in self.sessions and self.sessions[phone_number].get('connected'):
+                if not self.owns(phone_number):
+                    # Compte déjà connecté dans son processus de travail
+                    return {'status': 'remote'}
+                
                 if phone_number in self.clients:
                     # Session déjà active
                     return {'status': 'already_connected', 'client': self.clients[phone_number]}
@@ -352,8 +924,10 @@ class TeleFeedManager:
                         
                         if await client.is_user_authorized():
                             self.clients[phone_number] = client
+                            self.last_used[phone_number] = time.monotonic()
+                            self.preload_entities(phone_number)
                             self.sessions[phone_number]['restored_at'] = datetime.now().isoformat()
-                            self.save_all_data()
+                            self.save_all_data('sessions')
                             
                             # Enregistrer le gestionnaire de redirection sur ce client restauré
                             await self.setup_redirection_handlers(client, phone_number)
@@ -380,13 +954,16 @@ class TeleFeedManager:
                 }
             else:
                 # Déjà autorisé (session valide)
-                self.clients[phone_number] = client
                 self.sessions[phone_number] = {
                     'connected': True,
                     'connected_at': datetime.now().isoformat(),
                     'session_file': f"{session_name}.session"
                 }
-                self.save_all_data()
+                if await self.hand_over(phone_number, client):
+                    return {'status': 'connected', 'client': None}
+                self.clients[phone_number] = client
+                self.last_used[phone_number] = time.monotonic()
+                self.save_all_data('sessions')
                 
                 # Enregistrer le gestionnaire de redirection sur ce client
                 await self.setup_redirection_handlers(client, phone_number)
@@ -403,7 +980,6 @@ class TeleFeedManager:
             await client.sign_in(phone_number, code, phone_code_hash=phone_code_hash)
             
             # Enregistrer le client et la session
-            self.clients[phone_number] = client
             session_name = f"telefeed_{phone_number}"
             self.sessions[phone_number] = {
                 'connected': True,
@@ -411,7 +987,11 @@ class TeleFeedManager:
                 'session_file': f"{session_name}.session",
                 'verified_with_code': True
             }
-            self.save_all_data()
+            if await self.hand_over(phone_number, client):
+                return {'status': 'connected'}
+            self.clients[phone_number] = client
+            self.last_used[phone_number] = time.monotonic()
+            self.save_all_data('sessions')
             
             # Enregistrer le gestionnaire de redirection sur ce client
             await self.setup_redirection_handlers(client, phone_number)
@@ -426,44 +1006,63 @@ class TeleFeedManager:
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
     
-    async def get_chats(self, phone_number):
-        """Récupère la liste des chats"""
-        if phone_number not in self.clients:
+    async def hand_over(self, phone_number, client):
+        """Confie un compte authentifié ici au processus qui le gère
+
+        En mode multi-processus, le bot ne se connecte que le temps de
+        l'authentification: il ferme sa connexion au fichier de session puis
+        transmet la session au processus propriétaire. Retourne False si ce
+        processus gère lui-même le compte.
+        """
+        if self.owns(phone_number):
+            return False
+        await client.disconnect()
+        self.save_all_data('sessions')
+        print(f"🧩 Compte {phone_number} confié à son processus TeleFeed")
+        return True
+    
+    async def get_chats(self, phone_number, refresh=False, query=None):
+        """Récupère la liste des chats, ou ceux dont le titre correspond à `query`
+
+        La liste complète est reprise de la dernière sauvegarde (ou chargée
+        une fois depuis Telegram), puis tenue à jour par les événements;
+        `refresh` force un rechargement.
+        En mode multi-processus, la requête est relayée au processus
+        propriétaire du compte.
+        """
+        if not self.owns(phone_number):
+            return await self.shards.request_chats(phone_number, refresh, query)
+        client = await self.ensure_connected(phone_number)
+        if client is None:
             return {'status': 'not_connected'}
             
         try:
-            client = self.clients[phone_number]
-            chats = []
-            
-            async for dialog in client.iter_dialogs(limit=100):
-                chat_data = {
-                    'id': dialog.id,
-                    'title': dialog.title or dialog.name,
-                    'type': 'unknown'
-                }
-                
-                if isinstance(dialog.entity, User):
-                    # Détecter si c'est un bot
-                    if hasattr(dialog.entity, 'bot') and dialog.entity.bot:
-                        chat_data['type'] = 'bot'
-                    else:
-                        chat_data['type'] = 'user'
-                elif isinstance(dialog.entity, Chat):
-                    chat_data['type'] = 'group'
-                elif isinstance(dialog.entity, Channel):
-                    chat_data['type'] = 'channel' if dialog.entity.broadcast else 'supergroup'
-                
-                chats.append(chat_data)
-            
-            # Sauvegarder les chats
-            self.chats[phone_number] = chats
-            self.save_all_data()
+            if refresh or not self.dialogs_known(phone_number):
+                await self.dialog_index.sync(phone_number, client)
+            else:
+                await self.dialog_index.follow(phone_number, client)
             
-            return {'status': 'success', 'chats': chats}
+            if query is not None:
+                # Recherche dans l'index des titres (sans appel à Telegram)
+                return {'status': 'success', 'chats': self.dialog_index.search(phone_number, query)}
+            return {'status': 'success', 'chats': self.dialog_index.list(phone_number)}
             
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
     
+    def dialogs_known(self, phone_number):
+        """Vrai si la liste des chats du compte est indexée (chargée depuis la sauvegarde au besoin)"""
+        if not self.dialog_index.is_synced(phone_number):
+            stored = self._load_account_entry('chats', phone_number)
+            if stored is not None:
+                self.dialog_index.load(phone_number, stored)
+        return self.dialog_index.is_synced(phone_number)
+    
+    def _dialogs_changed(self, phone_number):
+        """Sauvegarde différée de l'index des dialogues d'un compte"""
+        self.chats[phone_number] = self.dialog_index.list(phone_number)
+        self.save_all_data('chats')
+    
     def add_redirection(self, phone_number, redirection_id, sources, destinations):
         """Ajoute une redirection"""
         try:
@@ -492,7 +1091,13 @@ class TeleFeedManager:
                 'delay_spread_mode': False
             }
             
-            self.save_all_data()
+            self.rebuild_source_index(phone_number)
+            self.save_all_data('redirections', 'settings')
+            if phone_number in self.clients:
+                self.schedule_destination_warm_up(phone_number, redirection_id)
+            else:
+                # Compte en veille: le connecter pour activer la redirection
+                self.schedule_ensure_connected(phone_number)
             return True
             
         except Exception as e:
@@ -508,132 +1113,169 @@ class TeleFeedManager:
             if phone_number in self.settings and redirection_id in self.settings[phone_number]:
                 del self.settings[phone_number][redirection_id]
                 
-            self.save_all_data()
+            self.rebuild_source_index(phone_number)
+            self.invalidate_filters(phone_number, redirection_id)
+            self.invalidate_transformations(phone_number, redirection_id)
+            self.save_all_data('redirections', 'settings')
             return True
         except:
             return False
     
+    def get_transformation_pipeline(self, phone_number, redirection_id):
+        """Retourne le pipeline de transformations compilé d'une redirection"""
+        key = (phone_number, redirection_id)
+        pipeline = self.compiled_transformations.get(key)
+        if pipeline is None:
+            config = self.transformations.get(phone_number, {}).get(redirection_id)
+            pipeline = compile_transformations(config, strict=False)
+            for error in pipeline.invalid:
+                print(f"⚠️ transformation {redirection_id} ({phone_number}) - règle ignorée: {error}")
+            self.compiled_transformations[key] = pipeline
+        return pipeline
+    
+    def invalidate_transformations(self, phone_number, redirection_id=None):
+        """Invalide le pipeline compilé d'une redirection (ou de tout un numéro)"""
+        if redirection_id is not None:
+            self.compiled_transformations.pop((phone_number, redirection_id), None)
+            return
+        for key in [k for k in self.compiled_transformations if k[0] == phone_number]:
+            del self.compiled_transformations[key]
+    
+    def _check_new_rules(self, invalid, previous_invalid, label):
+        """Lève l'erreur d'une règle nouvelle; une règle invalide déjà enregistrée
+        (acceptée par les anciennes versions) est seulement signalée"""
+        known = {error.pattern for error in previous_invalid}
+        for error in invalid:
+            if error.pattern not in known:
+                raise error
+            print(f"⚠️ {label} - règle existante ignorée: {error}")
+    
+    def set_transformation(self, phone_number, redirection_id, feature, config):
+        """Valide puis enregistre une transformation (format, power, removeLines)
+
+        Seule la fonctionnalité modifiée est validée. Lève
+        TransformationRuleError si une nouvelle règle est invalide; rien n'est
+        alors modifié.
+        """
+        previous = self.transformations.get(phone_number, {}).get(redirection_id, {}).get(feature)
+        self._check_new_rules(
+            compile_transformations({feature: config}, strict=False).invalid,
+            compile_transformations({feature: previous}, strict=False).invalid if previous else [],
+            f"transformation {redirection_id} ({phone_number})"
+        )
+        
+        self.transformations.setdefault(phone_number, {}).setdefault(redirection_id, {})[feature] = config
+        self.invalidate_transformations(phone_number, redirection_id)
+        self.save_all_data('transformations')
+    
     def apply_transformations(self, text, phone_number, redirection_id):
         """Applique les transformations sur le texte"""
         if not text:
             return text
-            
-        # Format transformation
-        format_data = self.transformations.get(phone_number, {}).get(redirection_id, {}).get('format')
-        if format_data:
-            template = format_data.get('template', '[[Message.Text]]')
-            text = template.replace('[[Message.Text]]', text)
-        
-        # Power transformation
-        power_data = self.transformations.get(phone_number, {}).get(redirection_id, {}).get('power')
-        if power_data:
-            rules = power_data.get('rules', [])
-            for rule in rules:
-                if '=' in rule:
-                    # Regex rule
-                    pattern, replacement = rule.split('=', 1)
-                    try:
-                        text = re.sub(pattern, replacement, text, flags=re.MULTILINE | re.DOTALL)
-                    except:
-                        pass
-                elif '","' in rule:
-                    # Simple replacement
-                    rule = rule.strip('"')
-                    if '","' in rule:
-                        old, new = rule.split('","', 1)
-                        text = text.replace(old, new)
-        
-        # Remove lines transformation
-        remove_lines_data = self.transformations.get(phone_number, {}).get(redirection_id, {}).get('removeLines')
-        if remove_lines_data:
-            keywords = remove_lines_data.get('keywords', [])
-            lines = text.split('\n')
-            filtered_lines = []
-            
-            for line in lines:
-                should_remove = False
-                for keyword in keywords:
-                    if keyword in line:
-                        should_remove = True
-                        break
-                if not should_remove:
-                    filtered_lines.append(line)
-            
-            text = '\n'.join(filtered_lines)
-        
-        return text
+        return self.get_transformation_pipeline(phone_number, redirection_id).apply(text)
+    
+    def get_compiled_filters(self, phone_number, redirection_id):
+        """Retourne (blacklist, whitelist) compilées, construites au premier usage"""
+        key = (phone_number, redirection_id)
+        compiled = self.compiled_filters.get(key)
+        if compiled is None:
+            compiled = tuple(
+                self._compile_stored_filter(kind, phone_number, redirection_id)
+                for kind in ('blacklist', 'whitelist')
+            )
+            self.compiled_filters[key] = compiled
+        return compiled
+    
+    def _compile_stored_filter(self, kind, phone_number, redirection_id):
+        """Compile un filtre déjà enregistré en ignorant les motifs invalides"""
+        config = getattr(self, kind).get(phone_number, {}).get(redirection_id)
+        compiled = compile_filter(config, strict=False)
+        if compiled is not None:
+            for error in compiled.invalid:
+                print(f"⚠️ {kind} {redirection_id} ({phone_number}) - règle ignorée: {error}")
+        return compiled
+    
+    def invalidate_filters(self, phone_number, redirection_id=None):
+        """Invalide les filtres compilés d'une redirection (ou de tout un numéro)"""
+        if redirection_id is not None:
+            self.compiled_filters.pop((phone_number, redirection_id), None)
+            return
+        for key in [k for k in self.compiled_filters if k[0] == phone_number]:
+            del self.compiled_filters[key]
+    
+    def set_filter_rules(self, kind, phone_number, redirection_id, config):
+        """Valide puis enregistre une whitelist/blacklist
+
+        Lève FilterRuleError si un nouveau motif est invalide; rien n'est alors
+        modifié. Les motifs invalides déjà enregistrés sont conservés et ignorés.
+        """
+        previous = getattr(self, kind).get(phone_number, {}).get(redirection_id)
+        self._check_new_rules(
+            CompiledFilter(normalize_filter_config(config)[1], strict=False).invalid,
+            CompiledFilter(normalize_filter_config(previous)[1], strict=False).invalid,
+            f"{kind} {redirection_id} ({phone_number})"
+        )
+        getattr(self, kind).setdefault(phone_number, {})[redirection_id] = config
+        self.invalidate_filters(phone_number, redirection_id)
+        self.save_all_data(kind)
     
     def should_process_message(self, text, phone_number, redirection_id):
         """Vérifie si le message doit être traité (whitelist/blacklist)"""
+        blacklist, whitelist = self.get_compiled_filters(phone_number, redirection_id)
+        
         # Vérifier la blacklist
-        blacklist_data = self.blacklist.get(phone_number, {}).get(redirection_id, {})
-        if blacklist_data and blacklist_data.get('active', False):
-            patterns = blacklist_data.get('patterns', [])
-            for pattern in patterns:
-                if isinstance(pattern, str):
-                    if pattern.startswith('"') and pattern.endswith('"'):
-                        # Simple text match
-                        if pattern[1:-1] in text:
-                            return False
-                    else:
-                        # Regex match
-                        try:
-                            if re.search(pattern, text, re.MULTILINE | re.DOTALL):
-                                return False
-                        except:
-                            pass
+        if blacklist and blacklist.matches(text):
+            return False
         
-        # Vérifier la whitelist
-        whitelist_data = self.whitelist.get(phone_number, {}).get(redirection_id, {})
-        if whitelist_data and whitelist_data.get('active', False):
-            patterns = whitelist_data.get('patterns', [])
-            if patterns:
-                for pattern in patterns:
-                    if isinstance(pattern, str):
-                        if pattern.startswith('"') and pattern.endswith('"'):
-                            # Simple text match
-                            if pattern[1:-1] in text:
-                                return True
-                        else:
-                            # Regex match
-                            try:
-                                if re.search(pattern, text, re.MULTILINE | re.DOTALL):
-                                    return True
-                            except:
-                                pass
-                return False  # Whitelist active but no match
+        # Vérifier la whitelist (active mais sans correspondance = rejet)
+        if whitelist:
+            return whitelist.matches(text)
         
         return True
     
     def get_session_status(self, phone_number=None):
         """Récupère le statut des sessions"""
+        connection_states = self.get_connection_states()
+        active_clients = set(self.clients)
+        if self.shards is not None:
+            active_clients.update(self.shards.remote_status()['clients'])
+        
         if phone_number:
             # Statut d'une session spécifique
             session_data = self.sessions.get(phone_number, {})
-            is_connected = phone_number in self.clients
+            is_connected = phone_number in active_clients
             return {
                 'phone_number': phone_number,
                 'connected': is_connected,
                 'session_data': session_data,
-                'has_client': is_connected
+                'has_client': is_connected,
+                'connection': connection_states.get(phone_number)
             }
         else:
             # Statut de toutes les sessions
             status = {
                 'total_sessions': len(self.sessions),
-                'active_clients': len(self.clients),
+                'active_clients': len(active_clients),
                 'sessions': {}
             }
             
             for phone, session_data in self.sessions.items():
-                is_connected = phone in self.clients
+                is_connected = phone in active_clients
                 status['sessions'][phone] = {
                     'connected': is_connected,
                     'session_data': session_data,
-                    'has_client': is_connected
+                    'has_client': is_connected,
+                    'connection': connection_states.get(phone)
                 }
             
             return status
+    
+    def get_connection_states(self):
+        """États de connexion par compte (connected, reconnecting, auth_revoked)"""
+        states = self.supervisor.get_states()
+        if self.shards is not None:
+            states.update(self.shards.remote_status()['connection'])
+        return states
 
 # Instance globale
 telefeed_manager = TeleFeedManager()
@@ -641,10 +1283,13 @@ telefeed_manager = TeleFeedManager()
 async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
     """Enregistre tous les handlers TeleFeed et les redirections."""
     
+    # Toutes les commandes passent par le routeur du bot (un seul gestionnaire de messages)
+    router = get_router(bot)
+    
     # Dictionnaire global pour stocker les connexions en attente
     pending_connections = {}
     
-    @bot.on(events.NewMessage(pattern=r'/connect (\d+)'))
+    @router.on('/connect', r'/connect (\d+)')
     async def connect_handler(event):
         """Handler pour connecter un compte TeleFeed"""
         if not is_user_authorized(event.sender_id):
@@ -681,6 +1326,9 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
             elif result['status'] == 'restored':
                 await event.reply(f"✅ Session {phone_number} restaurée automatiquement!")
                 
+            elif result['status'] == 'remote':
+                await event.reply(f"✅ Compte {phone_number} déjà connecté (géré par un processus TeleFeed séparé)")
+                
             else:
                 error_msg = result.get('message', 'Connexion échouée')
                 if 'A wait of' in error_msg and 'seconds is required' in error_msg:
@@ -711,7 +1359,7 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
         except Exception as e:
             await event.reply(f"❌ Erreur lors de la connexion: {str(e)}")
     
-    @bot.on(events.NewMessage(pattern=r'^aa(\d+)$'))
+    @router.on('aa', r'^aa(\d+)$')
     async def verify_code_handler(event):
         """Handler pour vérifier le code d'authentification TeleFeed"""
         if not is_user_authorized(event.sender_id):
@@ -771,18 +1419,25 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
             if user_id in pending_connections:
                 del pending_connections[user_id]
     
-    @bot.on(events.NewMessage(pattern=r'/sessions'))
+    @router.on('/sessions')
     async def sessions_status_handler(event):
         """Handler pour afficher le statut des sessions (admin seulement)"""
         if event.sender_id != ADMIN_ID:
             return
         
         status = telefeed_manager.get_session_status()
+        queue_stats = telefeed_manager.get_send_queue_stats()
+        persistence = telefeed_manager.get_persistence_stats()
         
         message = "📊 **STATUT DES SESSIONS TELEFEED**\n\n"
         message += f"📈 **Résumé:**\n"
         message += f"• Sessions enregistrées: {status['total_sessions']}\n"
-        message += f"• Clients actifs: {status['active_clients']}\n\n"
+        message += f"• Clients actifs: {status['active_clients']}\n"
+        message += f"• Sauvegardes: {persistence['flushes']} ({persistence['files_written']} fichiers écrits)\n"
+        if telefeed_manager.restore_report:
+            report = telefeed_manager.restore_report
+            message += f"• Démarrage: {report['restored']}/{report['total']} restaurées en {report['total_time']}s\n"
+        message += "\n"
         
         if status['sessions']:
             message += "📱 **Détails des sessions:**\n\n"
@@ -790,7 +1445,12 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                 if phone.startswith('temp_'):
                     continue  # Ignorer les sessions temporaires
                     
-                icon = "✅" if session_info['connected'] else "❌"
+                if session_info['connected']:
+                    icon = "✅"
+                elif session_info['session_data'].get('connected'):
+                    icon = "💤"  # Compte en veille, connecté à la demande
+                else:
+                    icon = "❌"
                 message += f"{icon} **{phone}**\n"
                 
                 session_data = session_info['session_data']
@@ -800,6 +1460,14 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                     message += f"   🔄 Restauré: {session_data['restored_at'][:16]}\n"
                 if 'session_file' in session_data:
                     message += f"   💾 Fichier: {session_data['session_file']}\n"
+                if session_info['connection']:
+                    connection = session_info['connection']
+                    message += f"   📶 État: {connection['state']} depuis {connection['since'][:16]}\n"
+                if phone in queue_stats:
+                    stats = queue_stats[phone]
+                    message += f"   📤 File: {stats['depth']} en attente, {stats['sent']} envoyés, attente moy. {stats['average_wait']}s\n"
+                    if stats['paused_for']:
+                        message += f"   ⏳ FloodWait: reprise dans {stats['paused_for']}s\n"
                 
                 message += "\n"
         else:
@@ -812,7 +1480,7 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
         
         await event.reply(message, parse_mode='markdown')
     
-    @bot.on(events.NewMessage(pattern=r'/permissions (-?\d+)'))
+    @router.on('/permissions', r'/permissions (-?\d+)')
     async def check_permissions_handler(event):
         """Handler pour vérifier les permissions dans un canal (admin seulement)"""
         if event.sender_id != ADMIN_ID:
@@ -851,7 +1519,7 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
         except Exception as e:
             await event.reply(f"❌ Erreur : {e}")
     
-    @bot.on(events.NewMessage(pattern=r'/chats_old(?:\s+(.*))?'))
+    @router.on('/chats_old', r'/chats_old(?:\s+(.*))?')
     async def chats_handler_old(event):
         """Handler pour lister les chats - Format identique aux captures d'écran"""
         if not is_user_authorized(event.sender_id):
@@ -983,269 +1651,7 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
         else:
             await event.reply(f"❌ Erreur: {result.get('message', 'Impossible de récupérer les chats')}")
     
-    @bot.on(events.NewMessage(pattern=r'/redirection add (\w+) on (\d+)'))
-    async def add_redirection_handler(event):
-        """Handler pour ajouter une redirection"""
-        if not is_user_authorized(event.sender_id):
-            await event.reply("❌ Vous devez avoir une licence active pour utiliser TeleFeed.")
-            return
-        
-        redirection_id = event.pattern_match.group(1)
-        phone_number = event.pattern_match.group(2)
-        
-        await event.reply(
-            f"🔄 Configuration de la redirection **{redirection_id}**\n\n"
-            f"📝 Envoyez maintenant les IDs au format:\n"
-            f"**SOURCE - DESTINATION**\n\n"
-            f"📋 Exemples:\n"
-            f"• `123456789 - 987654321`\n"
-            f"• `123,456 - 789,012`\n"
-            f"• Utilisez /chats {phone_number} pour voir les IDs",
-            parse_mode='markdown'
-        )
-        
-        # Attendre la réponse
-        # Variables pour stocker la réponse
-        response_future = asyncio.Future()
-        
-        async def response_handler(response_event):
-            if (response_event.sender_id == event.sender_id and 
-                response_event.chat_id == event.chat_id and 
-                ' - ' in response_event.raw_text):
-                if not response_future.done():
-                    response_future.set_result(response_event)
-                    bot.remove_event_handler(response_handler)
-        
-        # Ajouter le gestionnaire temporaire
-        bot.add_event_handler(response_handler, events.NewMessage)
-        
-        try:
-            response = await asyncio.wait_for(response_future, timeout=60)
-            
-            # Parser la réponse
-            parts = response.raw_text.split(' - ')
-            if len(parts) != 2:
-                await event.reply("❌ Format invalide. Utilisez: SOURCE - DESTINATION")
-                return
-            
-            sources = [int(x.strip()) for x in parts[0].split(',')]
-            destinations = [int(x.strip()) for x in parts[1].split(',')]
-            
-            if telefeed_manager.add_redirection(phone_number, redirection_id, sources, destinations):
-                await event.reply(f"✅ Redirection **{redirection_id}** créée avec succès!")
-            else:
-                await event.reply("❌ Erreur lors de la création de la redirection.")
-                
-        except asyncio.TimeoutError:
-            await event.reply("⏰ Timeout. Recommencez la configuration.")
-        except ValueError:
-            await event.reply("❌ IDs invalides. Utilisez uniquement des nombres.")
-    
-    @bot.on(events.NewMessage(pattern=r'/redirection remove (\w+) on (\d+)'))
-    async def remove_redirection_handler(event):
-        """Handler pour supprimer une redirection"""
-        if not is_user_authorized(event.sender_id):
-            await event.reply("❌ Vous devez avoir une licence active pour utiliser TeleFeed.")
-            return
-        
-        redirection_id = event.pattern_match.group(1)
-        phone_number = event.pattern_match.group(2)
-        
-        if telefeed_manager.remove_redirection(phone_number, redirection_id):
-            await event.reply(f"✅ Redirection **{redirection_id}** supprimée.")
-        else:
-            await event.reply("❌ Redirection non trouvée.")
-    
-    @bot.on(events.NewMessage(pattern=r'/redirection (\d+)'))
-    async def list_redirections_handler(event):
-        """Handler pour lister les redirections"""
-        if not is_user_authorized(event.sender_id):
-            await event.reply("❌ Vous devez avoir une licence active pour utiliser TeleFeed.")
-            return
-        
-        phone_number = event.pattern_match.group(1)
-        
-        redirections = telefeed_manager.redirections.get(phone_number, {})
-        
-        if not redirections:
-            await event.reply(f"📭 Aucune redirection active pour {phone_number}")
-            return
-        
-        message = f"🔄 **Redirections actives pour {phone_number}:**\n\n"
-        
-        for redir_id, data in redirections.items():
-            status = "✅" if data.get('active', True) else "❌"
-            sources = ', '.join(map(str, data.get('sources', [])))
-            destinations = ', '.join(map(str, data.get('destinations', [])))
-            
-            message += f"{status} **{redir_id}**\n"
-            message += f"📤 Sources: `{sources}`\n"
-            message += f"📥 Destinations: `{destinations}`\n\n"
-        
-        await event.reply(message, parse_mode='markdown')
-    
-    @bot.on(events.NewMessage(pattern=r'/transformation add (\w+) (\w+) on (\d+)'))
-    async def add_transformation_handler(event):
-        """Handler pour ajouter une transformation"""
-        if not is_user_authorized(event.sender_id):
-            await event.reply("❌ Vous devez avoir une licence active pour utiliser TeleFeed.")
-            return
-        
-        feature = event.pattern_match.group(1)
-        redirection_id = event.pattern_match.group(2)
-        phone_number = event.pattern_match.group(3)
-        
-        if feature not in ['format', 'power', 'removeLines']:
-            await event.reply("❌ Fonctionnalité non supportée. Utilisez: format, power, removeLines")
-            return
-        
-        await event.reply(
-            f"⚙️ Configuration de la transformation **{feature}** pour **{redirection_id}**\n\n"
-            f"📝 Envoyez maintenant votre configuration:"
-        )
-        
-        # Variables pour stocker la réponse
-        response_future = asyncio.Future()
-        
-        async def response_handler(response_event):
-            if (response_event.sender_id == event.sender_id and 
-                response_event.chat_id == event.chat_id):
-                if not response_future.done():
-                    response_future.set_result(response_event)
-                    bot.remove_event_handler(response_handler)
-        
-        # Ajouter le gestionnaire temporaire
-        bot.add_event_handler(response_handler, events.NewMessage)
-        
-        try:
-            response = await asyncio.wait_for(response_future, timeout=120)
-            
-            # Initialiser la structure si nécessaire
-            if phone_number not in telefeed_manager.transformations:
-                telefeed_manager.transformations[phone_number] = {}
-            if redirection_id not in telefeed_manager.transformations[phone_number]:
-                telefeed_manager.transformations[phone_number][redirection_id] = {}
-            
-            # Configurer selon le type de transformation
-            if feature == 'format':
-                telefeed_manager.transformations[phone_number][redirection_id]['format'] = {
-                    'template': response.raw_text,
-                    'active': True
-                }
-            elif feature == 'power':
-                rules = response.raw_text.split('\n')
-                telefeed_manager.transformations[phone_number][redirection_id]['power'] = {
-                    'rules': rules,
-                    'active': True
-                }
-            elif feature == 'removeLines':
-                keywords = [k.strip() for k in response.raw_text.split(',')]
-                telefeed_manager.transformations[phone_number][redirection_id]['removeLines'] = {
-                    'keywords': keywords,
-                    'active': True
-                }
-            
-            telefeed_manager.save_all_data()
-            await event.reply(f"✅ Transformation **{feature}** configurée pour **{redirection_id}**!")
-            
-        except asyncio.TimeoutError:
-            await event.reply("⏰ Timeout. Recommencez la configuration.")
-    
-    @bot.on(events.NewMessage(pattern=r'/whitelist add (\w+) on (\d+)'))
-    async def add_whitelist_handler(event):
-        """Handler pour ajouter une whitelist"""
-        if not is_user_authorized(event.sender_id):
-            await event.reply("❌ Vous devez avoir une licence active pour utiliser TeleFeed.")
-            return
-        
-        redirection_id = event.pattern_match.group(1)
-        phone_number = event.pattern_match.group(2)
-        
-        await event.reply(
-            f"⚪ Configuration de la whitelist pour **{redirection_id}**\n\n"
-            f"📝 Envoyez les mots-clés (un par ligne):"
-        )
-        
-        # Variables pour stocker la réponse
-        response_future = asyncio.Future()
-        
-        async def response_handler(response_event):
-            if (response_event.sender_id == event.sender_id and 
-                response_event.chat_id == event.chat_id):
-                if not response_future.done():
-                    response_future.set_result(response_event)
-                    bot.remove_event_handler(response_handler)
-        
-        # Ajouter le gestionnaire temporaire
-        bot.add_event_handler(response_handler, events.NewMessage)
-        
-        try:
-            response = await asyncio.wait_for(response_future, timeout=60)
-            
-            patterns = response.raw_text.split('\n')
-            
-            if phone_number not in telefeed_manager.whitelist:
-                telefeed_manager.whitelist[phone_number] = {}
-            
-            telefeed_manager.whitelist[phone_number][redirection_id] = {
-                'patterns': patterns,
-                'active': True
-            }
-            
-            telefeed_manager.save_all_data()
-            await event.reply(f"✅ Whitelist configurée pour **{redirection_id}**!")
-            
-        except asyncio.TimeoutError:
-            await event.reply("⏰ Timeout. Recommencez la configuration.")
-    
-    @bot.on(events.NewMessage(pattern=r'/blacklist add (\w+) on (\d+)'))
-    async def add_blacklist_handler(event):
-        """Handler pour ajouter une blacklist"""
-        if not is_user_authorized(event.sender_id):
-            await event.reply("❌ Vous devez avoir une licence active pour utiliser TeleFeed.")
-            return
-        
-        redirection_id = event.pattern_match.group(1)
-        phone_number = event.pattern_match.group(2)
-        
-        await event.reply(
-            f"⚫ Configuration de la blacklist pour **{redirection_id}**\n\n"
-            f"📝 Envoyez les mots-clés à bloquer (un par ligne):"
-        )
-        
-        # Variables pour stocker la réponse
-        response_future = asyncio.Future()
-        
-        async def response_handler(response_event):
-            if (response_event.sender_id == event.sender_id and 
-                response_event.chat_id == event.chat_id):
-                if not response_future.done():
-                    response_future.set_result(response_event)
-                    bot.remove_event_handler(response_handler)
-        
-        # Ajouter le gestionnaire temporaire
-        bot.add_event_handler(response_handler, events.NewMessage)
-        
-        try:
-            response = await asyncio.wait_for(response_future, timeout=60)
-            
-            patterns = response.raw_text.split('\n')
-            
-            if phone_number not in telefeed_manager.blacklist:
-                telefeed_manager.blacklist[phone_number] = {}
-            
-            telefeed_manager.blacklist[phone_number][redirection_id] = {
-                'patterns': patterns,
-                'active': True
-            }
-            
-            telefeed_manager.save_all_data()
-            await event.reply(f"✅ Blacklist configurée pour **{redirection_id}**!")
-            
-        except asyncio.TimeoutError:
-            await event.reply("⏰ Timeout. Recommencez la configuration.")
-    
-    @bot.on(events.NewMessage(pattern=r'/telefeed'))
+    @router.on('/telefeed')
     async def telefeed_help_handler(event):
         """Handler pour l'aide TeleFeed"""
         if not is_user_authorized(event.sender_id):
@@ -1257,7 +1663,8 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
 
 **📱 Connexion:**
 • `/connect <numéro>` - Connecter un compte
-• `/chats <numéro>` - Voir les chats disponibles
+• `/chats <numéro>` - Voir les chats disponibles (`/chats <numéro> refresh` pour recharger)
+• `/chats <numéro> <recherche>` - Chercher un chat par son titre
 
 **🔄 Redirections:**
 • `/redirection add <nom> on <numéro>` - Ajouter
@@ -1284,45 +1691,8 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
         
         await event.reply(help_message, parse_mode='markdown')
     
-    # Handler pour les messages redirigés
-    async def handle_message_redirection(event):
-        """Gestionnaire principal pour les redirections de messages"""
-        # Vérifier tous les comptes connectés
-        for phone_number, client in telefeed_manager.clients.items():
-            if client == event.client:
-                # Vérifier les redirections pour ce numéro
-                redirections = telefeed_manager.redirections.get(phone_number, {})
-                
-                for redir_id, redir_data in redirections.items():
-                    if not redir_data.get('active', True):
-                        continue
-                    
-                    # Vérifier si ce chat est dans les sources
-                    if event.chat_id in redir_data.get('sources', []):
-                        text = event.raw_text or ''
-                        
-                        # Vérifier les filtres
-                        if not telefeed_manager.should_process_message(text, phone_number, redir_id):
-                            continue
-                        
-                        # Appliquer les transformations
-                        processed_text = telefeed_manager.apply_transformations(text, phone_number, redir_id)
-                        
-                        # Envoyer vers les destinations
-                        for dest_id in redir_data.get('destinations', []):
-                            try:
-                                await client.send_message(dest_id, processed_text)
-                            except Exception as e:
-                                print(f"Erreur lors de l'envoi vers {dest_id}: {e}")
-    
-    # Enregistrer le handler pour tous les messages
-    @bot.on(events.NewMessage)
-    async def handle_message_edited(event):
-        """Gestionnaire des messages édités sans indication"""
-        await handle_message_redirection(event)
-    
     # Commande /export - Envoie tous les fichiers du projet (admin)
-    @bot.on(events.NewMessage(pattern='/export'))
+    @router.on('/export')
     async def export_command(event):
         user_id = str(event.sender_id)
         if user_id not in ADMIN_IDS:
@@ -1377,7 +1747,7 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
             print(f"Erreur export: {e}")
 
     # Commande /files - Liste tous les fichiers du projet (admin)
-    @bot.on(events.NewMessage(pattern='/files'))
+    @router.on('/files')
     async def files_command(event):
         user_id = str(event.sender_id)
         if user_id not in ADMIN_IDS:
@@ -1420,7 +1790,7 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
             await event.respond(current_message)
 
     # Commande /backup - Sauvegarde de tous les fichiers de configuration (admin)
-    @bot.on(events.NewMessage(pattern='/backup'))
+    @router.on('/backup')
     async def backup_command(event):
         user_id = str(event.sender_id)
         if user_id not in ADMIN_IDS:
@@ -1455,7 +1825,10 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                 'telefeed_chats.json',
                 'telefeed_delay.json',
                 'telefeed_message_mapping.json',
+                'telefeed_messages.db',
+                'telefeed_config.db',
                 'users.json',
+                'users.db',
                 'redirections.json',
                 'filters.json',
                 'format.json',
@@ -1491,7 +1864,7 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
             print(f"Erreur backup: {e}")
 
     # Commande /redirection
-    @bot.on(events.NewMessage(pattern=r'/redirection (.*)'))
+    @router.on('/redirection', r'/redirection (.*)')
     async def redirection_handler(event):
         """Handler pour la commande /redirection"""
         if not is_user_authorized(event.sender_id):
@@ -1536,6 +1909,8 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                 phone = ' '.join(parts[on_index + 1:])
                 
                 if action == 'add':
+                    # Réveiller un compte en veille pendant la saisie des IDs
+                    telefeed_manager.schedule_ensure_connected(phone)
                     await event.reply(
                         f"📡 Configuration de la redirection **{redirection_id}** pour {phone}\n\n"
                         f"Envoyez les IDs de chat selon la syntaxe:\n"
@@ -1547,12 +1922,7 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                         parse_mode='markdown'
                     )
                     # Stocker l'état en attente
-                    telefeed_manager.sessions[f"pending_redirection_{event.sender_id}"] = {
-                        'action': action,
-                        'redirection_id': redirection_id,
-                        'phone': phone,
-                        'timestamp': datetime.now().isoformat()
-                    }
+                    conversations.start(event.sender_id, 'redirection', action=action, redirection_id=redirection_id, phone=phone)
                     
                 elif action == 'remove':
                     success = telefeed_manager.remove_redirection(phone, redirection_id)
@@ -1569,24 +1939,15 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                         parse_mode='markdown'
                     )
                     # Stocker l'état en attente
-                    telefeed_manager.sessions[f"pending_redirection_{event.sender_id}"] = {
-                        'action': action,
-                        'redirection_id': redirection_id,
-                        'phone': phone,
-                        'timestamp': datetime.now().isoformat()
-                    }
+                    conversations.start(event.sender_id, 'redirection', action=action, redirection_id=redirection_id, phone=phone)
             else:
                 await event.reply("❌ Syntaxe incorrecte. Utilisez: /redirection action redirectionid on phonenumber")
         else:
             await event.reply("❌ Syntaxe incorrecte. Utilisez: /redirection PHONE ou /redirection action redirectionid on phonenumber")
     
     # Handler pour traiter les réponses aux commandes en attente
-    @bot.on(events.NewMessage())
     async def pending_commands_handler(event):
         """Handler pour traiter les commandes en attente"""
-        if not is_user_authorized(event.sender_id):
-            return
-        
         user_id = event.sender_id
         text = event.raw_text
         
@@ -1594,11 +1955,14 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
         if text.startswith('/'):
             return
         
+        # Une seule recherche: la conversation en cours de l'utilisateur
+        conversation = conversations.get(user_id)
+        if conversation is None or not is_user_authorized(user_id):
+            return
+        pending_data = conversation.data
+        
         # Vérifier s'il y a une commande redirection en attente
-        pending_key = f"pending_redirection_{user_id}"
-        if pending_key in telefeed_manager.sessions:
-            pending_data = telefeed_manager.sessions[pending_key]
-            
+        if conversation.kind == 'redirection':
             # Traiter la syntaxe SOURCE - DESTINATION
             if ' - ' in text:
                 try:
@@ -1639,7 +2003,7 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                             await event.reply("❌ Erreur lors de la configuration de la redirection")
                         
                         # Nettoyer l'état en attente
-                        del telefeed_manager.sessions[pending_key]
+                        conversations.finish(user_id)
                     else:
                         await event.reply("❌ IDs invalides. Utilisez uniquement des nombres.")
                         
@@ -1650,24 +2014,18 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                 pass
         
         # Vérifier s'il y a une commande transformation en attente
-        pending_key = f"pending_transformation_{user_id}"
-        if pending_key in telefeed_manager.sessions:
-            pending_data = telefeed_manager.sessions[pending_key]
+        elif conversation.kind == 'transformation':
             feature = pending_data['feature']
             
             # Traiter selon le type de transformation
             try:
                 if feature == 'format':
                     # Stocker le format
-                    if pending_data['phone'] not in telefeed_manager.transformations:
-                        telefeed_manager.transformations[pending_data['phone']] = {}
-                    if pending_data['redirection_id'] not in telefeed_manager.transformations[pending_data['phone']]:
-                        telefeed_manager.transformations[pending_data['phone']][pending_data['redirection_id']] = {}
-                    
-                    telefeed_manager.transformations[pending_data['phone']][pending_data['redirection_id']]['format'] = {
-                        'template': text
-                    }
-                    telefeed_manager.save_all_data()
+                    telefeed_manager.set_transformation(
+                        pending_data['phone'], pending_data['redirection_id'], 'format', {
+                            'template': text
+                        }
+                    )
                     
                     await event.reply(
                         f"✅ Format configuré pour **{pending_data['redirection_id']}**\n\n"
@@ -1679,15 +2037,11 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                     # Stocker les mots-clés à supprimer
                     keywords = [line.strip() for line in text.split('\n') if line.strip()]
                     
-                    if pending_data['phone'] not in telefeed_manager.transformations:
-                        telefeed_manager.transformations[pending_data['phone']] = {}
-                    if pending_data['redirection_id'] not in telefeed_manager.transformations[pending_data['phone']]:
-                        telefeed_manager.transformations[pending_data['phone']][pending_data['redirection_id']] = {}
-                    
-                    telefeed_manager.transformations[pending_data['phone']][pending_data['redirection_id']]['removeLines'] = {
-                        'keywords': keywords
-                    }
-                    telefeed_manager.save_all_data()
+                    telefeed_manager.set_transformation(
+                        pending_data['phone'], pending_data['redirection_id'], 'removeLines', {
+                            'keywords': keywords
+                        }
+                    )
                     
                     await event.reply(
                         f"✅ RemoveLines configuré pour **{pending_data['redirection_id']}**\n\n"
@@ -1699,15 +2053,11 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                     # Stocker les règles de remplacement
                     rules = [line.strip() for line in text.split('\n') if line.strip()]
                     
-                    if pending_data['phone'] not in telefeed_manager.transformations:
-                        telefeed_manager.transformations[pending_data['phone']] = {}
-                    if pending_data['redirection_id'] not in telefeed_manager.transformations[pending_data['phone']]:
-                        telefeed_manager.transformations[pending_data['phone']][pending_data['redirection_id']] = {}
-                    
-                    telefeed_manager.transformations[pending_data['phone']][pending_data['redirection_id']]['power'] = {
-                        'rules': rules
-                    }
-                    telefeed_manager.save_all_data()
+                    telefeed_manager.set_transformation(
+                        pending_data['phone'], pending_data['redirection_id'], 'power', {
+                            'rules': rules
+                        }
+                    )
                     
                     await event.reply(
                         f"✅ Power configuré pour **{pending_data['redirection_id']}**\n\n"
@@ -1716,24 +2066,19 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                     )
                 
                 # Nettoyer l'état en attente
-                del telefeed_manager.sessions[pending_key]
+                conversations.finish(user_id)
                 
             except Exception as e:
                 await event.reply(f"❌ Erreur lors de la configuration: {str(e)}")
         
         # Vérifier s'il y a une commande whitelist en attente
-        pending_key = f"pending_whitelist_{user_id}"
-        if pending_key in telefeed_manager.sessions:
-            pending_data = telefeed_manager.sessions[pending_key]
-            
+        elif conversation.kind == 'whitelist':
             try:
                 rules = [line.strip() for line in text.split('\n') if line.strip()]
                 
-                if pending_data['phone'] not in telefeed_manager.whitelist:
-                    telefeed_manager.whitelist[pending_data['phone']] = {}
-                
-                telefeed_manager.whitelist[pending_data['phone']][pending_data['redirection_id']] = rules
-                telefeed_manager.save_all_data()
+                telefeed_manager.set_filter_rules(
+                    'whitelist', pending_data['phone'], pending_data['redirection_id'], rules
+                )
                 
                 await event.reply(
                     f"✅ Whitelist configurée pour **{pending_data['redirection_id']}**\n\n"
@@ -1742,21 +2087,18 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                 )
                 
                 # Nettoyer l'état en attente
-                del telefeed_manager.sessions[pending_key]
+                conversations.finish(user_id)
                 
             except Exception as e:
                 await event.reply(f"❌ Erreur lors de la configuration: {str(e)}")
         
         # Vérifier s'il y a une redirection GUI en attente
-        pending_key = f"gui_redirection_{user_id}"
-        if pending_key in telefeed_manager.sessions:
-            pending_data = telefeed_manager.sessions[pending_key]
-            
+        elif conversation.kind == 'gui_redirection':
             try:
                 if 'redirection_name' not in pending_data:
                     # Première étape : nom de la redirection
                     pending_data['redirection_name'] = text.strip()
-                    telefeed_manager.sessions[pending_key] = pending_data
+                    conversations.touch(user_id)
                     
                     await event.reply(
                         f"✅ Nom de redirection: **{text.strip()}**\n\n"
@@ -1803,29 +2145,23 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                             await event.reply("❌ Erreur lors de la création de la redirection")
                         
                         # Nettoyer l'état
-                        del telefeed_manager.sessions[pending_key]
+                        conversations.finish(user_id)
                     else:
                         await event.reply("❌ IDs invalides. Utilisez uniquement des nombres.")
                         
             except Exception as e:
                 await event.reply(f"❌ Erreur: {str(e)}")
                 # Nettoyer en cas d'erreur
-                if pending_key in telefeed_manager.sessions:
-                    del telefeed_manager.sessions[pending_key]
+                conversations.finish(user_id)
         
         # Vérifier s'il y a une commande blacklist en attente
-        pending_key = f"pending_blacklist_{user_id}"
-        if pending_key in telefeed_manager.sessions:
-            pending_data = telefeed_manager.sessions[pending_key]
-            
+        elif conversation.kind == 'blacklist':
             try:
                 rules = [line.strip() for line in text.split('\n') if line.strip()]
                 
-                if pending_data['phone'] not in telefeed_manager.blacklist:
-                    telefeed_manager.blacklist[pending_data['phone']] = {}
-                
-                telefeed_manager.blacklist[pending_data['phone']][pending_data['redirection_id']] = rules
-                telefeed_manager.save_all_data()
+                telefeed_manager.set_filter_rules(
+                    'blacklist', pending_data['phone'], pending_data['redirection_id'], rules
+                )
                 
                 await event.reply(
                     f"✅ Blacklist configurée pour **{pending_data['redirection_id']}**\n\n"
@@ -1834,30 +2170,52 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                 )
                 
                 # Nettoyer l'état en attente
-                del telefeed_manager.sessions[pending_key]
+                conversations.finish(user_id)
                 
             except Exception as e:
                 await event.reply(f"❌ Erreur lors de la configuration: {str(e)}")
     
+    router.add_text(pending_commands_handler)
+    
     # Commande /chats
-    @bot.on(events.NewMessage(pattern=r'/chats (\d+)'))
+    @router.on('/chats', r'/chats (\d+)(?:\s+(.+?))?\s*$')
     async def chats_handler(event):
-        """Handler pour afficher les chats d'un numéro"""
+        """Handler pour afficher les chats d'un numéro (`refresh` pour recharger, sinon recherche)"""
         if not is_user_authorized(event.sender_id):
             await event.reply("❌ Vous devez avoir une licence active pour utiliser TeleFeed.")
             return
         
         phone_number = event.pattern_match.group(1)
+        argument = event.pattern_match.group(2)
+        refresh = argument == 'refresh'
+        query = argument if argument and not refresh else None
         
-        if phone_number not in telefeed_manager.clients:
-            await event.reply(f"❌ Compte {phone_number} non connecté. Utilisez /connect {phone_number}")
-            return
-        
-        await event.reply("📋 Récupération des chats...")
-        
-        result = await telefeed_manager.get_chats(phone_number)
-        
-        if result['status'] == 'success':
+        if telefeed_manager.owns(phone_number):
+            if await telefeed_manager.ensure_connected(phone_number) is None:
+                await event.reply(f"❌ Compte {phone_number} non connecté. Utilisez /connect {phone_number}")
+                return
+            if refresh or not telefeed_manager.dialogs_known(phone_number):
+                await event.reply("📋 Récupération des chats...")
+        elif refresh:
+            # Compte géré par un autre processus: la requête lui est relayée
+            await event.reply("📋 Récupération des chats...")
+        
+        result = await telefeed_manager.get_chats(phone_number, refresh=refresh, query=query)
+        
+        if result['status'] == 'success' and query:
+            matches = result['chats']
+            if not matches:
+                await event.reply(f"🔍 Aucun chat ne correspond à « {query} ».")
+                return
+            
+            type_icons = {'channel': '📺', 'supergroup': '👥', 'group': '🏠', 'user': '👤', 'bot': '🤖'}
+            message = f"🔍 **Chats correspondant à « {query} »**\n\n"
+            for chat in matches:
+                message += f"{type_icons.get(chat['type'], '•')} {chat['title']} (`{chat['id']}`)\n"
+            message += f"\n📝 Utilisez les IDs entre parenthèses pour /redirection"
+            await event.reply(message, parse_mode='markdown')
+            
+        elif result['status'] == 'success':
             chats = result['chats']
             
             if not chats:
@@ -1897,15 +2255,20 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                 message += "\n"
             
             message += f"💡 **Total:** {len(chats)} chats\n"
+            message += f"🔍 `/chats {phone_number} <titre>` pour chercher un chat\n"
+            message += f"🔄 `/chats {phone_number} refresh` pour recharger la liste\n"
             message += f"📝 Utilisez les IDs entre parenthèses pour /redirection"
             
             await event.reply(message, parse_mode='markdown')
             
+        elif result['status'] == 'not_connected':
+            await event.reply(f"❌ Compte {phone_number} non connecté. Utilisez /connect {phone_number}")
+            
         else:
             await event.reply(f"❌ Erreur: {result.get('message', 'Impossible de récupérer les chats')}")
     
     # Commande /transformation
-    @bot.on(events.NewMessage(pattern=r'/transformation (.*)'))
+    @router.on('/transformation', r'/transformation (.*)')
     async def transformation_handler(event):
         """Handler pour la commande /transformation"""
         if not is_user_authorized(event.sender_id):
@@ -1945,13 +2308,7 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                         parse_mode='markdown'
                     )
                     # Stocker l'état en attente
-                    telefeed_manager.sessions[f"pending_transformation_{event.sender_id}"] = {
-                        'action': action,
-                        'feature': feature,
-                        'redirection_id': redirection_id,
-                        'phone': phone,
-                        'timestamp': datetime.now().isoformat()
-                    }
+                    conversations.start(event.sender_id, 'transformation', action=action, feature=feature, redirection_id=redirection_id, phone=phone)
                     
                 elif action == 'remove':
                     # Supprimer la transformation
@@ -1959,7 +2316,8 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                         if redirection_id in telefeed_manager.transformations[phone]:
                             if feature in telefeed_manager.transformations[phone][redirection_id]:
                                 del telefeed_manager.transformations[phone][redirection_id][feature]
-                                telefeed_manager.save_all_data()
+                                telefeed_manager.invalidate_transformations(phone, redirection_id)
+                                telefeed_manager.save_all_data('transformations')
                                 await event.reply(f"✅ Transformation {feature} supprimée pour {redirection_id}")
                             else:
                                 await event.reply(f"❌ Transformation {feature} introuvable pour {redirection_id}")
@@ -2019,7 +2377,8 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                 if phone in telefeed_manager.transformations:
                     if redirection_id in telefeed_manager.transformations[phone]:
                         del telefeed_manager.transformations[phone][redirection_id]
-                        telefeed_manager.save_all_data()
+                        telefeed_manager.invalidate_transformations(phone, redirection_id)
+                        telefeed_manager.save_all_data('transformations')
                         await event.reply(f"✅ Toutes les transformations supprimées pour {redirection_id}")
                     else:
                         await event.reply(f"❌ Redirection {redirection_id} introuvable")
@@ -2030,7 +2389,8 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                 phone = parts[-1]
                 if phone in telefeed_manager.transformations:
                     del telefeed_manager.transformations[phone]
-                    telefeed_manager.save_all_data()
+                    telefeed_manager.invalidate_transformations(phone)
+                    telefeed_manager.save_all_data('transformations')
                     await event.reply(f"✅ Toutes les transformations supprimées pour {phone}")
                 else:
                     await event.reply(f"❌ Aucune transformation pour {phone}")
@@ -2038,7 +2398,7 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
             await event.reply("❌ Syntaxe incorrecte. Consultez /help pour les exemples")
     
     # Commande /whitelist
-    @bot.on(events.NewMessage(pattern=r'/whitelist (.*)'))
+    @router.on('/whitelist', r'/whitelist (.*)')
     async def whitelist_handler(event):
         """Handler pour la commande /whitelist"""
         if not is_user_authorized(event.sender_id):
@@ -2070,18 +2430,14 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                         parse_mode='markdown'
                     )
                     # Stocker l'état en attente
-                    telefeed_manager.sessions[f"pending_whitelist_{event.sender_id}"] = {
-                        'action': action,
-                        'redirection_id': redirection_id,
-                        'phone': phone,
-                        'timestamp': datetime.now().isoformat()
-                    }
+                    conversations.start(event.sender_id, 'whitelist', action=action, redirection_id=redirection_id, phone=phone)
                     
                 elif action == 'remove':
                     if phone in telefeed_manager.whitelist:
                         if redirection_id in telefeed_manager.whitelist[phone]:
                             del telefeed_manager.whitelist[phone][redirection_id]
-                            telefeed_manager.save_all_data()
+                            telefeed_manager.invalidate_filters(phone, redirection_id)
+                            telefeed_manager.save_all_data('whitelist')
                             await event.reply(f"✅ Whitelist supprimée pour {redirection_id}")
                         else:
                             await event.reply(f"❌ Whitelist introuvable pour {redirection_id}")
@@ -2094,12 +2450,7 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                         f"Envoyez les nouveaux mots/phrases:",
                         parse_mode='markdown'
                     )
-                    telefeed_manager.sessions[f"pending_whitelist_{event.sender_id}"] = {
-                        'action': action,
-                        'redirection_id': redirection_id,
-                        'phone': phone,
-                        'timestamp': datetime.now().isoformat()
-                    }
+                    conversations.start(event.sender_id, 'whitelist', action=action, redirection_id=redirection_id, phone=phone)
             else:
                 await event.reply("❌ Syntaxe incorrecte. Utilisez: /whitelist action redirectionid on phonenumber")
                 
@@ -2120,7 +2471,8 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
             phone = parts[-1]
             if phone in telefeed_manager.whitelist:
                 del telefeed_manager.whitelist[phone]
-                telefeed_manager.save_all_data()
+                telefeed_manager.invalidate_filters(phone)
+                telefeed_manager.save_all_data('whitelist')
                 await event.reply(f"✅ Toutes les whitelists supprimées pour {phone}")
             else:
                 await event.reply(f"❌ Aucune whitelist pour {phone}")
@@ -2128,7 +2480,7 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
             await event.reply("❌ Syntaxe incorrecte. Consultez /help pour les exemples")
     
     # Commande /blacklist (similaire à whitelist)
-    @bot.on(events.NewMessage(pattern=r'/blacklist (.*)'))
+    @router.on('/blacklist', r'/blacklist (.*)')
     async def blacklist_handler(event):
         """Handler pour la commande /blacklist"""
         if not is_user_authorized(event.sender_id):
@@ -2160,18 +2512,14 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                         parse_mode='markdown'
                     )
                     # Stocker l'état en attente
-                    telefeed_manager.sessions[f"pending_blacklist_{event.sender_id}"] = {
-                        'action': action,
-                        'redirection_id': redirection_id,
-                        'phone': phone,
-                        'timestamp': datetime.now().isoformat()
-                    }
+                    conversations.start(event.sender_id, 'blacklist', action=action, redirection_id=redirection_id, phone=phone)
                     
                 elif action == 'remove':
                     if phone in telefeed_manager.blacklist:
                         if redirection_id in telefeed_manager.blacklist[phone]:
                             del telefeed_manager.blacklist[phone][redirection_id]
-                            telefeed_manager.save_all_data()
+                            telefeed_manager.invalidate_filters(phone, redirection_id)
+                            telefeed_manager.save_all_data('blacklist')
                             await event.reply(f"✅ Blacklist supprimée pour {redirection_id}")
                         else:
                             await event.reply(f"❌ Blacklist introuvable pour {redirection_id}")
@@ -2184,12 +2532,7 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
                         f"Envoyez les nouveaux mots/phrases:",
                         parse_mode='markdown'
                     )
-                    telefeed_manager.sessions[f"pending_blacklist_{event.sender_id}"] = {
-                        'action': action,
-                        'redirection_id': redirection_id,
-                        'phone': phone,
-                        'timestamp': datetime.now().isoformat()
-                    }
+                    conversations.start(event.sender_id, 'blacklist', action=action, redirection_id=redirection_id, phone=phone)
             else:
                 await event.reply("❌ Syntaxe incorrecte. Utilisez: /blacklist action redirectionid on phonenumber")
                 
@@ -2210,7 +2553,8 @@ async def register_all_handlers(bot, ADMIN_ID, api_id, api_hash):
             phone = parts[-1]
             if phone in telefeed_manager.blacklist:
                 del telefeed_manager.blacklist[phone]
-                telefeed_manager.save_all_data()
+                telefeed_manager.invalidate_filters(phone)
+                telefeed_manager.save_all_data('blacklist')
                 await event.reply(f"✅ Toutes les blacklists supprimées pour {phone}")
             else:
                 await event.reply(f"❌ Aucune blacklist pour {phone}")
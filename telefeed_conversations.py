@@ -0,0 +1,94 @@
+"""
+États de conversation du bot TeleFeed
+Commandes en plusieurs étapes (/redirection add, /transformation, /whitelist, /blacklist, interface à boutons)
+"""
+
+import time
+from collections import OrderedDict
+
+from config import TELEFEED_CONVERSATION_TTL
+
+# Anciennes clés d'état stockées dans les sessions TeleFeed (avant ce module)
+LEGACY_SESSION_PREFIXES = (
+    'pending_redirection_', 'pending_transformation_', 'pending_whitelist_',
+    'pending_blacklist_', 'gui_redirection_'
+)
+
+
+class Conversation:
+    """Étape en cours d'un utilisateur: type de commande et données saisies"""
+
+    __slots__ = ('kind', 'data', 'expires_at')
+
+    def __init__(self, kind, data, expires_at):
+        self.kind = kind
+        self.data = data
+        self.expires_at = expires_at
+
+
+class ConversationStore:
+    """Une conversation en cours par utilisateur, en mémoire, avec expiration
+
+    Commencer une commande remplace la précédente. Les conversations restent
+    dans l'ordre de leur échéance (la durée de vie est la même pour toutes),
+    ce qui permet de purger les expirées depuis le début sans tout parcourir.
+    Rien n'est sauvegardé: un redémarrage abandonne les saisies en cours.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.conversations = OrderedDict()
+
+    def start(self, user_id, kind, **data):
+        """Commence (ou recommence) une conversation et retourne ses données"""
+        self.purge()
+        user_id = int(user_id)
+        self.conversations.pop(user_id, None)
+        self.conversations[user_id] = Conversation(kind, data, time.monotonic() + self.ttl)
+        return data
+
+    def get(self, user_id):
+        """Conversation en cours d'un utilisateur, ou None"""
+        conversation = self.conversations.get(int(user_id))
+        if conversation is None:
+            return None
+        if conversation.expires_at <= time.monotonic():
+            del self.conversations[int(user_id)]
+            return None
+        return conversation
+
+    def touch(self, user_id):
+        """Repousse l'expiration après une étape intermédiaire"""
+        conversation = self.get(user_id)
+        if conversation is not None:
+            conversation.expires_at = time.monotonic() + self.ttl
+            self.conversations.move_to_end(int(user_id))
+
+    def finish(self, user_id):
+        """Termine la conversation d'un utilisateur"""
+        self.conversations.pop(int(user_id), None)
+
+    def purge(self):
+        """Retire les conversations expirées"""
+        now = time.monotonic()
+        while self.conversations:
+            user_id, conversation = next(iter(self.conversations.items()))
+            if conversation.expires_at > now:
+                break
+            del self.conversations[user_id]
+
+    def __len__(self):
+        self.purge()
+        return len(self.conversations)
+
+
+def drop_legacy_states(sessions):
+    """Retire des sessions les états de conversation qui y étaient stockés; retourne leur nombre"""
+    keys = [key for key in sessions if str(key).startswith(LEGACY_SESSION_PREFIXES)]
+    for key in keys:
+        del sessions[key]
+    return len(keys)
+
+
+# Instance globale
+conversations = ConversationStore(TELEFEED_CONVERSATION_TTL)
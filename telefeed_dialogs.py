@@ -0,0 +1,255 @@
+"""
+Index des dialogues TeleFeed
+Liste complète des chats de chaque compte, tenue à jour par les mises à jour Telegram
+"""
+
+import bisect
+import itertools
+import re
+import time
+import unicodedata
+
+from telethon import events, utils
+from telethon.errors import ChannelPrivateError
+from telethon.tl.types import Channel, Chat, PeerChannel, UpdateChannel, User
+
+
+# Nombre maximal de résultats d'une recherche
+SEARCH_MAX_RESULTS = 30
+
+
+def normalize_title(text):
+    """Forme de recherche: NFKC (lettres décoratives -> lettres simples) puis casefold"""
+    return unicodedata.normalize('NFKC', text or '').casefold()
+
+
+def title_tokens(text):
+    """Mots d'un titre ou d'une requête, normalisés"""
+    return re.findall(r'\w+', normalize_title(text))
+
+
+def chat_type(entity):
+    """Type d'un chat tel qu'affiché par /chats"""
+    if isinstance(entity, User):
+        return 'bot' if getattr(entity, 'bot', False) else 'user'
+    if isinstance(entity, Chat):
+        return 'group'
+    if isinstance(entity, Channel):
+        return 'channel' if entity.broadcast else 'supergroup'
+    return 'unknown'
+
+
+def chat_data(entity, title=None):
+    """Entrée de l'index pour une entité"""
+    return {
+        'id': utils.get_peer_id(entity),
+        'title': title or utils.get_display_name(entity),
+        'type': chat_type(entity)
+    }
+
+
+class DialogIndex:
+    """Dialogues par compte: {phone: {chat_id: {'id', 'title', 'type'}}}
+
+    L'index d'un compte est rempli une fois, depuis la liste sauvegardée
+    (`load`) ou par `sync` (pagination complète de iter_dialogs), puis mis à
+    jour par les événements du client suivi (`follow`): arrivée ou départ
+    d'un canal ou d'un groupe, changement de titre. Une reconnexion ne
+    recharge pas l'index. Les messages ne sont pas écoutés (le filtre
+    `chats=` des redirections reste le seul gestionnaire de messages du
+    compte): les nouvelles conversations privées n'apparaissent qu'après un
+    rechargement forcé (`sync`). `on_change(phone)` est appelé à chaque
+    modification.
+
+    Un index de mots (titres normalisés et ID) permet la recherche par
+    préfixe sans parcourir les dialogues; la position de chaque chat
+    (`order`) garde l'ordre de la liste dans les résultats.
+    """
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self.dialogs = {}
+        self.order = {}
+        self.positions = itertools.count()
+        self.tokens = {}
+        self.sorted_tokens = {}
+        self.synced = {}
+        self.handlers = {}
+        self.self_ids = {}
+
+    def is_synced(self, phone_number):
+        """Vrai si la liste complète des dialogues du compte est indexée"""
+        return phone_number in self.synced
+
+    def list(self, phone_number):
+        """Dialogues indexés d'un compte"""
+        return list(self.dialogs.get(phone_number, {}).values())
+
+    def synced_at(self, phone_number):
+        """Horodatage (time.time) de la dernière synchronisation complète, None si chargé"""
+        synced = self.synced.get(phone_number)
+        return synced['at'] if synced else None
+
+    def load(self, phone_number, entries):
+        """Remplit l'index d'un compte depuis une liste sauvegardée (sans appel réseau)"""
+        self._fill(phone_number, {entry['id']: entry for entry in entries})
+        self.synced[phone_number] = {'at': None}
+
+    async def sync(self, phone_number, client):
+        """Recharge tous les dialogues du compte et suit leurs changements"""
+        dialogs = {}
+        async for dialog in client.iter_dialogs():
+            entry = chat_data(dialog.entity, dialog.title or dialog.name)
+            dialogs[entry['id']] = entry
+
+        self._fill(phone_number, dialogs)
+        self.synced[phone_number] = {'at': time.time()}
+        await self.follow(phone_number, client, force=True)
+        self._changed(phone_number)
+        return self.list(phone_number)
+
+    async def follow(self, phone_number, client, force=False):
+        """Suit les changements de dialogues sur ce client (sans recharger l'index)"""
+        attached = self.handlers.get(phone_number)
+        if attached is not None and attached[0] is client and not force:
+            return
+        self.self_ids[phone_number] = (await client.get_me(input_only=True)).user_id
+        self.attach(phone_number, client)
+
+    def _fill(self, phone_number, dialogs):
+        self.dialogs[phone_number] = dialogs
+        self.order[phone_number] = {chat_id: next(self.positions) for chat_id in dialogs}
+        self.tokens[phone_number] = {}
+        self.sorted_tokens.pop(phone_number, None)
+        for entry in dialogs.values():
+            self._index(phone_number, entry)
+
+    def forget(self, phone_number):
+        """Oublie l'index d'un compte et retire ses gestionnaires"""
+        self.detach(phone_number)
+        self.dialogs.pop(phone_number, None)
+        self.order.pop(phone_number, None)
+        self.synced.pop(phone_number, None)
+        self.tokens.pop(phone_number, None)
+        self.sorted_tokens.pop(phone_number, None)
+
+    def upsert(self, phone_number, entity):
+        """Ajoute ou met à jour un chat"""
+        dialogs = self.dialogs.setdefault(phone_number, {})
+        entry = chat_data(entity)
+        previous = dialogs.get(entry['id'])
+        if previous != entry:
+            if previous is not None:
+                self._unindex(phone_number, previous)
+            dialogs[entry['id']] = entry
+            if previous is None:
+                self.order.setdefault(phone_number, {})[entry['id']] = next(self.positions)
+            self._index(phone_number, entry)
+            self._changed(phone_number)
+
+    def remove(self, phone_number, chat_id):
+        """Retire un chat quitté"""
+        entry = self.dialogs.get(phone_number, {}).pop(chat_id, None)
+        if entry is not None:
+            self.order[phone_number].pop(chat_id, None)
+            self._unindex(phone_number, entry)
+            self._changed(phone_number)
+
+    def _entry_tokens(self, entry):
+        return set(title_tokens(entry['title'])) | {str(abs(entry['id']))}
+
+    def _index(self, phone_number, entry):
+        tokens = self.tokens.setdefault(phone_number, {})
+        for token in self._entry_tokens(entry):
+            chat_ids = tokens.get(token)
+            if chat_ids is None:
+                chat_ids = tokens[token] = set()
+                self.sorted_tokens.pop(phone_number, None)
+            chat_ids.add(entry['id'])
+
+    def _unindex(self, phone_number, entry):
+        tokens = self.tokens.get(phone_number, {})
+        for token in self._entry_tokens(entry):
+            chat_ids = tokens.get(token)
+            if chat_ids is not None:
+                chat_ids.discard(entry['id'])
+                if not chat_ids:
+                    del tokens[token]
+                    self.sorted_tokens.pop(phone_number, None)
+
+    def _prefix_matches(self, phone_number, prefix):
+        """IDs des chats ayant un mot qui commence par `prefix`"""
+        tokens = self.tokens.get(phone_number, {})
+        ordered = self.sorted_tokens.get(phone_number)
+        if ordered is None:
+            ordered = self.sorted_tokens[phone_number] = sorted(tokens)
+
+        matches = set()
+        position = bisect.bisect_left(ordered, prefix)
+        while position < len(ordered) and ordered[position].startswith(prefix):
+            matches |= tokens[ordered[position]]
+            position += 1
+        return matches
+
+    def search(self, phone_number, query, limit=SEARCH_MAX_RESULTS):
+        """Chats dont les titres contiennent tous les mots de la requête (en préfixe)"""
+        words = title_tokens(query)
+        if not words:
+            return []
+
+        found = None
+        for word in sorted(set(words), key=len, reverse=True):
+            matches = self._prefix_matches(phone_number, word)
+            found = matches if found is None else found & matches
+            if not found:
+                return []
+
+        dialogs = self.dialogs[phone_number]
+        order = self.order[phone_number]
+        return [dialogs[chat_id] for chat_id in sorted(found, key=order.__getitem__)[:limit]]
+
+    def _changed(self, phone_number):
+        if self.on_change is not None:
+            self.on_change(phone_number)
+
+    def attach(self, phone_number, client):
+        """Enregistre les gestionnaires de suivi des dialogues sur le client"""
+        self.detach(phone_number)
+
+        async def channel_update(event):
+            # Arrivée, départ ou modification d'un canal/supergroupe
+            try:
+                entity = await client.get_entity(PeerChannel(event.channel_id))
+            except ChannelPrivateError:
+                self.remove(phone_number, utils.get_peer_id(PeerChannel(event.channel_id)))
+                return
+            except Exception:
+                return
+            if getattr(entity, 'left', False):
+                self.remove(phone_number, utils.get_peer_id(entity))
+            else:
+                self.upsert(phone_number, entity)
+
+        async def chat_action(event):
+            # Changement de titre, arrivée ou départ du compte dans un groupe
+            is_self = self.self_ids.get(phone_number) in (event.user_ids or [])
+            if is_self and (event.user_left or event.user_kicked):
+                self.remove(phone_number, event.chat_id)
+            elif event.new_title or (is_self and (event.user_joined or event.user_added)):
+                chat = await event.get_chat()
+                if chat is not None:
+                    self.upsert(phone_number, chat)
+
+        handlers = [
+            (channel_update, events.Raw(types=[UpdateChannel])),
+            (chat_action, events.ChatAction()),
+        ]
+        for callback, event in handlers:
+            client.add_event_handler(callback, event)
+        self.handlers[phone_number] = (client, [callback for callback, _ in handlers])
+
+    def detach(self, phone_number):
+        """Retire les gestionnaires de suivi d'un compte"""
+        client, callbacks = self.handlers.pop(phone_number, (None, ()))
+        for callback in callbacks:
+            client.remove_event_handler(callback)
@@ -0,0 +1,246 @@
+"""
+Règles compilées pour TeleFeed
+Filtres whitelist/blacklist et transformations précompilés, construits une
+seule fois par redirection
+"""
+
+import re
+
+# Drapeaux utilisés historiquement pour les règles regex TeleFeed
+RULE_FLAGS = re.MULTILINE | re.DOTALL
+
+# Motifs qui changent de sens une fois fusionnés dans une alternance
+# (références arrière, drapeaux globaux en tête de motif)
+_UNMERGEABLE_PATTERN = re.compile(r'\\[1-9]|\(\?P=|^\(\?[aiLmsux]+\)')
+
+
+class RuleError(ValueError):
+    """Règle TeleFeed invalide (regex incorrecte)"""
+
+    def __init__(self, pattern, error):
+        self.pattern = pattern
+        self.error = error
+        super().__init__(f"Regex invalide `{pattern}`: {error}")
+
+
+class FilterRuleError(RuleError):
+    """Motif whitelist/blacklist invalide"""
+
+
+class TransformationRuleError(RuleError):
+    """Règle de transformation invalide"""
+
+
+def _trie_pattern(node):
+    """Convertit un trie de mots-clés en regex à préfixes partagés"""
+    # Un mot-clé qui se termine ici suffit: les suffixes plus longs sont redondants
+    if '' in node:
+        return ''
+    alternatives = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items())]
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return '(?:' + '|'.join(alternatives) + ')'
+
+
+class KeywordMatcher:
+    """Recherche simultanée de plusieurs mots-clés littéraux en une passe
+
+    Les mots-clés sont fusionnés dans un trie puis traduits en une seule regex
+    à préfixes partagés (style Aho-Corasick), exécutée par le moteur C de `re`.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+        self.regex = None
+        self.match_all = '' in self.keywords
+
+        if self.keywords and not self.match_all:
+            trie = {}
+            for keyword in self.keywords:
+                node = trie
+                for char in keyword:
+                    node = node.setdefault(char, {})
+                node[''] = {}
+            self.regex = re.compile(_trie_pattern(trie))
+
+    def __bool__(self):
+        return bool(self.keywords)
+
+    def search(self, text):
+        """Retourne True si au moins un mot-clé apparaît dans le texte"""
+        if self.match_all:
+            return True
+        if self.regex is None:
+            return False
+        return self.regex.search(text) is not None
+
+
+class CompiledFilter:
+    """Liste de motifs whitelist/blacklist compilée
+
+    Syntaxe des motifs: `"texte"` pour une correspondance littérale,
+    sinon une expression régulière.
+    """
+
+    def __init__(self, patterns, strict=True):
+        self.patterns = [p for p in patterns if isinstance(p, str)]
+        self.invalid = []
+
+        literals = []
+        regexes = []
+        for pattern in self.patterns:
+            if pattern.startswith('"') and pattern.endswith('"'):
+                literals.append(pattern[1:-1])
+            else:
+                try:
+                    regexes.append((pattern, re.compile(pattern, RULE_FLAGS)))
+                except re.error as e:
+                    if strict:
+                        raise FilterRuleError(pattern, e) from None
+                    # Règle déjà enregistrée: l'ignorer une fois pour toutes
+                    self.invalid.append(FilterRuleError(pattern, e))
+
+        self.literals = KeywordMatcher(literals)
+        self.regexes = self._merge_regexes(regexes)
+
+    @staticmethod
+    def _merge_regexes(regexes):
+        """Fusionne les regex compatibles dans une seule alternance"""
+        mergeable = [p for p, _ in regexes if not _UNMERGEABLE_PATTERN.search(p)]
+        separate = [c for p, c in regexes if _UNMERGEABLE_PATTERN.search(p)]
+
+        if len(mergeable) > 1:
+            try:
+                merged = re.compile('|'.join(f'(?:{p})' for p in mergeable), RULE_FLAGS)
+                return [merged] + separate
+            except re.error:
+                # Ex: groupes nommés en double - garder les regex séparées
+                pass
+        return [c for _, c in regexes]
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def matches(self, text):
+        """Retourne True si le texte correspond à au moins un motif"""
+        if self.literals.search(text):
+            return True
+        for regex in self.regexes:
+            if regex.search(text):
+                return True
+        return False
+
+
+def normalize_filter_config(config):
+    """Retourne (active, patterns) pour une configuration whitelist/blacklist
+
+    Accepte la forme {'patterns': [...], 'active': bool} comme la liste brute
+    enregistrée par le mode conversationnel.
+    """
+    if isinstance(config, list):
+        return True, config
+    if isinstance(config, dict):
+        return bool(config.get('active', False)), config.get('patterns', [])
+    return False, []
+
+
+def compile_filter(config, strict=True):
+    """Compile une configuration whitelist/blacklist, ou None si inactive
+
+    Lève FilterRuleError si un motif regex est invalide (sauf strict=False).
+    """
+    active, patterns = normalize_filter_config(config)
+    if not active:
+        return None
+    return CompiledFilter(patterns, strict=strict)
+
+
+# Marqueur du texte original dans un template `format`
+MESSAGE_TEXT_MARKER = '[[Message.Text]]'
+
+
+class TransformationPipeline:
+    """Transformations format/power/removeLines d'une redirection, précompilées
+
+    Les étapes sont appliquées dans l'ordre historique: format, power puis
+    removeLines.
+    """
+
+    def __init__(self, config, strict=True):
+        config = config if isinstance(config, dict) else {}
+        self.invalid = []
+
+        # Format: template découpé une fois autour du marqueur
+        format_data = config.get('format')
+        self.template_parts = None
+        if format_data:
+            template = format_data.get('template', MESSAGE_TEXT_MARKER)
+            self.template_parts = template.split(MESSAGE_TEXT_MARKER)
+
+        # Power: règles pré-découpées, regex compilées
+        self.power_rules = []
+        power_data = config.get('power')
+        if power_data:
+            for rule in power_data.get('rules', []):
+                compiled = self._compile_power_rule(rule, strict)
+                if compiled:
+                    self.power_rules.append(compiled)
+
+        # RemoveLines: un seul matcher pour tous les mots-clés
+        self.line_matcher = None
+        remove_lines_data = config.get('removeLines')
+        if remove_lines_data:
+            self.line_matcher = KeywordMatcher(remove_lines_data.get('keywords', []))
+
+    def _compile_power_rule(self, rule, strict):
+        """Retourne ('regex', motif, remplacement) ou ('replace', ancien, nouveau)"""
+        if '=' in rule:
+            pattern, replacement = rule.split('=', 1)
+            try:
+                return ('regex', re.compile(pattern, RULE_FLAGS), replacement)
+            except re.error as e:
+                if strict:
+                    raise TransformationRuleError(pattern, e) from None
+                self.invalid.append(TransformationRuleError(pattern, e))
+                return None
+        if '","' in rule:
+            rule = rule.strip('"')
+            if '","' in rule:
+                old, new = rule.split('","', 1)
+                return ('replace', old, new)
+        return None
+
+    def __bool__(self):
+        return bool(self.template_parts or self.power_rules or self.line_matcher is not None)
+
+    def apply(self, text):
+        """Applique toutes les étapes sur le texte"""
+        if not text:
+            return text
+
+        if self.template_parts is not None:
+            text = text.join(self.template_parts)
+
+        for kind, first, second in self.power_rules:
+            if kind == 'regex':
+                try:
+                    text = first.sub(second, text)
+                except re.error:
+                    # Remplacement invalide (ex: groupe inexistant)
+                    pass
+            else:
+                text = text.replace(first, second)
+
+        if self.line_matcher is not None:
+            search = self.line_matcher.search
+            text = '\n'.join(line for line in text.split('\n') if not search(line))
+
+        return text
+
+
+def compile_transformations(config, strict=True):
+    """Compile la configuration de transformations d'une redirection
+
+    Lève TransformationRuleError si une règle power est invalide (sauf strict=False).
+    """
+    return TransformationPipeline(config, strict=strict)
@@ -0,0 +1,440 @@
+"""
+Chemin d'envoi TeleFeed
+Caches et outils utilisés pour envoyer les messages redirigés vers les destinations
+"""
+
+import asyncio
+import time
+
+from telethon.errors import (
+    ChatAdminRequiredError,
+    ChatWriteForbiddenError,
+    ChannelPrivateError,
+    FloodWaitError,
+    UserBannedInChannelError,
+)
+from telethon.tl.types import Channel, Chat, InputPeerChannel, InputPeerChat, InputPeerUser
+
+# Durée de validité d'une destination résolue (entité + permissions)
+DESTINATION_CACHE_TTL = 3600
+
+# Erreurs d'envoi indiquant que les permissions en cache ne sont plus valables
+PERMISSION_ERRORS = (
+    ChatAdminRequiredError,
+    ChatWriteForbiddenError,
+    ChannelPrivateError,
+    UserBannedInChannelError,
+)
+
+
+def is_permission_error(error):
+    """Vérifie si une erreur d'envoi relève des permissions"""
+    return isinstance(error, PERMISSION_ERRORS)
+
+
+def compute_can_post_as_channel(permissions):
+    """Détermine si le compte peut publier au nom du canal"""
+    return (
+        permissions.is_admin and
+        (hasattr(permissions, 'post_messages') and permissions.post_messages) or
+        (hasattr(permissions, 'send_messages') and permissions.send_messages)
+    )
+
+
+def entity_record(entity, can_post_as_channel):
+    """Forme compacte et persistable d'une entité résolue"""
+    if isinstance(entity, Channel):
+        peer_type = 'channel'
+    elif isinstance(entity, Chat):
+        peer_type = 'chat'
+    else:
+        peer_type = 'user'
+    return {
+        'peer_id': entity.id,
+        'access_hash': getattr(entity, 'access_hash', None),
+        'type': peer_type,
+        'title': getattr(entity, 'title', None) or getattr(entity, 'first_name', None),
+        'can_post_as_channel': bool(can_post_as_channel)
+    }
+
+
+def input_peer_from_record(record):
+    """Pair d'entrée Telethon reconstruit sans appel réseau
+
+    Retourne None sans hash d'accès (utilisateur ou canal): l'entité doit
+    alors être résolue par get_entity.
+    """
+    if record['type'] == 'chat':
+        return InputPeerChat(record['peer_id'])
+    if record['access_hash'] is None:
+        return None
+    if record['type'] == 'channel':
+        return InputPeerChannel(record['peer_id'], record['access_hash'])
+    return InputPeerUser(record['peer_id'], record['access_hash'])
+
+
+class DestinationCache:
+    """Entités de destination résolues et droits de publication, par client
+
+    Chaque entrée expire après `ttl` secondes et peut être invalidée
+    explicitement (ex: après une erreur de permission). Avec un `store`
+    (EntityCacheStore), les résolutions sont persistées et `preload`
+    les recharge au redémarrage d'un compte.
+    """
+
+    def __init__(self, ttl=DESTINATION_CACHE_TTL, store=None):
+        self.ttl = ttl
+        self.store = store
+        self.entries = {}
+
+    def get(self, phone_number, dest_id):
+        """Retourne l'entrée valide (entity, can_post_as_channel) ou None"""
+        key = (phone_number, str(dest_id))
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry['resolved_at'] > self.ttl:
+            del self.entries[key]
+            return None
+        return entry
+
+    def invalidate(self, phone_number, dest_id=None):
+        """Invalide une destination, ou toutes celles d'un numéro"""
+        if self.store is not None:
+            self.store.delete(phone_number, dest_id)
+        if dest_id is not None:
+            self.entries.pop((phone_number, str(dest_id)), None)
+            return
+        for key in [k for k in self.entries if k[0] == phone_number]:
+            del self.entries[key]
+
+    def preload(self, phone_number):
+        """Recharge les entités persistées d'un compte; retourne leurs pairs d'entrée
+
+        Les droits rechargés restent valables `ttl` secondes; une erreur de
+        permission à l'envoi invalide l'entrée comme pour une résolution réseau.
+        Les entrées sans hash d'accès sont ignorées (résolues au premier envoi).
+        """
+        if self.store is None:
+            return []
+        records = self.store.load(phone_number)
+        now = time.monotonic()
+        peers = []
+        for ref, record in records.items():
+            peer = input_peer_from_record(record)
+            if peer is None:
+                continue
+            self.entries[(phone_number, ref)] = {
+                'entity': peer,
+                'title': record['title'],
+                'can_post_as_channel': record['can_post_as_channel'],
+                'resolved_at': now
+            }
+            peers.append(peer)
+        return peers
+
+    async def resolve(self, client, phone_number, dest_id):
+        """Retourne l'entrée en cache ou la résout (get_entity + get_permissions)"""
+        entry = self.get(phone_number, dest_id)
+        if entry is not None:
+            return entry
+
+        destination_entity = await client.get_entity(dest_id)
+
+        # Vérifier les permissions d'administrateur
+        try:
+            permissions = await client.get_permissions(destination_entity, 'me')
+            can_post_as_channel = compute_can_post_as_channel(permissions)
+            print(f"🔍 Permissions pour {getattr(destination_entity, 'title', dest_id)}: Admin={permissions.is_admin}, Post={getattr(permissions, 'post_messages', 'N/A')}")
+        except Exception as perm_error:
+            print(f"⚠️ Erreur permissions: {perm_error}")
+            can_post_as_channel = False
+
+        entry = {
+            'entity': destination_entity,
+            'title': getattr(destination_entity, 'title', None),
+            'can_post_as_channel': can_post_as_channel,
+            'resolved_at': time.monotonic()
+        }
+        self.entries[(phone_number, str(dest_id))] = entry
+        if self.store is not None:
+            self.store.save(phone_number, dest_id, entity_record(destination_entity, can_post_as_channel))
+        return entry
+
+    async def warm_up(self, client, phone_number, dest_ids):
+        """Pré-résout une liste de destinations (les erreurs sont ignorées)"""
+        warmed = 0
+        for dest_id in dest_ids:
+            try:
+                await self.resolve(client, phone_number, dest_id)
+                warmed += 1
+            except Exception as e:
+                print(f"⚠️ Préchargement impossible pour {dest_id} ({phone_number}): {e}")
+        return warmed
+
+
+# Intervalle après lequel les méthodes préférées sont de nouveau testées
+SEND_STRATEGY_REPROBE_INTERVAL = 6 * 3600
+
+
+async def _send_from_peer(client, destination, dest_id, text):
+    """MÉTHODE 1: send_message avec from_peer (publication au nom du canal)"""
+    entity = destination['entity']
+    sent_message = await client.send_message(entity, text, from_peer=entity)
+    print(f"✅ Message authentique envoyé par canal {destination['title'] or dest_id}")
+    return sent_message
+
+
+async def _send_raw_request(client, destination, dest_id, text):
+    """MÉTHODE 2: API bas niveau SendMessageRequest"""
+    from telethon.tl.functions.messages import SendMessageRequest
+
+    entity = destination['entity']
+    result = await client(SendMessageRequest(
+        peer=entity,
+        message=text,
+        silent=False
+    ))
+
+    # Extraire le message depuis la réponse
+    for update in getattr(result, 'updates', []):
+        if hasattr(update, 'message'):
+            print(f"✅ Message authentique envoyé (API directe) par {destination['title'] or dest_id}")
+            return update.message
+
+    print(f"⚠️ Message envoyé mais pas d'objet retourné")
+    return None
+
+
+async def _send_normal(client, destination, dest_id, text):
+    """Envoi normal vers l'entité résolue"""
+    entity = destination['entity']
+    sent_message = await client.send_message(entity, text, silent=False)
+    print(f"✅ Message envoyé vers {destination['title'] or dest_id}")
+    return sent_message
+
+
+async def _send_direct(client, destination, dest_id, text):
+    """Dernier recours: envoi avec l'ID brut de la destination"""
+    sent_message = await client.send_message(dest_id, text)
+    print(f"✅ Message envoyé vers {dest_id} (fallback)")
+    return sent_message
+
+
+SEND_METHODS = {
+    'from_peer': _send_from_peer,
+    'raw_request': _send_raw_request,
+    'normal': _send_normal,
+    'direct': _send_direct,
+}
+
+
+def available_send_methods(destination):
+    """Méthodes d'envoi à essayer, dans l'ordre de préférence"""
+    if destination is None:
+        return ['direct']
+    if destination['can_post_as_channel']:
+        return ['from_peer', 'raw_request', 'normal', 'direct']
+    return ['normal', 'direct']
+
+
+class SendStrategyMemo:
+    """Mémorise, par (client, destination), la dernière méthode d'envoi réussie
+
+    La méthode mémorisée est essayée en premier; l'ordre complet n'est
+    reparcouru qu'après un échec ou une fois `reprobe_interval` écoulé.
+    """
+
+    def __init__(self, reprobe_interval=SEND_STRATEGY_REPROBE_INTERVAL):
+        self.reprobe_interval = reprobe_interval
+        self.strategies = {}
+
+    def _is_stale(self, strategy):
+        return time.monotonic() - strategy['probed_at'] > self.reprobe_interval
+
+    def order(self, phone_number, dest_id, methods):
+        """Retourne les méthodes à essayer, la méthode mémorisée en tête"""
+        strategy = self.strategies.get((phone_number, dest_id))
+        if strategy is None or strategy['method'] not in methods or self._is_stale(strategy):
+            return methods
+        return [strategy['method']] + [m for m in methods if m != strategy['method']]
+
+    def record_success(self, phone_number, dest_id, method):
+        """Enregistre la méthode qui vient de réussir"""
+        key = (phone_number, dest_id)
+        strategy = self.strategies.get(key)
+        # Le délai de re-sondage ne repart qu'après un nouveau sondage complet
+        if strategy is None or strategy['method'] != method or self._is_stale(strategy):
+            self.strategies[key] = {'method': method, 'probed_at': time.monotonic()}
+
+    def record_failure(self, phone_number, dest_id, method):
+        """Oublie la méthode mémorisée si c'est elle qui vient d'échouer"""
+        strategy = self.strategies.get((phone_number, dest_id))
+        if strategy is not None and strategy['method'] == method:
+            del self.strategies[(phone_number, dest_id)]
+
+    def invalidate(self, phone_number, dest_id=None):
+        """Oublie la stratégie d'une destination, ou de tout un numéro"""
+        if dest_id is not None:
+            self.strategies.pop((phone_number, dest_id), None)
+            return
+        for key in [k for k in self.strategies if k[0] == phone_number]:
+            del self.strategies[key]
+
+
+# Nombre maximal d'envois simultanés vers une même destination
+DESTINATION_MAX_IN_FLIGHT = 3
+
+
+class OrderedFanout:
+    """Envoi concurrent vers plusieurs destinations avec ordre strict
+
+    Les envois vers des destinations différentes se chevauchent, mais pour un
+    même (chat source, destination) le message N+1 attend toujours la fin du
+    message N. La place dans la file est prise à l'appel de `schedule`, qui
+    doit donc se faire dans l'ordre d'arrivée des messages.
+    """
+
+    def __init__(self, max_in_flight=DESTINATION_MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self.tails = {}
+        self.limits = {}
+
+    def schedule(self, phone_number, source_chat_id, dest_id, send):
+        """Planifie `send()` (coroutine) après l'envoi précédent du même couple"""
+        key = (phone_number, source_chat_id, dest_id)
+        task = asyncio.ensure_future(self._run(key, self.tails.get(key), send))
+        self.tails[key] = task
+        return task
+
+    async def _run(self, key, previous, send):
+        try:
+            if previous is not None:
+                # Attendre la fin de l'envoi précédent, même en cas d'erreur
+                await asyncio.wait([previous])
+
+            phone_number, _, dest_id = key
+            limit = self.limits.get((phone_number, dest_id))
+            if limit is None:
+                limit = self.limits[(phone_number, dest_id)] = asyncio.Semaphore(self.max_in_flight)
+
+            async with limit:
+                return await send()
+        finally:
+            if self.tails.get(key) is asyncio.current_task():
+                del self.tails[key]
+
+    def in_flight(self):
+        """Nombre d'envois planifiés ou en cours"""
+        return len(self.tails)
+
+
+# Limites d'envoi Telegram: ~1 message/s par chat, ~30 messages/s au total
+SEND_PER_CHAT_RATE = 1.0
+SEND_PER_CHAT_BURST = 3
+SEND_GLOBAL_RATE = 30.0
+SEND_GLOBAL_BURST = 30
+
+
+class TokenBucket:
+    """Seau à jetons: `rate` jetons par seconde, au plus `capacity` en réserve"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def take(self):
+        """Prend un jeton; retourne 0 si c'est fait, sinon le délai d'attente en secondes"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class AccountSendQueue:
+    """File d'envoi d'un compte connecté, limitée en débit et consciente des FloodWait
+
+    Chaque appel passe d'abord par le seau du chat de destination puis par
+    le seau global du compte. Un FloodWait met tout le compte en pause pour la
+    durée demandée, puis l'appel est rejoué: aucun message n'est perdu.
+    """
+
+    def __init__(self, phone_number):
+        self.phone_number = phone_number
+        self.global_bucket = TokenBucket(SEND_GLOBAL_RATE, SEND_GLOBAL_BURST)
+        self.chat_buckets = {}
+        self.chat_locks = {}
+        self.global_lock = asyncio.Lock()
+        self.paused_until = 0
+        
+        # Statistiques exposées
+        self.depth = 0
+        self.sent = 0
+        self.flood_waits = 0
+        self.total_wait = 0.0
+        self.last_wait = 0.0
+
+    def pause(self, seconds):
+        """Suspend les envois du compte pendant `seconds` secondes"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.flood_waits += 1
+        print(f"⏳ FloodWait pour {self.phone_number}: envois suspendus {seconds}s ({self.depth} en attente)")
+
+    def paused_for(self):
+        """Secondes restantes avant la reprise des envois"""
+        return max(0.0, self.paused_until - time.monotonic())
+
+    async def _wait_turn(self, chat_id):
+        """Attend la disponibilité du chat, du compte et la fin d'une éventuelle pause"""
+        lock = self.chat_locks.get(chat_id)
+        if lock is None:
+            lock = self.chat_locks[chat_id] = asyncio.Lock()
+            self.chat_buckets[chat_id] = TokenBucket(SEND_PER_CHAT_RATE, SEND_PER_CHAT_BURST)
+
+        async with lock:
+            bucket = self.chat_buckets[chat_id]
+            while (delay := bucket.take()) > 0:
+                await asyncio.sleep(delay)
+
+        async with self.global_lock:
+            while True:
+                delay = self.paused_for() or self.global_bucket.take()
+                if delay <= 0:
+                    return
+                await asyncio.sleep(delay)
+
+    async def submit(self, chat_id, call):
+        """Exécute `call()` (coroutine d'envoi) dans le respect des limites"""
+        enqueued_at = time.monotonic()
+        self.depth += 1
+        try:
+            while True:
+                await self._wait_turn(chat_id)
+                try:
+                    result = await call()
+                except FloodWaitError as e:
+                    self.pause(e.seconds)
+                    continue
+                self.sent += 1
+                return result
+        finally:
+            self.depth -= 1
+            self.last_wait = time.monotonic() - enqueued_at
+            self.total_wait += self.last_wait
+
+    def stats(self):
+        """Profondeur de file et temps d'attente du compte"""
+        handled = self.sent or 1
+        return {
+            'depth': self.depth,
+            'paused_for': round(self.paused_for(), 1),
+            'sent': self.sent,
+            'flood_waits': self.flood_waits,
+            'last_wait': round(self.last_wait, 3),
+            'average_wait': round(self.total_wait / handled, 3)
+        }
@@ -0,0 +1,288 @@
+"""
+Répartition des comptes TeleFeed sur plusieurs processus
+Le processus du bot coordonne N processus de travail, chacun propriétaire d'un sous-ensemble fixe des comptes
+"""
+
+import asyncio
+import copy
+import itertools
+import multiprocessing
+import os
+import queue
+import time
+import zlib
+
+# Collections transmises aux processus de travail lorsqu'elles changent
+SHARED_COLLECTIONS = (
+    'sessions', 'redirections', 'transformations', 'filters',
+    'whitelist', 'blacklist', 'settings', 'delay'
+)
+
+# Intervalle des rapports d'état envoyés par les processus de travail (secondes)
+SHARD_REPORT_INTERVAL = 15
+
+# Délai d'attente de l'arrêt d'un processus de travail (secondes)
+SHARD_STOP_TIMEOUT = 10
+
+# Délai de réponse d'un processus de travail à une requête (secondes): une
+# synchronisation complète des dialogues peut être longue
+SHARD_REQUEST_TIMEOUT = 120
+
+# Variable d'environnement marquant un processus de travail: elle est en place
+# avant tout import, donc avant la création de telefeed_manager
+SHARD_WORKER_ENV = 'TELEFEED_SHARD_WORKER'
+
+
+def is_shard_worker():
+    """Vrai dans un processus de travail (qui ne doit écrire aucun fichier de données)"""
+    return os.getenv(SHARD_WORKER_ENV) is not None
+
+
+def shard_for(phone_number, shard_count):
+    """Numéro du processus propriétaire d'un compte (stable d'un démarrage à l'autre)"""
+    return zlib.crc32(str(phone_number).encode('utf-8')) % shard_count
+
+
+def owned_part(collection, shard_id, shard_count):
+    """Copie des entrées d'une collection appartenant à un processus"""
+    return {
+        phone: copy.deepcopy(data) for phone, data in collection.items()
+        if shard_for(phone, shard_count) == shard_id
+    }
+
+
+def _next_item(source):
+    """Lecture bloquante d'une file, interrompue régulièrement pour permettre l'arrêt"""
+    try:
+        return source.get(timeout=1)
+    except queue.Empty:
+        return None
+
+
+class ShardCoordinator:
+    """Côté bot: démarre les processus de travail et leur transmet les changements
+
+    Le processus du bot reste le seul à écrire les fichiers JSON. Chaque
+    modification d'une collection partagée est envoyée au processus
+    propriétaire des comptes concernés; les sessions modifiées par les
+    processus de travail remontent ici pour être sauvegardées. Les requêtes
+    qui ont besoin du client d'un compte (liste des chats) sont relayées au
+    processus propriétaire, dont la réponse revient par la file `events`.
+    """
+
+    def __init__(self, manager, shard_count):
+        self.manager = manager
+        self.shard_count = shard_count
+        self.context = multiprocessing.get_context('spawn')
+        self.events = self.context.Queue()
+        self.commands = [self.context.Queue() for _ in range(shard_count)]
+        self.processes = []
+        self.status = {}
+        self.pending = {}
+        self.request_ids = itertools.count(1)
+
+    def owns(self, phone_number):
+        """Le processus du bot ne gère les redirections d'aucun compte"""
+        return False
+
+    async def request_chats(self, phone_number, refresh=False, query=None):
+        """Demande au processus propriétaire les chats d'un compte (résultat de get_chats)"""
+        request_id = next(self.request_ids)
+        future = self.pending[request_id] = asyncio.get_running_loop().create_future()
+        shard_id = shard_for(phone_number, self.shard_count)
+        self.commands[shard_id].put(('chats', request_id, phone_number, refresh, query))
+        try:
+            return await asyncio.wait_for(future, SHARD_REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            return {'status': 'error', 'message': f"le processus TeleFeed {shard_id} ne répond pas"}
+        finally:
+            self.pending.pop(request_id, None)
+
+    def start(self):
+        """Démarre les processus de travail"""
+        # L'environnement est copié au lancement: les processus le voient dès
+        # l'import des modules du bot, avant _run_shard_worker
+        os.environ[SHARD_WORKER_ENV] = '1'
+        try:
+            for shard_id, commands in enumerate(self.commands):
+                process = self.context.Process(
+                    target=run_shard_worker,
+                    args=(shard_id, self.shard_count, commands, self.events),
+                    name=f"telefeed-shard-{shard_id}",
+                    daemon=True
+                )
+                process.start()
+                self.processes.append(process)
+        finally:
+            del os.environ[SHARD_WORKER_ENV]
+        print(f"🧩 {self.shard_count} processus TeleFeed démarrés")
+
+    def publish(self, collections):
+        """Envoie à chaque processus sa part des collections modifiées"""
+        names = [name for name in collections if name in SHARED_COLLECTIONS]
+        if not names:
+            return
+        for shard_id, commands in enumerate(self.commands):
+            update = {
+                name: owned_part(self.manager._collection_data(name), shard_id, self.shard_count)
+                for name in names
+            }
+            commands.put(('update', update))
+
+    def receive(self, event):
+        """Traite un message d'un processus de travail"""
+        kind = event[0]
+        if kind == 'sessions':
+            for phone_number, session_data in event[1].items():
+                current = self.manager.sessions.get(phone_number)
+                if isinstance(current, dict) and 'client' in current:
+                    session_data['client'] = current['client']
+                self.manager.sessions[phone_number] = session_data
+            self.manager.save_all_data('sessions', publish=False)
+        elif kind == 'status':
+            self.status[event[1]] = event[2]
+        elif kind == 'chats_result':
+            future = self.pending.get(event[1])
+            if future is not None and not future.done():
+                future.set_result(event[2])
+
+    async def listen(self):
+        """Boucle de réception des messages des processus de travail"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                event = await loop.run_in_executor(None, _next_item, self.events)
+                if event is not None:
+                    self.receive(event)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"❌ Erreur dans la coordination TeleFeed : {e}")
+
+    def remote_status(self):
+        """État agrégé des processus: comptes connectés, connexions et files d'envoi"""
+        merged = {'clients': set(), 'connection': {}, 'queues': {}}
+        for status in list(self.status.values()):
+            merged['clients'].update(status['clients'])
+            merged['connection'].update(status['connection'])
+            merged['queues'].update(status['queues'])
+        return merged
+
+    async def stop(self):
+        """Arrête les processus de travail sans bloquer la boucle asyncio"""
+        for commands in self.commands:
+            commands.put(('stop',))
+        deadline = time.monotonic() + SHARD_STOP_TIMEOUT
+        while any(process.is_alive() for process in self.processes) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+
+
+class ShardWorker:
+    """Côté processus de travail: reçoit les changements et remonte les sessions"""
+
+    def __init__(self, manager, shard_id, shard_count, commands, events):
+        self.manager = manager
+        self.shard_id = shard_id
+        self.shard_count = shard_count
+        self.commands = commands
+        self.events = events
+
+    def owns(self, phone_number):
+        return shard_for(phone_number, self.shard_count) == self.shard_id
+
+    def publish(self, collections):
+        """Remonte au processus du bot les sessions modifiées ici"""
+        if 'sessions' in collections:
+            sessions = owned_part(self.manager._collection_data('sessions'), self.shard_id, self.shard_count)
+            self.events.put(('sessions', sessions))
+
+    def remote_status(self):
+        return {'clients': set(), 'connection': {}, 'queues': {}}
+
+    async def request_chats(self, phone_number, refresh=False, query=None):
+        # Les processus de travail ne relaient pas de requêtes entre eux
+        return {'status': 'remote'}
+
+    async def answer_chats(self, request_id, phone_number, refresh, query):
+        """Répond à une requête de chats du processus du bot"""
+        try:
+            result = await self.manager.get_chats(phone_number, refresh=refresh, query=query)
+        except Exception as e:
+            result = {'status': 'error', 'message': str(e)}
+        self.events.put(('chats_result', request_id, result))
+
+    def report(self):
+        """Envoie l'état des comptes de ce processus au processus du bot"""
+        self.events.put(('status', self.shard_id, {
+            'clients': list(self.manager.clients),
+            'connection': self.manager.supervisor.get_states(),
+            'queues': self.manager.get_send_queue_stats()
+        }))
+
+    async def report_task(self):
+        while True:
+            try:
+                self.report()
+                await asyncio.sleep(SHARD_REPORT_INTERVAL)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"❌ Erreur dans le rapport du processus TeleFeed {self.shard_id} : {e}")
+                await asyncio.sleep(SHARD_REPORT_INTERVAL)
+
+    async def serve(self):
+        """Applique les commandes du processus du bot jusqu'à l'arrêt"""
+        loop = asyncio.get_running_loop()
+        requests = set()
+        while True:
+            command = await loop.run_in_executor(None, _next_item, self.commands)
+            if command is None:
+                continue
+            if command[0] == 'stop':
+                break
+            if command[0] == 'update':
+                try:
+                    self.manager.apply_shared_update(command[1])
+                    self.report()
+                except Exception as e:
+                    print(f"❌ Erreur lors de la mise à jour du processus TeleFeed {self.shard_id} : {e}")
+            elif command[0] == 'chats':
+                # Traitée à part: une synchronisation des dialogues ne bloque pas les mises à jour
+                task = asyncio.ensure_future(self.answer_chats(*command[1:]))
+                requests.add(task)
+                task.add_done_callback(requests.discard)
+
+
+def run_shard_worker(shard_id, shard_count, commands, events):
+    """Point d'entrée d'un processus de travail"""
+    asyncio.run(_run_shard_worker(shard_id, shard_count, commands, events))
+
+
+async def _run_shard_worker(shard_id, shard_count, commands, events):
+    from telefeed_commands import telefeed_manager
+
+    worker = ShardWorker(telefeed_manager, shard_id, shard_count, commands, events)
+    telefeed_manager.attach_shards(worker)
+    print(f"🧩 Processus TeleFeed {shard_id + 1}/{shard_count} démarré")
+
+    await telefeed_manager.restore_existing_sessions()
+    tasks = [
+        asyncio.create_task(telefeed_manager.supervisor.run()),
+        asyncio.create_task(telefeed_manager.idle_disconnect_task()),
+        asyncio.create_task(worker.report_task())
+    ]
+    try:
+        await worker.serve()
+    finally:
+        for task in tasks:
+            task.cancel()
+        for client in list(telefeed_manager.clients.values()):
+            try:
+                await client.disconnect()
+            except Exception:
+                pass
+        print(f"⏹️ Processus TeleFeed {shard_id + 1}/{shard_count} arrêté")
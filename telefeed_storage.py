@@ -0,0 +1,372 @@
+"""
+Stockage TeleFeed
+Correspondances message source -> message destination, cache d'entités et
+collections de configuration, en SQLite (mode WAL)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Base des correspondances de messages (remplace telefeed_message_mapping.json)
+MESSAGE_MAPPING_DB = 'telefeed_messages.db'
+LEGACY_MESSAGE_MAPPING_FILE = 'telefeed_message_mapping.json'
+
+# Rétention: nombre de messages gardés par chat source et âge maximal
+MAPPING_MAX_PER_CHAT = 5000
+MAPPING_MAX_AGE = 30 * 24 * 3600
+
+# Nombre d'ajouts entre deux purges
+MAPPING_PRUNE_EVERY = 500
+
+# Cache des entités résolues par compte (même base que les correspondances)
+ENTITY_CACHE_DB = MESSAGE_MAPPING_DB
+
+# Collections de configuration (sessions, redirections...), une table par collection
+CONFIG_DB = 'telefeed_config.db'
+
+
+def open_sqlite(path):
+    """Ouvre une base SQLite en mode WAL, adaptée aux écritures fréquentes"""
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+
+class MessageMappingStore:
+    """Correspondances (chat source, message source, destination) -> message destination
+
+    Ajout et recherche passent par la clé primaire, sans charger l'historique
+    en mémoire. Les anciennes entrées sont purgées par âge et par nombre de
+    messages par chat source.
+    """
+
+    def __init__(self, path=MESSAGE_MAPPING_DB, legacy_file=LEGACY_MESSAGE_MAPPING_FILE,
+                 max_per_chat=MAPPING_MAX_PER_CHAT, max_age=MAPPING_MAX_AGE):
+        self.path = path
+        self.legacy_file = legacy_file
+        self.max_per_chat = max_per_chat
+        self.max_age = max_age
+        self.connection = None
+        self.pending_prune = set()
+        self.added_since_prune = 0
+
+    def _connect(self):
+        """Ouvre la base au premier usage (chargement paresseux)"""
+        if self.connection is None:
+            self.connection = open_sqlite(self.path)
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS message_mapping ('
+                'source_chat INTEGER NOT NULL, '
+                'source_msg INTEGER NOT NULL, '
+                'dest_id TEXT NOT NULL, '
+                'dest_msg INTEGER NOT NULL, '
+                'created_at REAL NOT NULL, '
+                'PRIMARY KEY (source_chat, source_msg, dest_id)'
+                ') WITHOUT ROWID'
+            )
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS message_mapping_age ON message_mapping (created_at)'
+            )
+            self._migrate_legacy_file()
+        return self.connection
+
+    def _migrate_legacy_file(self):
+        """Importe une fois l'ancien telefeed_message_mapping.json"""
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return
+        try:
+            with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except Exception as e:
+            print(f"Erreur lors du chargement {self.legacy_file}: {e}")
+            return
+
+        now = time.time()
+        rows = []
+        for source_key, destinations in legacy.items():
+            source_chat, _, source_msg = source_key.rpartition('_')
+            try:
+                source_chat, source_msg = int(source_chat), int(source_msg)
+            except ValueError:
+                continue
+            for dest_id, dest_msg in destinations.items():
+                rows.append((source_chat, source_msg, str(dest_id), int(dest_msg), now))
+
+        with self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO message_mapping VALUES (?, ?, ?, ?, ?)', rows
+            )
+        os.replace(self.legacy_file, self.legacy_file + '.migrated')
+        print(f"📦 {len(rows)} correspondances de messages migrées vers {self.path}")
+
+    def get(self, source_chat, source_msg, dest_id):
+        """Retourne l'ID du message destination, ou None"""
+        row = self._connect().execute(
+            'SELECT dest_msg FROM message_mapping WHERE source_chat = ? AND source_msg = ? AND dest_id = ?',
+            (source_chat, source_msg, str(dest_id))
+        ).fetchone()
+        return row[0] if row else None
+
+    def add(self, source_chat, source_msg, dest_id, dest_msg):
+        """Enregistre la correspondance d'un message envoyé"""
+        self._connect().execute(
+            'INSERT OR REPLACE INTO message_mapping VALUES (?, ?, ?, ?, ?)',
+            (source_chat, source_msg, str(dest_id), dest_msg, time.time())
+        )
+        self.pending_prune.add(source_chat)
+        self.added_since_prune += 1
+        if self.added_since_prune >= MAPPING_PRUNE_EVERY:
+            self.prune()
+
+    def prune(self):
+        """Supprime les correspondances trop anciennes ou en surnombre"""
+        connection = self._connect()
+        with connection:
+            connection.execute('BEGIN')
+            connection.execute(
+                'DELETE FROM message_mapping WHERE created_at < ?', (time.time() - self.max_age,)
+            )
+            for source_chat in self.pending_prune:
+                connection.execute(
+                    'DELETE FROM message_mapping WHERE source_chat = ? AND source_msg < ('
+                    'SELECT source_msg FROM (SELECT DISTINCT source_msg FROM message_mapping '
+                    'WHERE source_chat = ? ORDER BY source_msg DESC LIMIT 1 OFFSET ?))',
+                    (source_chat, source_chat, self.max_per_chat - 1)
+                )
+        self.pending_prune.clear()
+        self.added_since_prune = 0
+
+    def count(self):
+        """Nombre total de correspondances enregistrées"""
+        return self._connect().execute('SELECT COUNT(*) FROM message_mapping').fetchone()[0]
+
+    def close(self):
+        """Ferme la base"""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class EntityCacheStore:
+    """Entités résolues par compte: (phone, référence) -> pair, hash d'accès, type, titre
+
+    Permet de retrouver après un redémarrage les entités et droits déjà
+    résolus, sans appel réseau. La référence est la valeur telle qu'elle est
+    enregistrée dans les redirections (ID ou nom d'utilisateur). Les chats
+    sources sont gardés dans une table à part (sans droits de publication).
+    """
+
+    def __init__(self, path=ENTITY_CACHE_DB):
+        self.path = path
+        self.connection = None
+
+    def _connect(self):
+        """Ouvre la base au premier usage (chargement paresseux)"""
+        if self.connection is None:
+            self.connection = open_sqlite(self.path)
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS entity_cache ('
+                'phone TEXT NOT NULL, '
+                'ref TEXT NOT NULL, '
+                'peer_id INTEGER NOT NULL, '
+                'access_hash INTEGER, '
+                'type TEXT NOT NULL, '
+                'title TEXT, '
+                'can_post_as_channel INTEGER NOT NULL DEFAULT 0, '
+                'updated_at REAL NOT NULL, '
+                'PRIMARY KEY (phone, ref)'
+                ') WITHOUT ROWID'
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS source_entities ('
+                'phone TEXT NOT NULL, '
+                'ref TEXT NOT NULL, '
+                'peer_id INTEGER NOT NULL, '
+                'access_hash INTEGER, '
+                'type TEXT NOT NULL, '
+                'title TEXT, '
+                'updated_at REAL NOT NULL, '
+                'PRIMARY KEY (phone, ref)'
+                ') WITHOUT ROWID'
+            )
+        return self.connection
+
+    def load(self, phone_number):
+        """Retourne {référence: enregistrement} pour un compte"""
+        rows = self._connect().execute(
+            'SELECT ref, peer_id, access_hash, type, title, can_post_as_channel, updated_at '
+            'FROM entity_cache WHERE phone = ?',
+            (str(phone_number),)
+        ).fetchall()
+        return {
+            ref: {
+                'peer_id': peer_id,
+                'access_hash': access_hash,
+                'type': peer_type,
+                'title': title,
+                'can_post_as_channel': bool(can_post),
+                'updated_at': updated_at
+            }
+            for ref, peer_id, access_hash, peer_type, title, can_post, updated_at in rows
+        }
+
+    def save(self, phone_number, ref, record):
+        """Enregistre (ou remplace) l'entité résolue d'une référence"""
+        self._connect().execute(
+            'INSERT OR REPLACE INTO entity_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (str(phone_number), str(ref), record['peer_id'], record['access_hash'], record['type'],
+             record['title'], int(record['can_post_as_channel']), time.time())
+        )
+
+    def delete(self, phone_number, ref=None):
+        """Supprime une référence, ou toutes celles d'un compte"""
+        if ref is not None:
+            self._connect().execute(
+                'DELETE FROM entity_cache WHERE phone = ? AND ref = ?', (str(phone_number), str(ref))
+            )
+        else:
+            self._connect().execute('DELETE FROM entity_cache WHERE phone = ?', (str(phone_number),))
+
+    def load_sources(self, phone_number):
+        """Retourne {référence: enregistrement} des chats sources d'un compte"""
+        rows = self._connect().execute(
+            'SELECT ref, peer_id, access_hash, type, title, updated_at '
+            'FROM source_entities WHERE phone = ?',
+            (str(phone_number),)
+        ).fetchall()
+        return {
+            ref: {
+                'peer_id': peer_id,
+                'access_hash': access_hash,
+                'type': peer_type,
+                'title': title,
+                'updated_at': updated_at
+            }
+            for ref, peer_id, access_hash, peer_type, title, updated_at in rows
+        }
+
+    def save_source(self, phone_number, ref, record):
+        """Enregistre (ou remplace) l'entité résolue d'un chat source"""
+        self._connect().execute(
+            'INSERT OR REPLACE INTO source_entities VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (str(phone_number), str(ref), record['peer_id'], record['access_hash'], record['type'],
+             record['title'], time.time())
+        )
+
+    def close(self):
+        """Ferme la base"""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class ConfigStore:
+    """Collections de configuration TeleFeed: une table (clé, données JSON) par collection
+
+    La clé est l'entrée de premier niveau de la collection (le numéro de
+    téléphone du compte). Les écritures ne portent que sur les entrées
+    modifiées, toutes collections confondues dans une même transaction.
+    `legacy_files` ({collection: fichier JSON}) est importé une seule fois,
+    dans une table vide; les fichiers JSON restent en place et la table
+    `_imported` retient les collections déjà traitées (une collection vidée
+    ensuite n'est pas réimportée).
+    """
+
+    def __init__(self, collections, path=CONFIG_DB, legacy_files=None):
+        self.collections = tuple(collections)
+        self.path = path
+        self.legacy_files = legacy_files or {}
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        """Ouvre la base au premier usage et crée les tables"""
+        if self.connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for name in self.collections:
+                connection.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{name}" ('
+                    'key TEXT PRIMARY KEY, '
+                    'data TEXT NOT NULL, '
+                    'updated_at REAL NOT NULL'
+                    ') WITHOUT ROWID'
+                )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS "_imported" (name TEXT PRIMARY KEY, imported_at REAL NOT NULL)'
+            )
+            self.connection = connection
+            self._migrate_legacy_files()
+        return self.connection
+
+    def _migrate_legacy_files(self):
+        """Importe une fois les anciens fichiers JSON dans les tables vides"""
+        now = time.time()
+        imported = {row[0] for row in self.connection.execute('SELECT name FROM "_imported"')}
+        for name in self.collections:
+            filename = self.legacy_files.get(name)
+            if name in imported or not filename or not os.path.exists(filename):
+                continue
+            legacy = {}
+            if not self.connection.execute(f'SELECT 1 FROM "{name}" LIMIT 1').fetchone():
+                try:
+                    with open(filename, 'r', encoding='utf-8') as f:
+                        legacy = json.load(f)
+                except Exception as e:
+                    print(f"Erreur lors du chargement {filename}: {e}")
+                    continue
+
+            with self.connection:
+                self.connection.execute('BEGIN IMMEDIATE')
+                self.connection.executemany(
+                    f'INSERT OR IGNORE INTO "{name}" VALUES (?, ?, ?)',
+                    [(str(key), json.dumps(data, ensure_ascii=False), now) for key, data in legacy.items()]
+                )
+                self.connection.execute('INSERT OR REPLACE INTO "_imported" VALUES (?, ?)', (name, now))
+            if legacy:
+                print(f"📦 {len(legacy)} entrées de {filename} importées dans {self.path}")
+
+    def load(self, name):
+        """Toute une collection: {clé: données}"""
+        with self.lock:
+            rows = self._connect().execute(f'SELECT key, data FROM "{name}"').fetchall()
+        return {key: json.loads(data) for key, data in rows}
+
+    def load_key(self, name, key):
+        """Une seule entrée d'une collection (chargement à la demande), ou None"""
+        with self.lock:
+            row = self._connect().execute(
+                f'SELECT data FROM "{name}" WHERE key = ?', (str(key),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def write(self, changes):
+        """Applique en une transaction {collection: ({clé: texte JSON}, [clés supprimées])}"""
+        now = time.time()
+        with self.lock:
+            connection = self._connect()
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                for name, (rows, deleted) in changes.items():
+                    if rows:
+                        connection.executemany(
+                            f'INSERT OR REPLACE INTO "{name}" VALUES (?, ?, ?)',
+                            [(key, text, now) for key, text in rows.items()]
+                        )
+                    if deleted:
+                        connection.executemany(
+                            f'DELETE FROM "{name}" WHERE key = ?', [(key,) for key in deleted]
+                        )
+
+    def close(self):
+        """Ferme la base"""
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
@@ -0,0 +1,165 @@
+"""
+Supervision des connexions TeleFeed
+Surveille chaque compte connecté, le reconnecte avec backoff et réattache ses redirections
+"""
+
+import asyncio
+import random
+from datetime import datetime
+
+from telethon.errors import AuthKeyError, AuthKeyUnregisteredError, SessionRevokedError, UserDeactivatedError
+from telethon.tl.functions import PingRequest
+
+# Intervalle entre deux vérifications et délai maximal d'un ping
+SUPERVISOR_INTERVAL = 60
+PING_TIMEOUT = 10
+
+# Backoff exponentiel des reconnexions (secondes)
+RECONNECT_BASE_DELAY = 2
+RECONNECT_MAX_DELAY = 300
+
+# États exposés par compte
+STATE_CONNECTED = 'connected'
+STATE_RECONNECTING = 'reconnecting'
+STATE_AUTH_REVOKED = 'auth_revoked'
+
+# Erreurs indiquant que la session n'est plus autorisée
+AUTH_ERRORS = (AuthKeyError, AuthKeyUnregisteredError, SessionRevokedError, UserDeactivatedError)
+
+
+def backoff_delay(attempt):
+    """Délai avant la tentative `attempt` (backoff exponentiel avec gigue complète)"""
+    return random.uniform(0, min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2 ** attempt))
+
+
+class ConnectionSupervisor:
+    """Superviseur des clients TeleFeed d'un TeleFeedManager
+
+    Chaque client est sondé par un PingRequest (pas de get_me). En cas
+    d'échec, il est reconnecté en tâche de fond avec un backoff exponentiel
+    à gigue, puis ses gestionnaires de redirection sont réattachés. Une
+    session révoquée est retirée des clients et marquée comme telle.
+    """
+
+    def __init__(self, manager, interval=SUPERVISOR_INTERVAL):
+        self.manager = manager
+        self.interval = interval
+        self.states = {}
+        self.reconnect_tasks = {}
+
+    def set_state(self, phone_number, state, **details):
+        """Met à jour l'état d'un compte"""
+        current = self.states.get(phone_number, {})
+        if current.get('state') != state:
+            current = {'state': state, 'since': datetime.now().isoformat()}
+        current.update(details)
+        self.states[phone_number] = current
+
+    def get_states(self):
+        """États des comptes supervisés: {phone: {'state', 'since', ...}}
+
+        Appelé aussi depuis les threads Flask: copie de la table (opération
+        atomique) avant de la parcourir.
+        """
+        return {phone: dict(state) for phone, state in dict(self.states).items()}
+
+    async def ping(self, client):
+        """Sonde légère de la connexion d'un client"""
+        if not client.is_connected():
+            return False
+        try:
+            await asyncio.wait_for(client(PingRequest(ping_id=random.getrandbits(63))), PING_TIMEOUT)
+            return True
+        except AUTH_ERRORS:
+            raise
+        except Exception:
+            return False
+
+    async def check_all(self):
+        """Sonde tous les clients en parallèle"""
+        await asyncio.gather(*(
+            self.check(phone_number, client)
+            for phone_number, client in list(self.manager.clients.items())
+            if phone_number not in self.reconnect_tasks
+        ))
+
+        # Oublier les comptes mis en veille ou déconnectés volontairement
+        for phone_number in list(self.states):
+            if phone_number not in self.manager.clients and self.states[phone_number]['state'] == STATE_CONNECTED:
+                del self.states[phone_number]
+
+    async def check(self, phone_number, client):
+        """Sonde un client et lance sa reconnexion s'il ne répond pas"""
+        try:
+            alive = await self.ping(client)
+        except AUTH_ERRORS as e:
+            await self.mark_auth_revoked(phone_number, e)
+            return
+
+        if alive:
+            self.set_state(phone_number, STATE_CONNECTED, last_ping=datetime.now().isoformat())
+        elif phone_number not in self.reconnect_tasks:
+            print(f"⚠️ Connexion perdue pour {phone_number}, reconnexion...")
+            self.reconnect_tasks[phone_number] = asyncio.ensure_future(self.reconnect(phone_number, client))
+
+    async def reconnect(self, phone_number, client):
+        """Reconnecte un client avec backoff puis réattache ses redirections"""
+        attempt = 0
+        try:
+            while self.manager.clients.get(phone_number) is client:
+                self.set_state(phone_number, STATE_RECONNECTING, attempts=attempt)
+                try:
+                    if client.is_connected():
+                        await client.disconnect()
+                    await client.connect()
+                    if not await client.is_user_authorized():
+                        await self.mark_auth_revoked(phone_number, "session non autorisée")
+                        return
+                except AUTH_ERRORS as e:
+                    await self.mark_auth_revoked(phone_number, e)
+                    return
+                except Exception as e:
+                    delay = backoff_delay(attempt)
+                    attempt += 1
+                    print(f"❌ Reconnexion de {phone_number} échouée ({e}), nouvel essai dans {delay:.0f}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                # Réattacher les gestionnaires de redirection sur le client reconnecté
+                await self.manager.setup_redirection_handlers(client, phone_number)
+                self.set_state(phone_number, STATE_CONNECTED, attempts=attempt, last_ping=datetime.now().isoformat())
+                print(f"🔄 {phone_number} reconnecté après {attempt + 1} tentative(s)")
+                return
+        finally:
+            self.reconnect_tasks.pop(phone_number, None)
+
+    async def mark_auth_revoked(self, phone_number, reason):
+        """Retire un compte dont la session a été révoquée"""
+        print(f"⛔ Session révoquée pour {phone_number}: {reason}")
+        client = self.manager.clients.pop(phone_number, None)
+        self.manager.detach_redirection_handlers(phone_number)
+        if client is not None:
+            try:
+                await client.disconnect()
+            except Exception:
+                pass
+
+        session_data = self.manager.sessions.get(phone_number)
+        if isinstance(session_data, dict):
+            session_data['connected'] = False
+            session_data['auth_revoked_at'] = datetime.now().isoformat()
+            self.manager.save_all_data('sessions')
+        self.set_state(phone_number, STATE_AUTH_REVOKED, reason=str(reason))
+
+    async def run(self):
+        """Boucle de supervision"""
+        while True:
+            try:
+                await asyncio.sleep(self.interval)
+                await self.check_all()
+            except asyncio.CancelledError:
+                for task in self.reconnect_tasks.values():
+                    task.cancel()
+                break
+            except Exception as e:
+                print(f"❌ Erreur dans la supervision TeleFeed : {e}")
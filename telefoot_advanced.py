@@ -10,6 +10,7 @@ import json, time, re
 from datetime import datetime, timedelta
 import asyncio
 import os
+from user_store import get_user_store
 
 # Configuration
 api_id = int(os.getenv('API_ID', '29177661'))
@@ -138,10 +139,11 @@ def add_redirection(name, session, sources, destinations):
 
 # ========== 12. LICENCE SYSTEM ==========
 
+user_store = get_user_store("users.json")
+
 def is_user_active(user_id):
     """Vérifie si un utilisateur a une licence active"""
-    db = load_json("users.json")
-    user = db.get(str(user_id))
+    user = user_store.get(user_id)
     if not user: 
         return False
     try:
@@ -152,21 +154,18 @@ def is_user_active(user_id):
 
 def activate_user(user_id, duration):
     """Active un utilisateur avec une durée donnée"""
-    db = load_json("users.json")
     days = 7 if duration == "semaine" else 30
     expire = datetime.now() + timedelta(days=days)
-    db[str(user_id)] = {
+    user_store.put(user_id, {
         "expire_at": expire.strftime("%Y-%m-%d %H:%M:%S"),
         "activated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "plan": duration
-    }
-    save_json("users.json", db)
+    })
     return expire.strftime("%d/%m/%Y %H:%M")
 
 def get_user_info(user_id):
     """Récupère les informations d'un utilisateur"""
-    db = load_json("users.json")
-    return db.get(str(user_id))
+    return user_store.get(user_id)
 
 # ========== FILTERS & TRANSFORMS ==========
 
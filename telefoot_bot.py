@@ -9,8 +9,8 @@ from telethon.sync import TelegramClient, events
 from telethon import Button
 import datetime
 import uuid
-import json
 import os
+from user_store import UserRecords
 
 # ==== CONFIGURATION ====
 API_ID = int(os.getenv('API_ID', '29177661'))
@@ -24,21 +24,13 @@ USERS_FILE = "users.json"
 # ==== GESTION UTILISATEURS ====
 
 def load_users():
-    """Charge les utilisateurs depuis le fichier JSON"""
-    try:
-        with open(USERS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-    except json.JSONDecodeError:
-        print(f"Erreur de lecture du fichier {USERS_FILE}")
-        return {}
+    """Charge les utilisateurs depuis le store partagé"""
+    return UserRecords(USERS_FILE)
 
 def save_users(users):
-    """Sauvegarde les utilisateurs dans le fichier JSON"""
+    """Sauvegarde les utilisateurs modifiés"""
     try:
-        with open(USERS_FILE, "w", encoding='utf-8') as f:
-            json.dump(users, f, indent=2, ensure_ascii=False)
+        users.save()
     except Exception as e:
         print(f"Erreur lors de la sauvegarde : {e}")
 
@@ -14,6 +14,7 @@ from datetime import datetime, timedelta
 from telethon import TelegramClient, events
 from telethon.errors import SessionPasswordNeededError, PhoneCodeExpiredError
 from telethon.tl.types import User, Chat, Channel
+from user_store import UserRecords
 
 # Configuration
 API_ID = int(os.getenv('API_ID', '0'))
@@ -63,7 +64,7 @@ def load_all_data():
     global users, telefeed_sessions, telefeed_redirections, telefeed_transformations
     global telefeed_whitelist, telefeed_blacklist, telefeed_settings, telefeed_chats
     
-    users = load_json('users.json')
+    users = UserRecords('users.json')
     telefeed_sessions = load_json('telefeed_sessions.json')
     telefeed_redirections = load_json('telefeed_redirections.json')
     telefeed_transformations = load_json('telefeed_transformations.json')
@@ -74,7 +75,7 @@ def load_all_data():
 
 def save_all_data():
     """Sauvegarde toutes les données"""
-    save_json('users.json', users)
+    users.save()
     save_json('telefeed_sessions.json', telefeed_sessions)
     save_json('telefeed_redirections.json', telefeed_redirections)
     save_json('telefeed_transformations.json', telefeed_transformations)
@@ -10,6 +10,7 @@ from telethon import events
 import json, time, re, os, asyncio
 from datetime import datetime, timedelta
 from telefeed_commands import register_telefeed_handlers
+from user_store import get_user_store
 
 # Configuration
 api_id = int(os.getenv('API_ID', '29177661'))
@@ -32,9 +33,10 @@ def save_json(file, data):
 
 # ========== SYSTÈME DE LICENCES ==========
 
+user_store = get_user_store("users.json")
+
 def is_user_active(user_id):
-    db = load_json("users.json")
-    user = db.get(str(user_id))
+    user = user_store.get(user_id)
     if not user: 
         return False
     try:
@@ -44,20 +46,17 @@ def is_user_active(user_id):
         return False
 
 def activate_user(user_id, duration):
-    db = load_json("users.json")
     days = 7 if duration == "semaine" else 30
     expire = datetime.now() + timedelta(days=days)
-    db[str(user_id)] = {
+    user_store.put(user_id, {
         "expire_at": expire.strftime("%Y-%m-%d %H:%M:%S"),
         "activated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "plan": duration
-    }
-    save_json("users.json", db)
+    })
     return expire.strftime("%d/%m/%Y %H:%M")
 
 def get_user_info(user_id):
-    db = load_json("users.json")
-    return db.get(str(user_id))
+    return user_store.get(user_id)
 
 # ========== CONNEXION OPTIMISÉE ==========
 
@@ -0,0 +1,16 @@
+"""
+Fixtures partagées des tests
+"""
+
+import pytest
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """TeleFeedManager isolé: fichiers de données dans un répertoire temporaire, sans sauvegarde"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('TELEFEED_STORAGE', 'json')
+    from telefeed_commands import TeleFeedManager
+    manager = TeleFeedManager()
+    manager.save_all_data = lambda *collections, publish=True: None
+    return manager
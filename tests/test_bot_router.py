@@ -0,0 +1,161 @@
+"""
+Tests de l'aiguillage des commandes et des boutons du bot
+"""
+
+import asyncio
+
+from bot_router import CallbackRouter, CommandRouter
+
+
+class Message:
+    def __init__(self, text):
+        self.raw_text = text
+        self.pattern_match = None
+
+
+class Click:
+    def __init__(self, data, sender_id=1):
+        self.data = data
+        self.sender_id = sender_id
+        self.answers = []
+
+    async def answer(self, text, alert=False):
+        self.answers.append(text)
+
+
+def recorder(calls, name):
+    async def handler(event, *args):
+        calls.append((name, event.pattern_match.group(0) if getattr(event, 'pattern_match', None) else None) + args)
+    return handler
+
+
+def dispatch(router, event):
+    asyncio.run(router.dispatch(event))
+    return event
+
+
+def test_command_uses_first_matching_pattern():
+    calls = []
+    router = CommandRouter()
+    router.add('/chats', recorder(calls, 'search'), r'/chats (\d+) (.+)')
+    router.add('/chats', recorder(calls, 'list'), r'/chats (\d+)$')
+    router.add('/chats', recorder(calls, 'help'))
+
+    dispatch(router, Message('/chats 123'))
+    dispatch(router, Message('/chats 123 news'))
+    dispatch(router, Message('/chats'))
+
+    assert [name for name, *_ in calls] == ['list', 'search', 'help']
+
+
+def test_command_ignores_bot_suffix_and_case():
+    calls = []
+    router = CommandRouter()
+    router.add('/start', recorder(calls, 'start'))
+
+    dispatch(router, Message('/START@telefoot_bot'))
+
+    assert calls == [('start', None)]
+
+
+def test_unknown_command_does_not_reach_text_handlers():
+    calls = []
+    router = CommandRouter()
+    router.add_text(recorder(calls, 'default'))
+
+    dispatch(router, Message('/inconnue'))
+
+    assert calls == []
+
+
+def test_longest_text_prefix_wins():
+    calls = []
+    router = CommandRouter()
+    router.add('a', recorder(calls, 'a'))
+    router.add('aa', recorder(calls, 'code'), r'^aa(\d+)$')
+
+    dispatch(router, Message('aa12345'))
+    dispatch(router, Message('abc'))
+
+    assert calls == [('code', 'aa12345'), ('a', None)]
+
+
+def test_text_patterns_before_default():
+    calls = []
+    router = CommandRouter()
+    router.add_text(recorder(calls, 'reactivation'), r'(?i).*réactiver.*bot')
+    router.add_text(recorder(calls, 'default'))
+
+    dispatch(router, Message('Merci de RÉACTIVER le bot'))
+    dispatch(router, Message('708415014 - 642797040'))
+    dispatch(router, Message(''))
+
+    assert [name for name, *_ in calls] == ['reactivation', 'default']
+
+
+def test_callback_exact_data_before_prefix():
+    calls = []
+    router = CallbackRouter()
+    router.add('cancel_payment', recorder(calls, 'cancel'))
+    router.add_prefix('cancel', recorder(calls, 'prefix'))
+
+    dispatch(router, Click(b'cancel_payment'))
+    dispatch(router, Click(b'cancel_other'))
+
+    assert calls == [('cancel', None, ''), ('prefix', None, 'other')]
+
+
+def test_callback_prefix_receives_rest_of_data():
+    calls = []
+    router = CallbackRouter()
+    router.add_prefix('rd', recorder(calls, 'redirection'))
+    router.add_prefix('pay', recorder(calls, 'payment'))
+
+    dispatch(router, Click(b'rd:l:3'))
+    dispatch(router, Click(b'pay_semaine_42'))
+
+    assert calls == [('redirection', None, 'l:3'), ('payment', None, 'semaine_42')]
+
+
+def test_unknown_callback_is_answered():
+    router = CallbackRouter()
+
+    click = dispatch(router, Click(b'inconnu'))
+
+    assert click.answers == ["⚠️ Action en développement"]
+
+
+def test_main_menu_is_sent_as_new_message():
+    from bot_router import get_callback_router
+    from button_interface import MAIN_MENU, STATIC_MENUS, ButtonInterface
+
+    class Bot:
+        def add_event_handler(self, callback, event):
+            pass
+
+    class UserManager:
+        def check_user_access(self, user_id):
+            return True
+
+    class MenuClick(Click):
+        def __init__(self, data):
+            super().__init__(data)
+            self.replies = []
+            self.edits = []
+
+        async def reply(self, message, **kwargs):
+            self.replies.append(message)
+
+        async def edit(self, message, **kwargs):
+            self.edits.append(message)
+
+    bot = Bot()
+    ButtonInterface(bot, UserManager())
+    router = get_callback_router(bot)
+
+    main = dispatch(router, MenuClick(b'main_menu'))
+    connect = dispatch(router, MenuClick(b'connect_menu'))
+
+    assert 'main_menu' not in STATIC_MENUS
+    assert (main.replies, main.edits) == ([MAIN_MENU[0]], [])
+    assert (connect.replies, connect.edits) == ([], [STATIC_MENUS['connect_menu'][0]])
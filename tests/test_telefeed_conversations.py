@@ -0,0 +1,89 @@
+"""
+Tests des états de conversation TeleFeed
+"""
+
+import telefeed_conversations
+from telefeed_conversations import ConversationStore, drop_legacy_states
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_store(monkeypatch, ttl=60):
+    clock = Clock()
+    monkeypatch.setattr(telefeed_conversations.time, 'monotonic', clock)
+    return ConversationStore(ttl), clock
+
+
+def test_start_replaces_previous_conversation(monkeypatch):
+    store, _ = make_store(monkeypatch)
+    store.start(1, 'redirection', step='name')
+    store.start('1', 'whitelist', phone='+33')
+
+    conversation = store.get(1)
+    assert conversation.kind == 'whitelist'
+    assert conversation.data == {'phone': '+33'}
+    assert len(store) == 1
+
+
+def test_conversation_expires_after_ttl(monkeypatch):
+    store, clock = make_store(monkeypatch)
+    store.start(1, 'redirection')
+
+    clock.now += 59
+    assert store.get(1) is not None
+    clock.now += 1
+    assert store.get(1) is None
+    assert len(store) == 0
+
+
+def test_touch_postpones_expiry(monkeypatch):
+    store, clock = make_store(monkeypatch)
+    store.start(1, 'redirection')
+    store.start(2, 'blacklist')
+
+    clock.now += 50
+    store.touch(1)
+    clock.now += 20
+
+    assert store.get(1) is not None
+    assert store.get(2) is None
+
+
+def test_purge_stops_at_first_live_conversation(monkeypatch):
+    store, clock = make_store(monkeypatch)
+    for user_id in range(5):
+        store.start(user_id, 'redirection')
+        clock.now += 10
+
+    clock.now += 25
+    store.purge()
+
+    assert list(store.conversations) == [2, 3, 4]
+
+
+def test_finish_and_unknown_users(monkeypatch):
+    store, _ = make_store(monkeypatch)
+    store.start(1, 'transformation')
+    store.finish(1)
+    store.finish(2)
+    store.touch(3)
+
+    assert store.get(1) is None
+    assert len(store) == 0
+
+
+def test_drop_legacy_states():
+    sessions = {
+        '+33612345678': {'connected': True},
+        'pending_redirection_42': {'step': 'name'},
+        'gui_redirection_42': {'action': 'add'},
+    }
+
+    assert drop_legacy_states(sessions) == 2
+    assert list(sessions) == ['+33612345678']
@@ -0,0 +1,170 @@
+"""
+Tests de l'index des dialogues TeleFeed (recherche par titre)
+"""
+
+import asyncio
+
+import pytest
+
+import telefeed_dialogs
+from telefeed_dialogs import DialogIndex, normalize_title, title_tokens
+
+PHONE = '+33612345678'
+
+
+def entry(chat_id, title, kind='channel'):
+    return {'id': chat_id, 'title': title, 'type': kind}
+
+
+@pytest.fixture
+def index(monkeypatch):
+    # Les entités Telethon sont remplacées par leurs entrées d'index
+    monkeypatch.setattr(telefeed_dialogs, 'chat_data', lambda entity, title=None: entity)
+    changes = []
+    dialogs = DialogIndex(on_change=changes.append)
+    dialogs.changes = changes
+    for chat in (
+        entry(-1001, '𝐅𝐨𝐨𝐭 News'),
+        entry(-1002, 'Football Stats'),
+        entry(-1003, 'Paris Live', 'supergroup'),
+        entry(42, 'Élodie', 'user'),
+    ):
+        dialogs.upsert(PHONE, chat)
+    return dialogs
+
+
+def ids(chats):
+    return [chat['id'] for chat in chats]
+
+
+def test_normalize_title():
+    assert normalize_title('𝐅𝐨𝐨𝐭 NEWS') == 'foot news'
+    assert title_tokens('Paris-Live 2024!') == ['paris', 'live', '2024']
+
+
+def test_search_by_word_prefixes(index):
+    assert ids(index.search(PHONE, 'foot')) == [-1001, -1002]
+    assert ids(index.search(PHONE, 'foot news')) == [-1001]
+    assert ids(index.search(PHONE, 'FOOTB')) == [-1002]
+    assert ids(index.search(PHONE, 'elodie')) == []
+    assert ids(index.search(PHONE, 'élo')) == [42]
+
+
+def test_search_by_id(index):
+    assert ids(index.search(PHONE, '1003')) == [-1003]
+
+
+def test_search_limit_and_empty_query(index):
+    assert len(index.search(PHONE, 'f', limit=1)) == 1
+    assert index.search(PHONE, '  !! ') == []
+    assert index.search('+1', 'foot') == []
+
+
+def test_search_keeps_dialog_order(index):
+    index.upsert(PHONE, entry(-1004, 'Foot Mercato'))
+    index.upsert(PHONE, entry(-1001, 'Foot News FR'))
+
+    # Un chat mis à jour garde sa place, un nouveau chat va en fin de liste
+    assert ids(index.search(PHONE, 'foot')) == [-1001, -1002, -1004]
+    assert ids(index.search(PHONE, 'foot', limit=2)) == [-1001, -1002]
+
+    index.remove(PHONE, -1001)
+    index.upsert(PHONE, entry(-1001, 'Foot News'))
+    assert ids(index.search(PHONE, 'foot')) == [-1002, -1004, -1001]
+
+
+def test_upsert_updates_title_tokens(index):
+    index.upsert(PHONE, entry(-1002, 'Basket Stats'))
+
+    assert ids(index.search(PHONE, 'football')) == []
+    assert ids(index.search(PHONE, 'basket')) == [-1002]
+    assert len(index.list(PHONE)) == 4
+
+
+def test_unchanged_upsert_does_not_notify(index):
+    count = len(index.changes)
+    index.upsert(PHONE, entry(-1003, 'Paris Live', 'supergroup'))
+
+    assert len(index.changes) == count
+
+
+def test_remove_unindexes_chat(index):
+    index.remove(PHONE, -1001)
+    index.remove(PHONE, -9999)
+
+    assert ids(index.search(PHONE, 'foot')) == [-1002]
+    assert index.changes[-1] == PHONE
+
+
+class Me:
+    user_id = 7
+
+
+class Client:
+    def __init__(self, dialogs=()):
+        self.dialogs = dialogs
+        self.handlers = []
+        self.paginations = 0
+
+    async def iter_dialogs(self):
+        self.paginations += 1
+        for dialog in self.dialogs:
+            yield dialog
+
+    async def get_me(self, input_only=False):
+        return Me()
+
+    def add_event_handler(self, callback, event):
+        self.handlers.append(callback)
+
+    def remove_event_handler(self, callback):
+        self.handlers.remove(callback)
+
+
+class Dialog:
+    def __init__(self, chat):
+        self.entity = chat
+        self.title = chat['title']
+        self.name = chat['title']
+
+
+def test_load_seeds_index_without_notifying():
+    index = DialogIndex(on_change=lambda phone: pytest.fail('sauvegarde inutile'))
+    index.load(PHONE, [entry(-1001, 'Foot News'), entry(42, 'Élodie', 'user')])
+
+    assert index.is_synced(PHONE)
+    assert index.synced_at(PHONE) is None
+    assert ids(index.search(PHONE, 'élo')) == [42]
+
+
+def test_reconnect_reattaches_without_paginating(index):
+    index.synced[PHONE] = {'at': None}
+    first, second = Client(), Client()
+
+    asyncio.run(index.follow(PHONE, first))
+    asyncio.run(index.follow(PHONE, first))
+    asyncio.run(index.follow(PHONE, second))
+
+    assert (first.paginations, second.paginations) == (0, 0)
+    assert first.handlers == [] and len(second.handlers) == 2
+
+
+def test_manager_seeds_from_saved_chats_and_refresh_forces_sync(manager, monkeypatch):
+    monkeypatch.setattr(telefeed_dialogs, 'chat_data', lambda entity, title=None: entity)
+    client = Client([Dialog(entry(-1009, 'Nouveau canal'))])
+    manager.chats[PHONE] = [entry(-1001, 'Foot News')]
+
+    async def ensure_connected(phone_number):
+        return client
+
+    monkeypatch.setattr(manager, 'ensure_connected', ensure_connected)
+
+    result = asyncio.run(manager.get_chats(PHONE))
+    assert ids(result['chats']) == [-1001]
+    assert client.paginations == 0
+    assert len(client.handlers) == 2
+
+    result = asyncio.run(manager.get_chats(PHONE, refresh=True))
+    assert ids(result['chats']) == [-1009]
+    assert client.paginations == 1
+    assert manager.chats[PHONE] == [entry(-1009, 'Nouveau canal')]
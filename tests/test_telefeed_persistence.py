@@ -0,0 +1,87 @@
+"""
+Tests de la sauvegarde différée TeleFeed
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from telefeed_commands import DATA_FILES, TeleFeedManager, write_json_text
+
+
+def test_concurrent_writes_use_distinct_temp_files(tmp_path):
+    filename = str(tmp_path / 'data.json')
+    texts = [json.dumps({'writer': n, 'payload': 'x' * 10000}) for n in range(8)]
+    results = []
+
+    threads = [threading.Thread(target=lambda t=text: results.append(write_json_text(filename, t))) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [True] * len(texts)
+    with open(filename, encoding='utf-8') as f:
+        assert f.read() in texts
+    assert [p.name for p in tmp_path.iterdir()] == ['data.json']
+
+
+def test_flush_pending_waits_for_write_in_flight(manager, monkeypatch):
+    # Sauvegarde réelle (la fixture la désactive)
+    manager.save_all_data = TeleFeedManager.save_all_data.__get__(manager)
+    write_snapshot = manager._write_snapshot
+    writes = []
+
+    def slow_write(snapshot):
+        writes.append(json.loads(snapshot['redirections']))
+        time.sleep(0.05)
+        return write_snapshot(snapshot)
+
+    monkeypatch.setattr(manager, '_write_snapshot', slow_write)
+
+    async def scenario():
+        manager.redirections['+1'] = {'r1': {'version': 1}}
+        manager.save_all_data('redirections')
+        manager._start_flush()
+        await asyncio.sleep(0.01)
+
+        # Modification pendant l'écriture, puis arrêt
+        manager.redirections['+1'] = {'r1': {'version': 2}}
+        manager.save_all_data('redirections')
+        await manager.flush_pending()
+
+    asyncio.run(scenario())
+
+    assert [w['+1']['r1']['version'] for w in writes] == [1, 2]
+    with open(DATA_FILES['redirections'], encoding='utf-8') as f:
+        assert json.load(f) == {'+1': {'r1': {'version': 2}}}
+    assert manager.flush_task.done()
+    assert manager.flush_handle is None
+    assert not manager.dirty
+
+
+def test_chats_are_loaded_per_account_on_first_access(tmp_path, monkeypatch):
+    import config
+    from telefeed_storage import ConfigStore
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, 'TELEFEED_STORAGE', 'sqlite')
+    chats = {'+1': [{'id': -1001, 'title': 'Foot News', 'type': 'channel'}], '+2': [{'id': 42, 'title': 'Alice', 'type': 'user'}]}
+    store = ConfigStore(DATA_FILES)
+    store.write({'chats': ({phone: json.dumps(data) for phone, data in chats.items()}, [])})
+    store.close()
+
+    manager = TeleFeedManager()
+    assert manager.chats == {}
+
+    assert manager.dialogs_known('+1')
+    assert manager.chats == {'+1': chats['+1']}
+    assert not manager.dialogs_known('+3')
+
+    # Une nouvelle liste pour +1 est écrite; +2, jamais lu, reste intact
+    manager.dialog_index.remove('+1', -1001)
+    manager.flush_data()
+    manager.config_store.close()
+
+    assert ConfigStore(DATA_FILES).load('chats') == {'+1': [], '+2': chats['+2']}
@@ -0,0 +1,99 @@
+"""
+Tests de la restauration des sessions TeleFeed au démarrage
+"""
+
+import asyncio
+
+import pytest
+from telethon.sessions import MemorySession
+from telethon.tl.types import InputPeerChannel, InputPeerChat, InputPeerUser
+
+
+def test_restore_is_bounded_and_reports_failures(manager, monkeypatch):
+    import config
+    monkeypatch.setattr(config, 'TELEFEED_LAZY_CONNECT', True)
+    phones = ['+1', '+2', '+3', '+4', '+5']
+    for phone in phones:
+        manager.sessions[phone] = {'connected': True}
+        manager.source_index[phone] = {-100: ['r1']}
+    manager.sessions['+6'] = {'connected': True}          # sans redirection: en veille
+    manager.sessions['temp_+7'] = {'connected': True}     # session temporaire ignorée
+    manager.sessions['+8'] = {'connected': False}
+
+    running = []
+    peak = []
+
+    async def restore_session(phone_number):
+        running.append(phone_number)
+        peak.append(len(running))
+        try:
+            if phone_number == '+4':
+                raise RuntimeError('auth key revoked')
+            await asyncio.sleep(1 if phone_number == '+5' else 0.01)
+            return True
+        finally:
+            running.remove(phone_number)
+
+    monkeypatch.setattr(manager, '_restore_session', restore_session)
+
+    report = asyncio.run(manager.restore_existing_sessions(concurrency=2, timeout=0.2))
+
+    assert max(peak) == 2
+    assert report['total'] == 5 and report['dormant'] == 1
+    assert report['restored'] == 3 and report['failed'] == 2
+    assert report['time_to_first_redirect'] is not None
+    assert manager.sessions['+4'] == {'connected': False, 'error': 'auth key revoked'}
+    assert manager.sessions['+5']['error'] == 'timeout (0.2s)'
+
+
+class Client:
+    def __init__(self, entities=None):
+        self.session = MemorySession()
+        self.entities = entities or {}
+
+    async def get_entity(self, chat_id):
+        return self.entities[chat_id]
+
+
+def record(peer_id, access_hash, peer_type='channel', can_post=False):
+    return {'peer_id': peer_id, 'access_hash': access_hash, 'type': peer_type, 'title': None,
+            'can_post_as_channel': can_post}
+
+
+def test_preload_feeds_stored_entities_to_the_session(manager):
+    manager.entity_store.save('+1', -1000000000100, record(100, 1111, can_post=True))
+    manager.entity_store.save('+1', 'alice', record(7, 2222, 'user'))
+    manager.entity_store.save('+1', -300, record(300, None, 'chat'))
+    manager.entity_store.save('+1', -1000000000400, record(400, None))
+    manager.entity_store.save_source('+1', -1000000000500, record(500, 5555))
+    manager.entity_store.save_source('+1', -1000000000600, record(600, None))
+    client = manager.clients['+1'] = Client()
+
+    assert manager.preload_entities('+1') == 4
+
+    # La session connaît les hash d'accès sans appel réseau
+    session = client.session
+    assert session.get_input_entity(-1000000000100) == InputPeerChannel(100, 1111)
+    assert session.get_input_entity(7) == InputPeerUser(7, 2222)
+    assert session.get_input_entity(-300) == InputPeerChat(300)
+    assert session.get_input_entity(-1000000000500) == InputPeerChannel(500, 5555)
+    # Sans hash d'accès: pas d'entrée reconstruite, get_entity au premier envoi
+    with pytest.raises(ValueError):
+        session.get_input_entity(-1000000000600)
+    assert manager.destination_cache.get('+1', -1000000000400) is None
+    assert manager.destination_cache.get('+1', -1000000000100)['can_post_as_channel'] is True
+
+
+def test_sources_are_remembered_once(manager):
+    from telethon.tl.types import Channel, ChatPhotoEmpty
+
+    channel = Channel(id=500, title='Source', photo=ChatPhotoEmpty(), date=None, access_hash=5555)
+    client = Client({-1000000000500: channel})
+    manager.source_index['+1'] = {-1000000000500: ['r1'], -1000000000600: ['r2']}
+
+    assert asyncio.run(manager.remember_sources(client, '+1')) == 1
+    assert asyncio.run(manager.remember_sources(client, '+1')) == 0
+
+    stored = manager.entity_store.load_sources('+1')
+    assert list(stored) == ['-1000000000500']
+    assert (stored['-1000000000500']['peer_id'], stored['-1000000000500']['access_hash']) == (500, 5555)
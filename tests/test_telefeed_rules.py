@@ -0,0 +1,230 @@
+"""
+Tests des règles compilées TeleFeed (filtres et transformations)
+"""
+
+import re
+
+import pytest
+
+from telefeed_rules import (
+    CompiledFilter,
+    FilterRuleError,
+    KeywordMatcher,
+    TransformationRuleError,
+    compile_filter,
+    compile_transformations,
+)
+
+
+def legacy_matches(patterns, text):
+    """Correspondance d'une liste de motifs telle que faite avant la compilation"""
+    for pattern in patterns:
+        if isinstance(pattern, str):
+            if pattern.startswith('"') and pattern.endswith('"'):
+                if pattern[1:-1] in text:
+                    return True
+            else:
+                try:
+                    if re.search(pattern, text, re.MULTILINE | re.DOTALL):
+                        return True
+                except re.error:
+                    pass
+    return False
+
+
+TEXTS = [
+    '',
+    'Bonjour à tous',
+    'PROMO: -50% sur tout le site',
+    'ligne 1\nligne 2 contient spam\nfin',
+    'abcabc répété',
+    'prix 10€ puis 20€',
+    'Signal BUY EURUSD @ 1.0850',
+]
+
+PATTERN_SETS = [
+    ['"promo"', '"spam"'],
+    ['"PROMO"', r'\d+€'],
+    [r'^ligne 2', r'fin$'],
+    [r'(abc)\1', '"Bonjour"'],
+    [r'(?i)signal', r'BUY\s+\w+'],
+    [r'(?P<n>\d)€', r'(?P<n>\d)%'],
+    ['""'],
+    ['"x"', 42, None],
+    [r'a.b', r'ligne 1.ligne 2'],
+]
+
+
+@pytest.mark.parametrize('patterns', PATTERN_SETS)
+def test_compiled_filter_matches_legacy_logic(patterns):
+    compiled = CompiledFilter(patterns)
+    for text in TEXTS:
+        assert compiled.matches(text) == legacy_matches(patterns, text), (patterns, text)
+
+
+def test_keyword_matcher_shared_prefixes():
+    matcher = KeywordMatcher(['promo', 'prom', 'promotion', 'spam', 'sp'])
+
+    assert matcher.search('une prom')
+    assert matcher.search('spécial')
+    assert not matcher.search('pro')
+    assert not matcher.search('PROMO')
+
+
+def test_keyword_matcher_escapes_special_characters():
+    matcher = KeywordMatcher(['1.5', '(x)', 'a+b'])
+
+    assert matcher.search('prix 1.5')
+    assert not matcher.search('prix 105')
+    assert matcher.search('f(x)')
+    assert matcher.search('a+b=c')
+    assert not matcher.search('aab')
+
+
+def test_keyword_matcher_empty_keyword_matches_everything():
+    assert KeywordMatcher(['']).search('')
+    assert not KeywordMatcher([])
+    assert not KeywordMatcher([]).search('texte')
+
+
+def test_unmergeable_patterns_stay_separate():
+    compiled = CompiledFilter([r'(a)\1', r'(?i)promo', r'x+', r'y+'])
+
+    # Les deux regex simples sont fusionnées, les autres gardées à part
+    assert len(compiled.regexes) == 3
+    assert compiled.matches('aa')
+    assert compiled.matches('PROMO')
+    assert not compiled.matches('ab')
+
+
+def test_merge_falls_back_to_separate_regexes():
+    # Groupes nommés identiques: l'alternance fusionnée ne compile pas
+    compiled = CompiledFilter([r'(?P<n>\d)€', r'(?P<n>\d)%'])
+
+    assert len(compiled.regexes) == 2
+    assert compiled.matches('5%')
+    assert not compiled.matches('cinq')
+
+
+def test_invalid_pattern_strict_and_lenient():
+    with pytest.raises(FilterRuleError) as error:
+        CompiledFilter(['"ok"', '[unclosed'])
+    assert error.value.pattern == '[unclosed'
+
+    compiled = CompiledFilter(['"ok"', '[unclosed'], strict=False)
+    assert [e.pattern for e in compiled.invalid] == ['[unclosed']
+    assert compiled.matches('ok')
+    assert not compiled.matches('[unclosed')
+
+
+def test_compile_filter_configurations():
+    assert compile_filter({'active': False, 'patterns': ['"x"']}) is None
+    assert compile_filter(None) is None
+    assert compile_filter(['"x"']).matches('xyz')
+    assert compile_filter({'active': True, 'patterns': ['"x"']}).matches('x')
+
+
+def legacy_should_process(blacklist, whitelist, text):
+    """should_process_message d'avant la compilation, pour une redirection"""
+    if blacklist.get('active', False) and legacy_matches(blacklist.get('patterns', []), text):
+        return False
+    if whitelist.get('active', False) and whitelist.get('patterns', []):
+        return legacy_matches(whitelist['patterns'], text)
+    return True
+
+
+@pytest.mark.parametrize('blacklist, whitelist', [
+    ({'active': True, 'patterns': ['"spam"']}, {}),
+    ({}, {'active': True, 'patterns': ['"PROMO"', r'\d+€']}),
+    ({'active': True, 'patterns': ['"PROMO"']}, {'active': True, 'patterns': [r'\d+%']}),
+    ({'active': False, 'patterns': ['"Bonjour"']}, {'active': True, 'patterns': []}),
+    ({'active': True, 'patterns': [r'(?i)signal']}, {'active': False, 'patterns': ['"x"']}),
+])
+def test_should_process_message_matches_legacy_logic(manager, blacklist, whitelist):
+    manager.blacklist['+1'] = {'r1': blacklist}
+    manager.whitelist['+1'] = {'r1': whitelist}
+
+    for text in TEXTS:
+        expected = legacy_should_process(blacklist, whitelist, text)
+        assert manager.should_process_message(text, '+1', 'r1') == expected, text
+
+
+def legacy_transform(config, text):
+    """apply_transformations d'avant la compilation, pour une redirection"""
+    if not text:
+        return text
+    format_data = config.get('format')
+    if format_data:
+        text = format_data.get('template', '[[Message.Text]]').replace('[[Message.Text]]', text)
+    power_data = config.get('power')
+    if power_data:
+        for rule in power_data.get('rules', []):
+            if '=' in rule:
+                pattern, replacement = rule.split('=', 1)
+                try:
+                    text = re.sub(pattern, replacement, text, flags=re.MULTILINE | re.DOTALL)
+                except re.error:
+                    pass
+            elif '","' in rule:
+                rule = rule.strip('"')
+                if '","' in rule:
+                    old, new = rule.split('","', 1)
+                    text = text.replace(old, new)
+    remove_lines_data = config.get('removeLines')
+    if remove_lines_data:
+        keywords = remove_lines_data.get('keywords', [])
+        text = '\n'.join(
+            line for line in text.split('\n')
+            if not any(keyword in line for keyword in keywords)
+        )
+    return text
+
+
+TRANSFORMATION_CONFIGS = [
+    {},
+    {'format': {'template': '📢 [[Message.Text]]\n— via TeleFeed'}},
+    {'format': {'template': '[[Message.Text]] / [[Message.Text]]'}},
+    {'power': {'rules': [r'\d+€=XX€', '"spam","ham"', r'(\w+)@(\w+)=\2 chez \1', r'x=\9']}},
+    {'removeLines': {'keywords': ['ligne 2', 'https://']}},
+    {'removeLines': {'keywords': ['']}},
+    {
+        'format': {'template': 'En-tête\n[[Message.Text]]'},
+        'power': {'rules': ['"En-tête","Titre"', r'^fin$=FIN']},
+        'removeLines': {'keywords': ['Titre']}
+    },
+]
+
+
+@pytest.mark.parametrize('config', TRANSFORMATION_CONFIGS)
+def test_pipeline_matches_legacy_logic(config):
+    pipeline = compile_transformations(config)
+    for text in TEXTS + ['contact@domaine\nhttps://lien\nfin']:
+        assert pipeline.apply(text) == legacy_transform(config, text), (config, text)
+
+
+def test_pipeline_order_format_power_remove_lines():
+    pipeline = compile_transformations({
+        'format': {'template': '[[Message.Text]]\nsupprimer'},
+        'power': {'rules': ['"garder","supprimer"']},
+        'removeLines': {'keywords': ['supprimer']}
+    })
+
+    assert pipeline.apply('garder\nautre') == 'autre'
+
+
+def test_pipeline_invalid_power_rule():
+    with pytest.raises(TransformationRuleError) as error:
+        compile_transformations({'power': {'rules': ['[x=y']}})
+    assert error.value.pattern == '[x'
+
+    pipeline = compile_transformations({'power': {'rules': ['[x=y', 'a=b']}}, strict=False)
+    assert [e.pattern for e in pipeline.invalid] == ['[x']
+    assert pipeline.apply('abc') == 'bbc'
+
+
+def test_empty_pipeline():
+    pipeline = compile_transformations(None)
+
+    assert not pipeline
+    assert pipeline.apply('texte') == 'texte'
+    assert pipeline.apply('') == ''
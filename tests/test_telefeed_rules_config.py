@@ -0,0 +1,41 @@
+"""
+Tests de l'enregistrement des règles TeleFeed (validation des seules règles modifiées)
+"""
+
+import pytest
+
+from telefeed_rules import FilterRuleError, TransformationRuleError
+
+PHONE = '+33612345678'
+
+
+def test_new_invalid_filter_pattern_is_rejected(manager):
+    with pytest.raises(FilterRuleError):
+        manager.set_filter_rules('whitelist', PHONE, 'r1', ['foot', '(unclosed'])
+    assert PHONE not in manager.whitelist
+
+
+def test_stored_invalid_filter_pattern_does_not_block_changes(manager, capsys):
+    # Motif invalide accepté par une ancienne version
+    manager.whitelist[PHONE] = {'r1': ['(legacy', 'foot']}
+
+    manager.set_filter_rules('whitelist', PHONE, 'r1', ['(legacy', 'foot', 'basket'])
+    manager.set_filter_rules('blacklist', PHONE, 'r1', ['pub'])
+
+    assert manager.whitelist[PHONE]['r1'] == ['(legacy', 'foot', 'basket']
+    assert manager.blacklist[PHONE]['r1'] == ['pub']
+    assert 'règle existante ignorée' in capsys.readouterr().out
+    with pytest.raises(FilterRuleError):
+        manager.set_filter_rules('whitelist', PHONE, 'r1', ['(legacy', '[new'])
+
+
+def test_transformation_validates_only_the_changed_feature(manager):
+    manager.transformations[PHONE] = {'r1': {'power': {'rules': ['(bad=x']}}}
+
+    manager.set_transformation(PHONE, 'r1', 'removeLines', {'keywords': ['pub']})
+    manager.set_transformation(PHONE, 'r1', 'power', {'rules': ['(bad=x', 'foot=soccer']})
+
+    assert manager.transformations[PHONE]['r1']['removeLines'] == {'keywords': ['pub']}
+    assert manager.apply_transformations('foot pub\nok', PHONE, 'r1') == 'ok'
+    with pytest.raises(TransformationRuleError):
+        manager.set_transformation(PHONE, 'r1', 'power', {'rules': ['[new=x']})
@@ -0,0 +1,260 @@
+"""
+Tests du chemin d'envoi TeleFeed
+"""
+
+import asyncio
+
+import pytest
+from telethon.errors import FloodWaitError
+
+import telefeed_sender
+from telefeed_sender import AccountSendQueue, OrderedFanout, SendStrategyMemo, TokenBucket
+
+_real_sleep = asyncio.sleep
+
+
+class FakeClock:
+    """Horloge monotone manuelle; `sleep` avance l'horloge au lieu d'attendre"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    async def sleep(self, delay):
+        self.slept.append(delay)
+        self.now += delay
+        await _real_sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(telefeed_sender, 'time', clock)
+    return clock
+
+
+METHODS = ['from_peer', 'raw_request', 'normal', 'direct']
+
+
+def test_strategy_memo_puts_last_success_first(clock):
+    memo = SendStrategyMemo(reprobe_interval=60)
+    assert memo.order('+1', -100, METHODS) == METHODS
+
+    memo.record_success('+1', -100, 'normal')
+
+    assert memo.order('+1', -100, METHODS) == ['normal', 'from_peer', 'raw_request', 'direct']
+    assert memo.order('+1', -200, METHODS) == METHODS
+    assert memo.order('+1', -100, ['direct']) == ['direct']
+
+
+def test_strategy_memo_forgets_failed_method(clock):
+    memo = SendStrategyMemo()
+    memo.record_success('+1', -100, 'normal')
+
+    memo.record_failure('+1', -100, 'direct')
+    assert memo.order('+1', -100, METHODS)[0] == 'normal'
+
+    memo.record_failure('+1', -100, 'normal')
+    assert memo.order('+1', -100, METHODS) == METHODS
+
+
+def test_strategy_memo_reprobes_after_interval(clock):
+    memo = SendStrategyMemo(reprobe_interval=60)
+    memo.record_success('+1', -100, 'normal')
+
+    # Un succès répété ne repousse pas le re-sondage
+    clock.advance(40)
+    memo.record_success('+1', -100, 'normal')
+    clock.advance(30)
+    assert memo.order('+1', -100, METHODS) == METHODS
+
+    memo.record_success('+1', -100, 'from_peer')
+    assert memo.order('+1', -100, METHODS)[0] == 'from_peer'
+
+
+def test_strategy_memo_invalidate(clock):
+    memo = SendStrategyMemo()
+    memo.record_success('+1', -100, 'normal')
+    memo.record_success('+1', -200, 'normal')
+    memo.record_success('+2', -100, 'normal')
+
+    memo.invalidate('+1', -100)
+    assert ('+1', -100) not in memo.strategies
+
+    memo.invalidate('+1')
+    assert list(memo.strategies) == [('+2', -100)]
+
+
+def test_fanout_keeps_order_per_destination():
+    fanout = OrderedFanout()
+    delivered = []
+
+    def sender(dest_id, number, delay):
+        async def send():
+            await asyncio.sleep(delay)
+            delivered.append((dest_id, number))
+            return number
+        return send
+
+    async def scenario():
+        tasks = []
+        for number in range(5):
+            # Les premiers messages sont les plus lents
+            for dest_id in (-200, -300):
+                tasks.append(fanout.schedule('+1', -100, dest_id, sender(dest_id, number, 0.01 * (5 - number))))
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(scenario())
+
+    assert results == [number for number in range(5) for _ in range(2)]
+    for dest_id in (-200, -300):
+        assert [n for d, n in delivered if d == dest_id] == list(range(5))
+    assert fanout.in_flight() == 0
+
+
+def test_fanout_destinations_overlap():
+    fanout = OrderedFanout()
+    running = set()
+    overlap = []
+
+    def sender(dest_id):
+        async def send():
+            running.add(dest_id)
+            await asyncio.sleep(0.01)
+            overlap.append(set(running))
+            running.discard(dest_id)
+        return send
+
+    async def scenario():
+        await asyncio.gather(
+            fanout.schedule('+1', -100, -200, sender(-200)),
+            fanout.schedule('+1', -100, -300, sender(-300))
+        )
+
+    asyncio.run(scenario())
+
+    assert {-200, -300} in overlap
+
+
+def test_fanout_failure_does_not_block_next_message():
+    fanout = OrderedFanout()
+    delivered = []
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError('envoi impossible')
+
+    async def succeeding():
+        delivered.append('second')
+
+    async def scenario():
+        first = fanout.schedule('+1', -100, -200, failing)
+        second = fanout.schedule('+1', -100, -200, succeeding)
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    first, second = asyncio.run(scenario())
+
+    assert isinstance(first, RuntimeError)
+    assert delivered == ['second']
+
+
+def test_fanout_limits_sends_in_flight_per_destination():
+    fanout = OrderedFanout(max_in_flight=2)
+    active = 0
+    peak = 0
+
+    async def send():
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    async def scenario():
+        # Sources différentes, même destination: seule la limite s'applique
+        await asyncio.gather(*[
+            fanout.schedule('+1', source_id, -200, send) for source_id in range(6)
+        ])
+
+    asyncio.run(scenario())
+
+    assert peak == 2
+
+
+def test_token_bucket_burst_then_refill(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+
+    assert [bucket.take() for _ in range(3)] == [0, 0, 0]
+    assert bucket.take() == pytest.approx(0.5)
+
+    clock.advance(0.5)
+    assert bucket.take() == 0
+    assert bucket.take() == pytest.approx(0.5)
+
+
+def test_token_bucket_capacity_caps_refill(clock):
+    bucket = TokenBucket(rate=1.0, capacity=2)
+    bucket.take()
+    bucket.take()
+
+    clock.advance(100)
+
+    assert [bucket.take() for _ in range(2)] == [0, 0]
+    assert bucket.take() == pytest.approx(1.0)
+
+
+def test_send_queue_per_chat_rate_limit(clock, monkeypatch):
+    monkeypatch.setattr(asyncio, 'sleep', clock.sleep)
+    send_queue = AccountSendQueue('+1')
+
+    async def call():
+        return 'ok'
+
+    async def scenario():
+        for _ in range(telefeed_sender.SEND_PER_CHAT_BURST + 1):
+            await send_queue.submit(-200, call)
+        # Un autre chat n'est pas ralenti par le premier
+        await send_queue.submit(-300, call)
+
+    asyncio.run(scenario())
+
+    assert clock.slept == [pytest.approx(1 / telefeed_sender.SEND_PER_CHAT_RATE)]
+    assert send_queue.sent == telefeed_sender.SEND_PER_CHAT_BURST + 2
+
+
+def test_send_queue_flood_wait_pauses_and_retries(clock, monkeypatch):
+    monkeypatch.setattr(asyncio, 'sleep', clock.sleep)
+    send_queue = AccountSendQueue('+1')
+    attempts = []
+
+    async def call():
+        attempts.append(clock.now)
+        if len(attempts) == 1:
+            raise FloodWaitError(None, capture=5)
+        return 'envoyé'
+
+    async def other():
+        return 'autre'
+
+    async def scenario():
+        result = await send_queue.submit(-200, call)
+        # La pause concerne tout le compte: les autres chats attendent aussi
+        send_queue.pause(7)
+        other_result = await send_queue.submit(-300, other)
+        return result, other_result
+
+    result, other_result = asyncio.run(scenario())
+
+    assert (result, other_result) == ('envoyé', 'autre')
+    assert attempts[1] - attempts[0] == pytest.approx(5)
+    assert clock.slept == [pytest.approx(5), pytest.approx(7)]
+    assert send_queue.flood_waits == 2
+    assert send_queue.sent == 2
+    assert send_queue.depth == 0
+    assert send_queue.stats()['paused_for'] == 0
@@ -0,0 +1,243 @@
+"""
+Tests de la répartition des comptes TeleFeed sur plusieurs processus
+"""
+
+import asyncio
+import itertools
+import zlib
+
+import telefeed_shards
+from telefeed_shards import (
+    SHARD_WORKER_ENV, ShardCoordinator, ShardWorker, is_shard_worker, owned_part, shard_for
+)
+
+
+class Manager:
+    def __init__(self, **collections):
+        self.collections = collections
+        self.sessions = collections.get('sessions', {})
+        self.saved = []
+
+    def _collection_data(self, name):
+        return self.collections[name]
+
+    def save_all_data(self, *collections, publish=True):
+        self.saved.append((collections, publish))
+
+
+class Queue:
+    def __init__(self):
+        self.items = []
+
+    def put(self, item):
+        self.items.append(item)
+
+
+class Process:
+    def __init__(self, alive_checks):
+        self.alive_checks = alive_checks
+        self.terminated = False
+
+    def is_alive(self):
+        self.alive_checks -= 1
+        return self.alive_checks > 0 and not self.terminated
+
+    def terminate(self):
+        self.terminated = True
+
+
+def coordinator(manager, shard_count):
+    shards = ShardCoordinator.__new__(ShardCoordinator)
+    shards.manager = manager
+    shards.shard_count = shard_count
+    shards.commands = [Queue() for _ in range(shard_count)]
+    shards.events = Queue()
+    shards.processes = []
+    shards.status = {}
+    shards.pending = {}
+    shards.request_ids = itertools.count(1)
+    return shards
+
+
+def test_shard_for_is_stable_crc32():
+    assert shard_for('+33612345678', 4) == zlib.crc32(b'+33612345678') % 4
+    assert {shard_for(f'+336{i:08d}', 3) for i in range(100)} == {0, 1, 2}
+
+
+def test_owned_part_filters_and_copies():
+    phones = [f'+336{i:08d}' for i in range(20)]
+    collection = {phone: {'redirections': []} for phone in phones}
+
+    parts = [owned_part(collection, shard_id, 3) for shard_id in range(3)]
+
+    assert sorted(phone for part in parts for phone in part) == sorted(phones)
+    part = parts[shard_for(phones[0], 3)]
+    part[phones[0]]['redirections'].append('r1')
+    assert collection[phones[0]] == {'redirections': []}
+
+
+def test_is_shard_worker(monkeypatch):
+    monkeypatch.delenv(SHARD_WORKER_ENV, raising=False)
+    assert not is_shard_worker()
+    monkeypatch.setenv(SHARD_WORKER_ENV, '1')
+    assert is_shard_worker()
+
+
+def test_coordinator_publishes_each_shard_its_accounts():
+    phones = [f'+336{i:08d}' for i in range(10)]
+    manager = Manager(redirections={phone: {} for phone in phones}, chats={})
+    shards = coordinator(manager, 2)
+
+    shards.publish(['redirections', 'chats'])
+
+    for shard_id, commands in enumerate(shards.commands):
+        [(kind, update)] = commands.items
+        assert kind == 'update'
+        assert list(update) == ['redirections']
+        assert all(shard_for(phone, 2) == shard_id for phone in update['redirections'])
+
+
+def test_coordinator_keeps_local_client_when_receiving_sessions():
+    client = object()
+    manager = Manager(sessions={'+1': {'connected': True, 'client': client}})
+    shards = coordinator(manager, 1)
+
+    shards.receive(('sessions', {'+1': {'connected': True, 'restored_at': 'now'}}))
+
+    assert manager.sessions['+1'] == {'connected': True, 'restored_at': 'now', 'client': client}
+    assert manager.saved == [(('sessions',), False)]
+
+
+def test_worker_owns_only_its_accounts_and_reports_sessions():
+    phones = [f'+336{i:08d}' for i in range(10)]
+    manager = Manager(sessions={phone: {'connected': True} for phone in phones})
+    events = Queue()
+    worker = ShardWorker(manager, 1, 2, Queue(), events)
+
+    assert [worker.owns(phone) for phone in phones] == [shard_for(phone, 2) == 1 for phone in phones]
+
+    worker.publish(['redirections'])
+    worker.publish(['sessions'])
+    [(kind, sessions)] = events.items
+    assert kind == 'sessions'
+    assert set(sessions) == {phone for phone in phones if worker.owns(phone)}
+
+
+def test_stop_waits_without_blocking_then_terminates(monkeypatch):
+    monkeypatch.setattr(telefeed_shards, 'SHARD_STOP_TIMEOUT', 0.05)
+    shards = coordinator(Manager(), 2)
+    stopping, stuck = Process(alive_checks=2), Process(alive_checks=10 ** 6)
+    shards.processes = [stopping, stuck]
+
+    asyncio.run(shards.stop())
+
+    assert all(commands.items == [('stop',)] for commands in shards.commands)
+    assert not stopping.terminated and stuck.terminated
+    assert shards.processes == []
+
+
+class ChatsManager:
+    """Gestionnaire d'un processus de travail: chats d'un compte connecté"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def get_chats(self, phone_number, refresh=False, query=None):
+        self.calls.append((phone_number, refresh, query))
+        chats = [{'id': -1001, 'title': 'News', 'type': 'channel'}, {'id': 42, 'title': 'Alice', 'type': 'user'}]
+        if query is not None:
+            chats = [chat for chat in chats if chat['title'].lower().startswith(query)]
+        return {'status': 'success', 'chats': chats}
+
+
+def test_chats_request_round_trip():
+    phone = '+33612345678'
+    shards = coordinator(Manager(), 3)
+    owner = shard_for(phone, 3)
+    chats_manager = ChatsManager()
+    events = Queue()
+    worker = ShardWorker(chats_manager, owner, 3, Queue(), events)
+
+    async def scenario():
+        request = asyncio.ensure_future(shards.request_chats(phone, refresh=True, query='news'))
+        await asyncio.sleep(0)
+
+        # La requête part vers le seul processus propriétaire du compte
+        assert [len(commands.items) for commands in shards.commands] == [int(i == owner) for i in range(3)]
+        [(kind, *arguments)] = shards.commands[owner].items
+        assert kind == 'chats'
+
+        await worker.answer_chats(*arguments)
+        for event in events.items:
+            shards.receive(event)
+        return await request
+
+    result = asyncio.run(scenario())
+
+    assert result == {'status': 'success', 'chats': [{'id': -1001, 'title': 'News', 'type': 'channel'}]}
+    assert chats_manager.calls == [(phone, True, 'news')]
+    assert shards.pending == {}
+
+
+def test_chats_request_times_out(monkeypatch):
+    monkeypatch.setattr(telefeed_shards, 'SHARD_REQUEST_TIMEOUT', 0.01)
+    shards = coordinator(Manager(), 1)
+
+    result = asyncio.run(shards.request_chats('+1'))
+
+    assert result['status'] == 'error'
+    assert shards.pending == {}
+    # Réponse tardive: ignorée
+    shards.receive(('chats_result', 1, {'status': 'success', 'chats': []}))
+
+
+def test_worker_answers_chats_without_blocking_updates():
+    class Commands(Queue):
+        def get(self, timeout=None):
+            return self.items.pop(0)
+
+    class SlowManager(ChatsManager):
+        def __init__(self):
+            super().__init__()
+            self.updates = []
+
+        async def get_chats(self, phone_number, refresh=False, query=None):
+            await asyncio.sleep(0.05)
+            return await super().get_chats(phone_number, refresh, query)
+
+        def apply_shared_update(self, update):
+            self.updates.append(update)
+
+    manager = SlowManager()
+    commands, events = Commands(), Queue()
+    worker = ShardWorker(manager, 0, 1, commands, events)
+    worker.report = lambda: None
+    commands.items = [('chats', 7, '+1', False, None), ('update', {'delay': {}}), ('stop',)]
+
+    async def scenario():
+        await worker.serve()
+        assert manager.updates == [{'delay': {}}]
+        assert events.items == []
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+
+    [(kind, request_id, result)] = events.items
+    assert (kind, request_id, result['status']) == ('chats_result', 7, 'success')
+
+
+def test_bot_process_relays_get_chats(manager):
+    shards = coordinator(Manager(), 2)
+    relayed = []
+
+    async def request_chats(phone_number, refresh=False, query=None):
+        relayed.append((phone_number, refresh, query))
+        return {'status': 'success', 'chats': []}
+
+    shards.request_chats = request_chats
+    manager.attach_shards(shards)
+
+    result = asyncio.run(manager.get_chats('+1', query='news'))
+
+    assert result == {'status': 'success', 'chats': []}
+    assert relayed == [('+1', False, 'news')]
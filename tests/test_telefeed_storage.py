@@ -0,0 +1,139 @@
+"""
+Tests du stockage TeleFeed (SQLite)
+"""
+
+import json
+import sqlite3
+import time
+
+import pytest
+
+from telefeed_storage import ConfigStore, EntityCacheStore, MessageMappingStore
+
+
+def mapping_store(tmp_path, **kwargs):
+    return MessageMappingStore(
+        path=str(tmp_path / 'messages.db'),
+        legacy_file=str(tmp_path / 'mapping.json'),
+        **kwargs
+    )
+
+
+def test_mapping_add_and_get(tmp_path):
+    store = mapping_store(tmp_path)
+    store.add(-100, 1, -200, 11)
+    store.add(-100, 1, '-300', 12)
+
+    assert store.get(-100, 1, '-200') == 11
+    assert store.get(-100, 1, -300) == 12
+    assert store.get(-100, 2, -200) is None
+
+
+def test_prune_keeps_latest_messages_per_source_chat(tmp_path):
+    store = mapping_store(tmp_path, max_per_chat=3)
+    for source_msg in range(1, 6):
+        store.add(-100, source_msg, -200, source_msg + 10)
+        store.add(-100, source_msg, -300, source_msg + 20)
+    store.add(-101, 1, -200, 99)
+
+    store.prune()
+
+    assert [m for m in range(1, 6) if store.get(-100, m, -200)] == [3, 4, 5]
+    assert store.get(-100, 3, -300) == 23
+    # Chat source sans ajout en attente: non concerné par la limite
+    assert store.get(-101, 1, -200) == 99
+    assert store.count() == 7
+
+
+def test_prune_removes_old_entries(tmp_path):
+    store = mapping_store(tmp_path, max_age=60)
+    store.add(-100, 1, -200, 11)
+    store._connect().execute(
+        'INSERT INTO message_mapping VALUES (?, ?, ?, ?, ?)',
+        (-100, 0, '-200', 10, time.time() - 3600)
+    )
+
+    store.prune()
+
+    assert store.get(-100, 0, -200) is None
+    assert store.get(-100, 1, -200) == 11
+
+
+def test_legacy_mapping_file_is_migrated_once(tmp_path):
+    legacy = tmp_path / 'mapping.json'
+    legacy.write_text(json.dumps({'-100_5': {'-200': 50}, 'invalid': {}}), encoding='utf-8')
+
+    store = mapping_store(tmp_path)
+
+    assert store.get(-100, 5, -200) == 50
+    assert not legacy.exists()
+    assert (tmp_path / 'mapping.json.migrated').exists()
+
+
+def config_store(tmp_path, legacy_files=None):
+    return ConfigStore(('sessions', 'redirections'), path=str(tmp_path / 'config.db'), legacy_files=legacy_files)
+
+
+def test_config_write_applies_rows_and_deletions(tmp_path):
+    store = config_store(tmp_path)
+    store.write({
+        'sessions': ({'+1': json.dumps({'connected': True}), '+2': json.dumps({})}, []),
+        'redirections': ({'+1': json.dumps({'r1': {'sources': [1]}})}, []),
+    })
+    store.write({'sessions': ({'+2': json.dumps({'connected': False})}, ['+1'])})
+
+    assert store.load('sessions') == {'+2': {'connected': False}}
+    assert store.load('redirections') == {'+1': {'r1': {'sources': [1]}}}
+
+
+def test_config_load_key_reads_one_entry(tmp_path):
+    store = config_store(tmp_path)
+    store.write({'redirections': ({'+1': json.dumps({'r1': {}}), '+2': json.dumps({})}, [])})
+
+    assert store.load_key('redirections', '+1') == {'r1': {}}
+    assert store.load_key('redirections', '+2') == {}
+    assert store.load_key('redirections', '+3') is None
+
+
+def test_config_write_is_one_transaction(tmp_path):
+    store = config_store(tmp_path)
+    with pytest.raises(sqlite3.OperationalError):
+        store.write({
+            'sessions': ({'+1': '{}'}, []),
+            'unknown': ({'+1': '{}'}, []),
+        })
+
+    assert store.load('sessions') == {}
+
+
+def test_config_imports_legacy_files_into_empty_tables(tmp_path):
+    sessions_file = tmp_path / 'sessions.json'
+    sessions_file.write_text(json.dumps({'+1': {'connected': True}}), encoding='utf-8')
+    legacy_files = {'sessions': str(sessions_file)}
+
+    store = config_store(tmp_path, legacy_files)
+    assert store.load('sessions') == {'+1': {'connected': True}}
+    store.write({'sessions': ({}, ['+1'])})
+    store.close()
+
+    # Le fichier reste en place mais n'est importé que dans une table vide
+    sessions_file.write_text(json.dumps({'+3': {}}), encoding='utf-8')
+    store = config_store(tmp_path, legacy_files)
+    store.write({'sessions': ({'+2': '{}'}, [])})
+    store.close()
+    assert config_store(tmp_path, legacy_files).load('sessions') == {'+2': {}}
+    assert sessions_file.exists()
+
+
+def test_entity_store_keeps_sources_apart(tmp_path):
+    store = EntityCacheStore(path=str(tmp_path / 'entities.db'))
+    record = {'peer_id': 100, 'access_hash': 555, 'type': 'channel', 'title': 'News', 'can_post_as_channel': True}
+    store.save('+1', -1000000000100, record)
+    store.save_source('+1', -1000000000100, dict(record, can_post_as_channel=False))
+    store.save_source('+1', -1000000000200, {'peer_id': 200, 'access_hash': None, 'type': 'channel', 'title': None})
+
+    assert store.load('+1')['-1000000000100']['can_post_as_channel'] is True
+    sources = store.load_sources('+1')
+    assert set(sources) == {'-1000000000100', '-1000000000200'}
+    assert sources['-1000000000200']['access_hash'] is None
+    assert store.load_sources('+2') == {}
@@ -0,0 +1,90 @@
+"""
+Tests du stockage partagé des utilisateurs
+"""
+
+import json
+
+from user_store import UserRecords, UserStore
+
+
+def other_process_records(legacy_file):
+    """UserRecords sur une connexion distincte, comme dans un autre processus"""
+    records = UserRecords.__new__(UserRecords)
+    dict.__init__(records)
+    records.store = UserStore(legacy_file)
+    records.reload()
+    return records
+
+
+def test_save_writes_only_changed_rows(tmp_path):
+    users = UserRecords(str(tmp_path / 'users.json'))
+    users['1'] = {'status': 'waiting'}
+    users['2'] = {'status': 'waiting'}
+    assert users.save() == 2
+
+    users['2']['status'] = 'active'
+    assert users.save() == 1
+    assert users.save() == 0
+    assert users.store.get('2') == {'status': 'active'}
+
+
+def test_save_given_users_only(tmp_path):
+    users = UserRecords(str(tmp_path / 'users.json'))
+    users['1'] = {'status': 'waiting'}
+    users['2'] = {'status': 'waiting'}
+
+    assert users.save(1) == 1
+    assert users.store.get('1') == {'status': 'waiting'}
+    assert users.store.get('2') is None
+
+
+def test_save_deletes_removed_users(tmp_path):
+    users = UserRecords(str(tmp_path / 'users.json'))
+    users['1'] = {'status': 'waiting'}
+    users.save()
+
+    del users['1']
+    users.save()
+
+    assert users.store.load_all() == {}
+
+
+def test_sync_reloads_changes_from_another_process(tmp_path):
+    legacy_file = str(tmp_path / 'users.json')
+    users = UserRecords(legacy_file)
+    other = other_process_records(legacy_file)
+
+    other['1'] = {'status': 'active'}
+    other.save()
+
+    assert users.sync()
+    assert users['1'] == {'status': 'active'}
+    assert not users.sync()
+
+
+def test_own_save_does_not_hide_an_unseen_external_write(tmp_path):
+    legacy_file = str(tmp_path / 'users.json')
+    users = UserRecords(legacy_file)
+    other = other_process_records(legacy_file)
+
+    other['1'] = {'status': 'active'}
+    other.save()
+    users['2'] = {'status': 'waiting'}
+    users.save()
+
+    assert users.sync()
+    assert set(users) == {'1', '2'}
+
+
+def test_legacy_file_is_imported_once(tmp_path):
+    legacy = tmp_path / 'users.json'
+    legacy.write_text(json.dumps({'1': {'status': 'active'}}), encoding='utf-8')
+    legacy_file = str(legacy)
+
+    users = other_process_records(legacy_file)
+    assert users == {'1': {'status': 'active'}}
+    del users['1']
+    users.save()
+    users.store.close()
+
+    assert other_process_records(legacy_file) == {}
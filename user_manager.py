@@ -1,36 +1,129 @@
+import asyncio
+import bisect
+import heapq
 import json
 import datetime
+import functools
+import time
 import uuid
 from typing import Dict, Any, Tuple, Optional
 from config import USERS_FILE, PLANS
+from user_store import UserRecords, get_user_store
+
+# Intervalle minimal entre deux vérifications du store des utilisateurs (secondes)
+LICENSE_CHECK_INTERVAL = 1.0
+
+# Délai maximal du minuteur d'expiration, pour se recaler sur l'horloge (secondes)
+EXPIRY_TIMER_MAX_DELAY = 3600
+
+@functools.lru_cache(maxsize=4096)
+def expiry_timestamp(expires: Optional[str]) -> Optional[float]:
+    """Date d'expiration (ISO, UTC naïf) en secondes epoch, ou None (résultat mémorisé)"""
+    if not expires:
+        return None
+    try:
+        expires_date = datetime.datetime.fromisoformat(expires)
+    except (ValueError, TypeError):
+        return None
+    if expires_date.tzinfo is None:
+        expires_date = expires_date.replace(tzinfo=datetime.timezone.utc)
+    return expires_date.timestamp()
+
+class LicenseCache:
+    """Vue en mémoire des licences actives: {user_id: expiration en secondes epoch}
+
+    Les utilisateurs ne sont relus que si la version du store change (écriture
+    par ce processus ou par un autre), ou après un signal de UserManager
+    (invalidate).
+    """
+    
+    def __init__(self, path: str = USERS_FILE):
+        self.store = get_user_store(path)
+        self.expires: Dict[str, float] = {}
+        self.signature = None
+        self.checked_at = 0.0
+        self.stale = True
+    
+    def invalidate(self) -> None:
+        """Force la relecture au prochain contrôle"""
+        self.stale = True
+    
+    def refresh(self) -> None:
+        """Relit les utilisateurs s'ils ont changé"""
+        try:
+            signature = self.store.version()
+            if not self.stale and signature == self.signature:
+                return
+            users = self.store.load_all()
+        except Exception as e:
+            print(f"Erreur de lecture des utilisateurs : {e}")
+            return
+        self.stale = False
+        self.signature = signature
+        
+        expires = {}
+        for user_id, user_data in users.items():
+            if not isinstance(user_data, dict) or user_data.get('status') != 'active':
+                continue
+            if not user_data.get('expires'):
+                expires[user_id] = float('inf')
+                continue
+            # Dates naïves en UTC, comme pour UserManager (même fonction mémorisée)
+            expires_at = expiry_timestamp(user_data['expires'])
+            if expires_at is not None:
+                expires[user_id] = expires_at
+        self.expires = expires
+    
+    def is_active(self, user_id) -> bool:
+        """Vérifie qu'un utilisateur a une licence active et non expirée"""
+        now = time.monotonic()
+        if self.stale or now - self.checked_at >= LICENSE_CHECK_INTERVAL:
+            self.checked_at = now
+            self.refresh()
+        expires = self.expires.get(str(user_id))
+        return expires is not None and time.time() <= expires
+
+# Instance globale
+license_cache = LicenseCache()
 
 class UserManager:
     """Gestionnaire des utilisateurs et licences"""
     
     def __init__(self):
         self.users = self.load_users()
+        
+        # Licences actives par expiration: tas [(epoch, user_id)] et échéance
+        # actuelle de chaque utilisateur; une entrée du tas qui ne correspond
+        # plus à expiry_keys est périmée et ignorée à sa sortie
+        self.expiry_heap = []
+        self.expiry_keys = {}
+        self.expiry_sorted = None
+        self.expiry_timer = None
+        self.timer_loop = None
+        self._rebuild_expiry_index()
     
     def load_users(self) -> Dict[str, Any]:
-        """Charge les utilisateurs depuis le fichier JSON"""
-        try:
-            with open(USERS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
-        except json.JSONDecodeError:
-            print(f"Erreur de lecture du fichier {USERS_FILE}, création d'un nouveau fichier")
-            return {}
-    
-    def save_users(self) -> None:
-        """Sauvegarde les utilisateurs dans le fichier JSON"""
+        """Charge les utilisateurs depuis le store partagé"""
+        return UserRecords(USERS_FILE)
+    
+    def save_users(self, *user_ids: str) -> None:
+        """Sauvegarde les utilisateurs donnés (par défaut, tous ceux modifiés)"""
         try:
-            with open(USERS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.users, f, indent=2, ensure_ascii=False)
+            self.users.save(*user_ids)
         except Exception as e:
             print(f"Erreur lors de la sauvegarde : {e}")
+        finally:
+            # Activation, expiration...: signaler le changement aux vues en mémoire
+            license_cache.invalidate()
+    
+    def sync_users(self) -> None:
+        """Relit les utilisateurs modifiés par un autre processus (avant une modification)"""
+        if self.users.sync():
+            self._rebuild_expiry_index()
     
     def register_new_user(self, user_id: str) -> Dict[str, Any]:
         """Enregistre un nouvel utilisateur avec statut d'attente"""
+        self.sync_users()
         user_data = {
             "status": "waiting",
             "plan": "trial",
@@ -41,7 +134,8 @@ class UserManager:
         }
         
         self.users[user_id] = user_data
-        self.save_users()
+        self._index_expiry(user_id)
+        self.save_users(user_id)
         return user_data
     
     def activate_user(self, user_id: str, plan: str) -> Tuple[str, datetime.date]:
@@ -49,6 +143,7 @@ class UserManager:
         if plan not in PLANS:
             raise ValueError(f"Plan invalide. Plans disponibles : {', '.join(PLANS.keys())}")
         
+        self.sync_users()
         now = datetime.datetime.utcnow()
         delta = datetime.timedelta(days=PLANS[plan]["duration_days"])
         expires = now + delta
@@ -66,29 +161,21 @@ class UserManager:
             "activated_at": now.isoformat()
         }
         
-        self.save_users()
+        self._index_expiry(user_id)
+        self.save_users(user_id)
         return license_key, expires.date()
     
     def check_user_access(self, user_id: str) -> bool:
         """Vérifie si l'utilisateur a accès au service"""
-        if user_id not in self.users:
-            return False
-        
-        user_data = self.users[user_id]
+        user_data = self.users.get(user_id)
         
         # Vérification du statut
-        if user_data["status"] != "active":
+        if not user_data or user_data.get("status") != "active":
             return False
         
-        # Vérification de la date d'expiration
-        if user_data["expires"] is None:
-            return False
-        
-        try:
-            expires_date = datetime.datetime.fromisoformat(user_data["expires"])
-            return expires_date > datetime.datetime.utcnow()
-        except (ValueError, TypeError):
-            return False
+        # Vérification de la date d'expiration (analysée une seule fois par valeur)
+        expires_at = expiry_timestamp(user_data.get("expires"))
+        return expires_at is not None and expires_at > time.time()
     
     def get_user_info(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Récupère les informations d'un utilisateur"""
@@ -119,22 +206,113 @@ class UserManager:
                 return None
         return None
     
+    def _rebuild_expiry_index(self) -> None:
+        """Reconstruit l'index des expirations à partir de tous les utilisateurs"""
+        self.expiry_heap = []
+        self.expiry_keys = {}
+        self.expiry_sorted = None
+        for user_id in self.users:
+            self._index_expiry(user_id)
+    
+    def _index_expiry(self, user_id: str) -> None:
+        """Met à jour la place d'un utilisateur dans l'index des expirations"""
+        if self.expiry_keys.pop(user_id, None) is not None:
+            self.expiry_sorted = None
+        
+        user_data = self.users.get(user_id)
+        if not user_data or user_data.get("status") != "active":
+            return
+        expires_at = expiry_timestamp(user_data.get("expires"))
+        if expires_at is None:
+            return
+        
+        self.expiry_keys[user_id] = expires_at
+        self.expiry_sorted = None
+        heapq.heappush(self.expiry_heap, (expires_at, user_id))
+        
+        # Trop d'entrées périmées: reconstruire le tas
+        if len(self.expiry_heap) > 2 * len(self.expiry_keys) + 64:
+            self.expiry_heap = [(epoch, key) for key, epoch in self.expiry_keys.items()]
+            heapq.heapify(self.expiry_heap)
+        
+        # Nouvelle première expiration: réarmer le minuteur
+        if self.next_expiry() == expires_at:
+            self._arm_expiry_timer()
+    
+    def _is_current(self, entry) -> bool:
+        return self.expiry_keys.get(entry[1]) == entry[0]
+    
+    def next_expiry(self) -> Optional[float]:
+        """Prochaine expiration (secondes epoch), ou None"""
+        heap = self.expiry_heap
+        while heap and not self._is_current(heap[0]):
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+    
+    def expiring_within(self, days: float) -> list:
+        """Utilisateurs actifs dont la licence expire dans les `days` prochains jours"""
+        # Vue triée reconstruite seulement après un changement de l'index
+        if self.expiry_sorted is None:
+            self.expiry_sorted = sorted((epoch, user_id) for user_id, epoch in self.expiry_keys.items())
+        now = time.time()
+        start = bisect.bisect_right(self.expiry_sorted, (now, "\uffff"))
+        end = bisect.bisect_right(self.expiry_sorted, (now + days * 86400, "\uffff"))
+        return [user_id for _, user_id in self.expiry_sorted[start:end]]
+    
+    def expire_due(self) -> int:
+        """Passe en « expired » les licences échues; retourne leur nombre"""
+        self.sync_users()
+        now = time.time()
+        expired = []
+        heap = self.expiry_heap
+        while heap and heap[0][0] < now:
+            entry = heapq.heappop(heap)
+            if not self._is_current(entry):
+                continue
+            user_id = entry[1]
+            del self.expiry_keys[user_id]
+            self.users[user_id]["status"] = "expired"
+            expired.append(user_id)
+        
+        if expired:
+            self.expiry_sorted = None
+            self.save_users(*expired)
+        return len(expired)
+    
+    def start_expiry_timer(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Démarre le minuteur qui expire chaque licence à son échéance"""
+        self.timer_loop = loop or asyncio.get_running_loop()
+        self._on_expiry_timer()
+    
+    def stop_expiry_timer(self) -> None:
+        """Arrête le minuteur d'expiration"""
+        if self.expiry_timer is not None:
+            self.expiry_timer.cancel()
+            self.expiry_timer = None
+        self.timer_loop = None
+    
+    def _arm_expiry_timer(self) -> None:
+        if self.timer_loop is None:
+            return
+        if self.expiry_timer is not None:
+            self.expiry_timer.cancel()
+            self.expiry_timer = None
+        next_expiry = self.next_expiry()
+        if next_expiry is None:
+            return
+        delay = max(0.0, next_expiry - time.time())
+        self.expiry_timer = self.timer_loop.call_later(min(delay, EXPIRY_TIMER_MAX_DELAY), self._on_expiry_timer)
+    
+    def _on_expiry_timer(self) -> None:
+        self.expiry_timer = None
+        try:
+            expired = self.expire_due()
+            if expired > 0:
+                print(f"🧹 {expired} licence(s) expirée(s)")
+        except Exception as e:
+            print(f"❌ Erreur lors de l'expiration des licences : {e}")
+        self._arm_expiry_timer()
+    
     def cleanup_expired_users(self) -> int:
         """Nettoie les utilisateurs expirés (optionnel)"""
-        cleaned_count = 0
-        current_time = datetime.datetime.utcnow()
-        
-        for user_id, user_data in list(self.users.items()):
-            if user_data["status"] == "active" and user_data["expires"]:
-                try:
-                    expires_date = datetime.datetime.fromisoformat(user_data["expires"])
-                    if expires_date < current_time:
-                        self.users[user_id]["status"] = "expired"
-                        cleaned_count += 1
-                except (ValueError, TypeError):
-                    continue
-        
-        if cleaned_count > 0:
-            self.save_users()
-        
-        return cleaned_count
+        return self.expire_due()
@@ -0,0 +1,208 @@
+"""
+Stockage partagé des utilisateurs
+Une ligne SQLite (mode WAL) par utilisateur, utilisable par plusieurs processus
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Ancien fichier des utilisateurs, importé une fois dans la base
+LEGACY_USERS_FILE = 'users.json'
+
+# Attente maximale d'un verrou d'écriture tenu par un autre processus (ms)
+BUSY_TIMEOUT_MS = 5000
+
+
+def database_path(legacy_file):
+    """Base SQLite associée à un fichier JSON d'utilisateurs (users.json -> users.db)"""
+    return os.path.splitext(legacy_file)[0] + '.db'
+
+
+class UserStore:
+    """Utilisateurs stockés ligne par ligne: (user_id) -> données JSON
+
+    SQLite sérialise les écritures entre processus; chaque modification
+    n'écrit que la ligne de l'utilisateur concerné. `version()` change dès
+    qu'une écriture a eu lieu, dans ce processus ou dans un autre.
+    """
+
+    def __init__(self, legacy_file=LEGACY_USERS_FILE):
+        self.legacy_file = legacy_file
+        self.path = database_path(legacy_file)
+        self.connection = None
+        self.local_writes = 0
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        """Ouvre la base au premier usage et importe l'ancien fichier JSON"""
+        if self.connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS users ('
+                'user_id TEXT PRIMARY KEY, '
+                'data TEXT NOT NULL, '
+                'updated_at REAL NOT NULL'
+                ') WITHOUT ROWID'
+            )
+            self.connection = connection
+            self._migrate_legacy_file()
+        return self.connection
+
+    def _migrate_legacy_file(self):
+        """Importe une fois users.json si la base est vide
+
+        `PRAGMA user_version` marque l'import comme fait: une base vidée
+        ensuite ne reprend pas les utilisateurs du fichier.
+        """
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] >= 1:
+            return
+        legacy = {}
+        if os.path.exists(self.legacy_file) and not self.connection.execute('SELECT 1 FROM users LIMIT 1').fetchone():
+            try:
+                with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
+            except Exception as e:
+                print(f"Erreur lors du chargement {self.legacy_file}: {e}")
+                return
+
+        now = time.time()
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO users VALUES (?, ?, ?)',
+                [(str(user_id), json.dumps(data, ensure_ascii=False), now) for user_id, data in legacy.items()]
+            )
+            self.connection.execute('PRAGMA user_version = 1')
+        if legacy:
+            print(f"📦 {len(legacy)} utilisateurs importés de {self.legacy_file} vers {self.path}")
+
+    def version(self):
+        """Identifiant de version des données (écritures locales et externes)"""
+        with self.lock:
+            data_version = self._connect().execute('PRAGMA data_version').fetchone()[0]
+            return data_version, self.local_writes
+
+    def get(self, user_id):
+        """Données d'un utilisateur, ou None"""
+        with self.lock:
+            row = self._connect().execute(
+                'SELECT data FROM users WHERE user_id = ?', (str(user_id),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load_all(self):
+        """Tous les utilisateurs: {user_id: données}"""
+        with self.lock:
+            rows = self._connect().execute('SELECT user_id, data FROM users').fetchall()
+        return {user_id: json.loads(data) for user_id, data in rows}
+
+    def put_many(self, rows):
+        """Écrit plusieurs utilisateurs en une transaction: [(user_id, données)]"""
+        if not rows:
+            return
+        now = time.time()
+        with self.lock:
+            connection = self._connect()
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.executemany(
+                    'INSERT OR REPLACE INTO users VALUES (?, ?, ?)',
+                    [(str(user_id), json.dumps(data, ensure_ascii=False), now) for user_id, data in rows]
+                )
+            self.local_writes += 1
+
+    def put(self, user_id, data):
+        """Écrit un utilisateur"""
+        self.put_many([(user_id, data)])
+
+    def delete(self, user_id):
+        """Supprime un utilisateur"""
+        with self.lock:
+            self._connect().execute('DELETE FROM users WHERE user_id = ?', (str(user_id),))
+            self.local_writes += 1
+
+    def close(self):
+        """Ferme la base"""
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+
+_stores = {}
+
+
+def get_user_store(legacy_file=LEGACY_USERS_FILE):
+    """Store partagé du processus pour un fichier d'utilisateurs"""
+    store = _stores.get(legacy_file)
+    if store is None:
+        store = _stores[legacy_file] = UserStore(legacy_file)
+    return store
+
+
+class UserRecords(dict):
+    """Adaptateur pour les gestionnaires existants: un dict d'utilisateurs
+
+    Se lit comme le dict chargé depuis users.json, mais `save()` n'écrit
+    dans le UserStore que les utilisateurs donnés ou, sans argument, ceux
+    qui ont changé depuis la dernière écriture.
+    """
+
+    def __init__(self, legacy_file=LEGACY_USERS_FILE):
+        self.store = get_user_store(legacy_file)
+        super().__init__()
+        self.reload()
+
+    def _fingerprint(self, data):
+        return json.dumps(data, sort_keys=True, ensure_ascii=False)
+
+    def reload(self):
+        """Recharge tous les utilisateurs depuis le store"""
+        self.version = self.store.version()
+        users = self.store.load_all()
+        self.clear()
+        self.update(users)
+        self.saved = {user_id: self._fingerprint(data) for user_id, data in users.items()}
+
+    def sync(self):
+        """Recharge si un autre processus a modifié les utilisateurs
+
+        À appeler avant de modifier un utilisateur puis de le sauvegarder,
+        pour ne pas réécrire des données périmées. Les modifications non
+        sauvegardées sont perdues.
+        """
+        if self.store.version() != self.version:
+            self.reload()
+            return True
+        return False
+
+    def save(self, *user_ids):
+        """Écrit les utilisateurs modifiés; retourne le nombre de lignes écrites"""
+        candidates = user_ids or set(self) | set(self.saved)
+        rows = []
+        for user_id in candidates:
+            data = self.get(user_id)
+            if data is None:
+                data = self.get(str(user_id))
+            user_id = str(user_id)
+            if data is None:
+                if self.saved.pop(user_id, None) is not None:
+                    self.store.delete(user_id)
+                continue
+            fingerprint = self._fingerprint(data)
+            if self.saved.get(user_id) != fingerprint:
+                rows.append((user_id, data))
+                self.saved[user_id] = fingerprint
+
+        before = self.store.version()
+        self.store.put_many(rows)
+        if before == self.version:
+            # Aucune écriture extérieure non relue: la version suit nos écritures
+            self.version = self.store.version()
+        return len(rows)
@@ -6,7 +6,6 @@ Teste que tous les composants fonctionnent correctement
 """
 
 import os
-import json
 import sys
 
 def test_imports():
@@ -94,17 +93,19 @@ def test_data_files():
     """Test que les fichiers de données existent"""
     print("\n🔍 Test des fichiers de données...")
     
-    # Test users.json
-    if os.path.exists('users.json'):
-        try:
-            with open('users.json', 'r', encoding='utf-8') as f:
-                users = json.load(f)
-            print(f"✅ users.json valide ({len(users)} utilisateurs)")
-        except json.JSONDecodeError:
-            print("❌ users.json corrompu")
-            return False
-    else:
-        print("⚠️ users.json manquant (sera créé automatiquement)")
+    # Test de la base des utilisateurs (users.json n'est qu'une ancienne source, importée une fois)
+    try:
+        from config import USERS_FILE
+        from user_store import get_user_store
+        store = get_user_store(USERS_FILE)
+        users = store.load_all()
+        print(f"✅ {store.path} valide ({len(users)} utilisateurs)")
+    except Exception as e:
+        print(f"❌ Base des utilisateurs illisible: {e}")
+        return False
+    
+    if not os.path.exists(USERS_FILE):
+        print(f"ℹ️ {USERS_FILE} absent (ancien format, optionnel)")
     
     return True
 
@@ -134,7 +135,7 @@ def show_deployment_summary():
         'user_manager.py',
         'bot_handlers.py',
         'config.py',
-        'users.json'
+        'user_store.py'
     ]
     
     for file in files_to_deploy:
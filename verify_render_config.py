@@ -4,7 +4,6 @@ Script de vérification complète de la configuration Render.com
 """
 
 import os
-import json
 import sys
 
 def check_files():
@@ -17,7 +16,7 @@ def check_files():
         'user_manager.py',
         'bot_handlers.py',
         'config.py',
-        'users.json'
+        'user_store.py'
     ]
     
     all_present = True
@@ -116,14 +115,18 @@ def check_config():
         return False
 
 def check_users():
-    """Vérifie users.json"""
-    print("\n👥 USERS.JSON:")
+    """Vérifie la base des utilisateurs (users.db, users.json importé s'il existe)"""
+    print("\n👥 UTILISATEURS:")
     
     try:
-        with open('users.json', 'r') as f:
-            users = json.load(f)
+        from config import USERS_FILE
+        from user_store import get_user_store
+        store = get_user_store(USERS_FILE)
+        users = store.load_all()
         
-        print(f"✅ {len(users)} utilisateurs chargés")
+        print(f"✅ {len(users)} utilisateurs chargés depuis {store.path}")
+        if not os.path.exists(USERS_FILE):
+            print(f"ℹ️ {USERS_FILE} absent (ancien format, optionnel)")
         
         for user_id, user_data in users.items():
             status = user_data.get('status', 'unknown')
@@ -132,7 +135,7 @@ def check_users():
         return True
         
     except Exception as e:
-        print(f"❌ Erreur users.json: {e}")
+        print(f"❌ Erreur base des utilisateurs: {e}")
         return False
 
 def show_deployment_config():
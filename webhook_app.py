@@ -9,6 +9,7 @@ from flask import Flask, request, jsonify
 import json
 import os
 import secrets
+import sys
 from datetime import datetime
 import logging
 
@@ -252,12 +253,18 @@ def index():
         "timestamp": datetime.now().isoformat()
     })
 
+def telefeed_connection_states():
+    """États des comptes TeleFeed, si le système TeleFeed tourne dans ce processus"""
+    telefeed = sys.modules.get('telefeed_commands')
+    return telefeed.telefeed_manager.get_connection_states() if telefeed else {}
+
 @app.route('/health')
 def health_check():
     """Endpoint de santé"""
     return jsonify({
         "status": "healthy",
         "users_count": len(user_manager.users),
+        "telefeed_accounts": telefeed_connection_states(),
         "timestamp": datetime.now().isoformat()
     })
 